@@ -1,30 +1,34 @@
+import argparse
 import csv
 import math
-import sys
 import os
 
+import numpy as np
+
+from perf_columns import column_names, is_columnar, read_columns
+
+# Columns that index the samples rather than measure the pipeline; they are
+# not analyzed unless requested explicitly
+INDEX_COLUMNS = ('Cycle',)
+
+# Column whose correlations are reported (performance = commits per window)
+TARGET_COLUMN = 'Commits'
+
+DISPLAY_NAMES = {'Load_Stores': 'Load/Stores'}
+
+# The full correlation matrix is printed up to this many columns
+MATRIX_PRINT_LIMIT = 12
+
+# Strongest (metric, control) partial correlations listed
+PARTIAL_PRINT_LIMIT = 15
+
 def mean(data):
-    return sum(data) / len(data)
+    return float(np.mean(data))
 
 def correlation(x, y):
-    n = len(x)
-    if n != len(y):
+    if len(x) != len(y):
         raise ValueError("Lists must have the same length")
-    
-    mu_x = mean(x)
-    mu_y = mean(y)
-    
-    numerator = sum((xi - mu_x) * (yi - mu_y) for xi, yi in zip(x, y))
-    
-    sum_sq_diff_x = sum((xi - mu_x) ** 2 for xi in x)
-    sum_sq_diff_y = sum((yi - mu_y) ** 2 for yi in y)
-    
-    denominator = math.sqrt(sum_sq_diff_x * sum_sq_diff_y)
-    
-    if denominator == 0:
-        return 0
-    
-    return numerator / denominator
+    return float(correlation_matrix(np.array([x, y], dtype=np.float64))[0, 1])
 
 def partial_correlation(r_xy, r_xz, r_yz):
     """
@@ -36,51 +40,237 @@ def partial_correlation(r_xy, r_xz, r_yz):
     if denominator == 0: return 0
     return numerator / denominator
 
-def analyze_csv(file_path):
-    cycles = []
-    commits = []
-    branches = []
-    mispredicts = []
-    load_stores = []
-    mispred_rates = []
+def load_columns(file_path, columns=None):
+    """
+    Load numeric CSV columns straight into a NumPy array
+
+    Args:
+        file_path (str): CSV file with a header row
+        columns (list): Columns to load (default: every numeric column
+                        except INDEX_COLUMNS)
+
+    Columnar files (.parquet, .arrow/.feather, .npz from parse_performance_log)
+    are loaded without text parsing, reading only the requested columns.
+
+    Returns:
+        tuple: (names, data) with data shaped (len(names), rows), float64
+    """
+    if is_columnar(file_path):
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(file_path)
+        if columns is None:
+            columns = [name for name in column_names(file_path) if name not in INDEX_COLUMNS]
+        loaded = read_columns(file_path, columns)
+        if not columns:
+            return [], np.zeros((0, 0))
+        return list(columns), np.vstack([loaded[name].astype(np.float64, copy=False)
+                                         for name in columns])
+
+    with open(file_path, 'r', newline='') as f:
+        header = next(csv.reader([f.readline()]), [])
+        data_start = f.tell()
+        first_row = next(csv.reader([f.readline()]), [])
+        f.seek(data_start)
+
+        if columns is None:
+            columns = []
+            for name, value in zip(header, first_row):
+                try:
+                    float(value)
+                except ValueError:
+                    continue
+                if name not in INDEX_COLUMNS:
+                    columns.append(name)
+        missing = [name for name in columns if name not in header]
+        if missing:
+            raise ValueError(f"Column(s) not found in {file_path}: {', '.join(missing)}")
+        if not first_row:
+            return list(columns), np.zeros((len(columns), 0))
+
+        usecols = [header.index(name) for name in columns]
+        data = np.loadtxt(f, delimiter=',', usecols=usecols, dtype=np.float64, ndmin=2)
+    return list(columns), data.T
+
+def correlation_matrix(data):
+    """
+    Pearson correlation of every pair of rows in one vectorized call
+
+    Constant rows have no defined correlation; like correlation() they get 0
+    (and 1 on the diagonal).
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = np.atleast_2d(np.corrcoef(data))
+    corr = np.nan_to_num(corr, nan=0.0)
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+def partial_correlations(corr, target):
+    """
+    First-order partial correlation of the target with every metric,
+    controlling for every other single metric
+
+    Entry [m, c] is r(target, m | c). For each (metric, control) pair this
+    is -P[0, 1] / sqrt(P[0, 0] * P[1, 1]) of P = inverse of the 3x3
+    correlation matrix of (target, m, c); the closed form of that inverse is
+    evaluated for all pairs at once. Pairs involving the target itself or
+    m == c are NaN.
+    """
+    r_target = corr[target]
+    r_xy = r_target[:, None]
+    r_xz = r_target[None, :]
+    numerator = r_xy - r_xz * corr
+    denominator = np.sqrt(np.clip((1 - r_xz ** 2) * (1 - corr ** 2), 0.0, None))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        partial = np.where(denominator > 0, numerator / denominator, 0.0)
+    partial[target, :] = np.nan
+    partial[:, target] = np.nan
+    np.fill_diagonal(partial, np.nan)
+    return partial
 
+def full_partial_correlations(corr):
+    """
+    Partial correlation of every pair controlling for all other columns,
+    from the (pseudo-)inverse of the correlation matrix
+    """
+    precision = np.linalg.pinv(corr)
+    scale = np.sqrt(np.clip(np.diag(precision), 0.0, None))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        partial = -precision / np.outer(scale, scale)
+    partial = np.nan_to_num(partial, nan=0.0, posinf=0.0, neginf=0.0)
+    np.fill_diagonal(partial, 1.0)
+    return partial
+
+def display_name(column):
+    return DISPLAY_NAMES.get(column, column)
+
+def print_correlation_matrix(names, corr):
+    """Print the correlation matrix (or a note if it is too wide)"""
+    print("\nKorelasyon Matrisi:")
+    if len(names) > MATRIX_PRINT_LIMIT:
+        print(f"   ({len(names)} metrik, tablo icin fazla; --columns ile daraltin)")
+        return
+    width = max(8, max(len(name) for name in names) + 1)
+    print(" " * width + "".join(f"{name[:9]:>10}" for name in names))
+    for name, row in zip(names, corr):
+        print(f"{name:<{width}}" + "".join(f"{value:>10.4f}" for value in row))
+
+def print_partial_tables(names, corr, target):
+    """Print the strongest pairwise partials and the all-controls partials"""
+    partial = partial_correlations(corr, target)
+    metric_idx, control_idx = np.nonzero(~np.isnan(partial))
+    if len(metric_idx):
+        values = partial[metric_idx, control_idx]
+        order = np.argsort(-np.abs(values), kind='stable')[:PARTIAL_PRINT_LIMIT]
+        print(f"\nKismi Korelasyonlar ({names[target]} ile, her (metrik, kontrol) cifti):")
+        print("-" * 60)
+        print(f"{'Metrik':<25} | {'Sabit tutulan':<20} | r_partial")
+        print("-" * 60)
+        for i in order:
+            metric, control = metric_idx[i], control_idx[i]
+            print(f"{display_name(names[metric]):<25} | {display_name(names[control]):<20} | "
+                  f"{values[i]:.4f}")
+        if len(values) > PARTIAL_PRINT_LIMIT:
+            print(f"... ({len(values)} ciftten en guclu {PARTIAL_PRINT_LIMIT} tanesi)")
+        print("-" * 60)
+
+    if len(names) > 2:
+        full = full_partial_correlations(corr)
+        print(f"\nKismi Korelasyon ({names[target]} ile, diger tum metrikler sabit):")
+        print("-" * 60)
+        for i, name in enumerate(names):
+            if i != target:
+                print(f"{display_name(name):<25} | {full[target, i]:.4f}")
+        print("-" * 60)
+
+def analyze_csv(file_path, columns=None, target_column=TARGET_COLUMN):
     try:
-        with open(file_path, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                cycles.append(float(row['Cycle']))
-                commits.append(float(row['Commits']))
-                branches.append(float(row['Branches']))
-                mispredicts.append(float(row['Mispredicts']))
-                load_stores.append(float(row['Load_Stores']))
-                mispred_rates.append(float(row['Mispred_Rate_Percent']))
+        if columns is not None and target_column not in columns:
+            columns = [target_column] + list(columns)
+        names, data = load_columns(file_path, columns)
     except FileNotFoundError:
         print(f"Error: File {file_path} not found.")
         return
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    if target_column not in names:
+        print(f"Error: Column {target_column} not found in {file_path}.")
+        return
+    analyze_columns(names, data, target_column)
+
+def analyze_run(db_path, run, columns=None, target_column=TARGET_COLUMN):
+    """Correlation analysis of one run stored in a perf_db database"""
+    import perf_db
+    try:
+        if columns is not None and target_column not in columns:
+            columns = [target_column] + list(columns)
+        conn = perf_db.connect(db_path)
+        names, data = perf_db.load_run_columns(conn, run, columns)
+    except (ValueError, perf_db.sqlite3.Error) as e:
+        print(f"Error: {e}")
+        return
+    if target_column not in names:
+        print(f"Error: Column {target_column} not found.")
+        return
+    print(f"Run: {run} ({db_path})")
+    analyze_columns(names, data, target_column)
+
+def compare_runs(db_path, config=None):
+    """Cross-run summary from a perf_db database, with the IPC change per run"""
+    import perf_db
+    try:
+        summaries = perf_db.run_summaries(perf_db.connect(db_path), config)
+    except perf_db.sqlite3.Error as e:
+        print(f"Error: {e}")
+        return
+    if not summaries:
+        print(f"Veritabaninda kosu bulunamadi: {db_path}")
+        return
+    print(f"Kosular arasi karsilastirma ({len(summaries)} kosu):")
+    perf_db.print_run_table(summaries, show_delta=True)
+
+def analyze_columns(names, data, target_column=TARGET_COLUMN):
+    """Correlation report for loaded columns (data shaped (len(names), rows))"""
+    print(f"Analiz edilen veri noktasi sayisi: {data.shape[1]}")
+    if data.shape[1] < 2:
+        print("Korelasyon icin en az iki veri noktasi gerekli.")
+        return
+
+    corr = correlation_matrix(data)
+    index = {name: i for i, name in enumerate(names)}
+    target = index[target_column]
 
-    print(f"Analiz edilen veri noktasi sayisi: {len(commits)}")
     print("-" * 60)
-    print(f"{'Metrik':<25} | {'Korelasyon (Commits ile)':<25}")
+    print(f"{'Metrik':<25} | {f'Korelasyon ({target_column} ile)':<25}")
+    print("-" * 60)
+    for i, name in enumerate(names):
+        if i != target:
+            print(f"{display_name(name):<25} | {corr[i, target]:.4f}")
     print("-" * 60)
 
-    # Calculate correlations with Commits
-    corr_branches = correlation(branches, commits)
-    corr_mispredicts = correlation(mispredicts, commits)
-    corr_ls = correlation(load_stores, commits)
-    corr_mispred_rate = correlation(mispred_rates, commits)
+    # The classic Commits/Branches/Mispredicts/Load_Stores report
+    classic = ('Branches', 'Mispredicts', 'Load_Stores', 'Mispred_Rate_Percent')
+    if target_column == 'Commits' and all(name in index for name in classic):
+        print_classic_analysis(corr, index)
 
-    print(f"{'Branches':<25} | {corr_branches:.4f}")
-    print(f"{'Mispredicts':<25} | {corr_mispredicts:.4f}")
-    print(f"{'Load/Stores':<25} | {corr_ls:.4f}")
-    print(f"{'Mispred_Rate_Percent':<25} | {corr_mispred_rate:.4f}")
-    print("-" * 60)
+    print_correlation_matrix(names, corr)
+    print_partial_tables(names, corr, target)
+
+def print_classic_analysis(corr, index):
+    """Partial correlation and interpretation of the parse_performance_log columns"""
+    commits = index['Commits']
+    corr_branches = corr[index['Branches'], commits]
+    corr_mispredicts = corr[index['Mispredicts'], commits]
+    corr_ls = corr[index['Load_Stores'], commits]
+    corr_mispred_rate = corr[index['Mispred_Rate_Percent'], commits]
 
     # Partial Correlation Analysis
     # r_commits_ls_given_mispred: Correlation of Commits and LS, controlling for Mispredicts
     # x = Commits, y = LS, z = Mispredicts
     r_xy = corr_ls
     r_xz = corr_mispredicts
-    r_yz = correlation(load_stores, mispredicts) # Correlation between LS and Mispredicts
+    r_yz = corr[index['Load_Stores'], index['Mispredicts']] # Correlation between LS and Mispredicts
     
     partial_corr_ls = partial_correlation(r_xy, r_xz, r_yz)
     
@@ -150,8 +340,19 @@ def analyze_csv(file_path):
 if __name__ == "__main__":
     # Use the path provided in the prompt context if available, otherwise default
     csv_path = r"d:\Ensar\Tez\RV32I\digital\sim\run\module_test\top_level\test19_3pipe\performance_stats.csv"
-    
-    if len(sys.argv) > 1:
-        csv_path = sys.argv[1]
-        
-    analyze_csv(csv_path)
+
+    parser = argparse.ArgumentParser(description='Performance CSV Correlation Analysis')
+    parser.add_argument('csv', nargs='?', default=csv_path, help='CSV (or .parquet/.arrow/.npz) file from parse_performance_log.py')
+    parser.add_argument('--target', default=TARGET_COLUMN, help=f'Performance column (default: {TARGET_COLUMN})')
+    parser.add_argument('--columns', nargs='+', help='Columns to analyze (default: all numeric columns)')
+    parser.add_argument('--db', help='perf_db.py database: compare its runs instead of reading a CSV')
+    parser.add_argument('--run', help='With --db: analyze this run (id or name)')
+    parser.add_argument('--config', help='With --db: only runs of this configuration (e.g. 3pipe)')
+    args = parser.parse_args()
+
+    if args.db and args.run:
+        analyze_run(args.db, args.run, args.columns, args.target)
+    elif args.db:
+        compare_runs(args.db, args.config)
+    else:
+        analyze_csv(args.csv, args.columns, args.target)
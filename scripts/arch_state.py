@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Architectural Register State Engine
+
+Replays the integer register writes (xN 0xDATA) of a core or Spike commit
+trace once and answers "value of a register at commit k" and "whole
+register file at commit k" without scrolling back through the trace:
+
+    per commit      rd written (0: none) and the value written
+    per register    ascending commit indices of its writes
+    checkpoints     full 32-register snapshot every K commits
+
+A single register comes back by bisecting its write list (O(log n)); the
+whole register file by copying the nearest checkpoint and replaying at
+most K commits (O(K)). Memory is O(n): 5 bytes per commit, one index per
+write and 128 bytes per checkpoint. Large traces are parsed in bulk with
+NumPy when it is available.
+
+Registers start at zero; x0 writes are ignored. Lines that are not
+register writes (stores, branches, loop records) leave the state as is.
+
+Usage:
+    python arch_state.py core_sim/trace.log 1500
+    python arch_state.py core_sim/trace.log 1500 --history x10
+"""
+
+import argparse
+import sys
+from array import array
+from bisect import bisect_right
+
+from commit_trace import FLAG_RD_WRITE, parse_commit_line
+
+# Commits between two full register snapshots
+CHECKPOINT_INTERVAL = 1024
+
+# Traces with fewer commits are replayed with the standard library, which
+# is faster than importing NumPy for them
+NUMPY_MIN_LINES = 65536
+
+REGISTER_COUNT = 32
+
+# Byte offsets of a register write in "0x%08x (0x%08x) x%-2d 0x%08x"
+_RD_OFFSET = 24
+_VALUE_OFFSET = 30
+_WRITE_LENGTH = 38
+
+
+def register_write(line):
+    """
+    (rd, value) of the integer register write of a commit line, or None
+
+    The write follows the instruction word (tracer_3port.sv and Spike both
+    print it before a memory access or CSR write).
+    """
+    tokens = line.split(None, 4)
+    if len(tokens) < 4:
+        return None
+    token = tokens[2]
+    if token[0] != 'x' or not token[1:].isdigit():
+        if token[0] == 'c' and ' x' in line:
+            record = parse_commit_line(line)
+            if record is not None and record.flags & FLAG_RD_WRITE:
+                return record.rd, record.rd_value
+        return None
+    try:
+        value = int(tokens[3], 16)
+    except ValueError:
+        value = 0  # X/Z from the simulator
+    return int(token[1:]), value
+
+
+def _writes_stdlib(lines):
+    """(rd, value) arrays of every commit, one line at a time"""
+    write_rd = array('B')
+    write_value = array('I')
+    rd_append = write_rd.append
+    value_append = write_value.append
+    for line in lines:
+        write = register_write(line)
+        if write is None or not 0 < write[0] < REGISTER_COUNT:
+            rd_append(0)
+            value_append(0)
+        else:
+            rd_append(write[0])
+            value_append(write[1] & 0xFFFFFFFF)
+    return write_rd, write_value
+
+
+def _writes_numpy(lines):
+    """
+    (rd, value) arrays of every commit, parsed in bulk
+
+    Writes are read at the fixed offsets of the tracer format; other lines
+    that may hold a write (Spike CSR writes first) go through register_write().
+    """
+    import numpy as np
+
+    data = np.frombuffer(('\n'.join(lines) + '\n').encode('utf-8', 'replace'), dtype=np.uint8)
+    ends = np.flatnonzero(data == 10)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    last = len(data) - 1
+
+    def column(offset):
+        return data[np.minimum(starts + offset, last)]
+
+    rd_char = column(_RD_OFFSET)
+    tens = column(_RD_OFFSET + 1).astype(np.int64) - 48
+    ones = column(_RD_OFFSET + 2)
+    two_digits = ones != 32
+    valid = ((ends - starts >= _WRITE_LENGTH) & (rd_char == ord('x')) &
+             (column(_RD_OFFSET - 1) == 32) & (column(_VALUE_OFFSET - 1) == ord('x')) &
+             (tens >= 0) & (tens <= 9) & (~two_digits | ((ones >= 48) & (ones <= 57))))
+    rd = np.where(two_digits, tens * 10 + ones.astype(np.int64) - 48, tens)
+    valid &= (rd > 0) & (rd < REGISTER_COUNT)
+
+    nibbles = np.zeros(256, dtype=np.uint32)   # X/Z digits read as 0
+    nibbles[np.frombuffer(b'0123456789', dtype=np.uint8)] = np.arange(10, dtype=np.uint32)
+    nibbles[np.frombuffer(b'abcdef', dtype=np.uint8)] = np.arange(10, 16, dtype=np.uint32)
+    nibbles[np.frombuffer(b'ABCDEF', dtype=np.uint8)] = np.arange(10, 16, dtype=np.uint32)
+    value = np.zeros(len(starts), dtype=np.uint32)
+    for k in range(8):
+        value = (value << 4) | nibbles[column(_VALUE_OFFSET + k)]
+
+    rd = np.where(valid, rd, 0).astype(np.uint8)
+    value = np.where(valid, value, 0).astype(np.uint32)
+    for i in np.flatnonzero(rd_char == ord('c')).tolist():
+        write = register_write(lines[i])
+        if write is not None and 0 < write[0] < REGISTER_COUNT:
+            rd[i] = write[0]
+            value[i] = write[1] & 0xFFFFFFFF
+
+    write_rd = array('B')
+    write_rd.frombytes(rd.tobytes())
+    write_value = array('I')
+    write_value.frombytes(value.tobytes())
+    return write_rd, write_value
+
+
+class RegisterHistory:
+    """
+    Integer register file over the commits of one trace
+
+    Commit indices are 0-based positions in the sequence of commit lines
+    the history was built from; state "at" commit k includes its write.
+    """
+
+    def __init__(self, lines, interval=CHECKPOINT_INTERVAL):
+        """
+        Args:
+            lines (iterable): Commit lines (list, TraceReader, ...)
+            interval (int): Commits between two checkpoints (K)
+        """
+        self.interval = interval
+        lines = lines if isinstance(lines, list) else list(lines)
+        use_numpy = len(lines) >= NUMPY_MIN_LINES
+        if use_numpy:
+            try:
+                self.write_rd, self.write_value = _writes_numpy(lines)
+            except ImportError:
+                use_numpy = False
+        if not use_numpy:
+            self.write_rd, self.write_value = _writes_stdlib(lines)
+
+        self.reg_commits = [array('q') for _ in range(REGISTER_COUNT)]
+        # State before commit c * interval, 32 values per checkpoint
+        self.checkpoints = array('I')
+        state = [0] * REGISTER_COUNT
+        reg_commits = self.reg_commits
+        checkpoints = self.checkpoints
+        write_value = self.write_value
+        next_checkpoint = 0
+        for commit, rd in enumerate(self.write_rd):
+            if commit == next_checkpoint:
+                checkpoints.extend(state)
+                next_checkpoint += interval
+            if rd:
+                state[rd] = write_value[commit]
+                reg_commits[rd].append(commit)
+
+    def __len__(self):
+        return len(self.write_rd)
+
+    def last_write(self, reg, commit):
+        """Commit index of the last write to reg at or before commit (-1 if none)"""
+        commits = self.reg_commits[reg]
+        i = bisect_right(commits, commit)
+        return commits[i - 1] if i else -1
+
+    def value_at(self, reg, commit):
+        """Value of register reg after commit (commit -1: initial state)"""
+        if not reg:
+            return 0
+        writer = self.last_write(reg, commit)
+        return self.write_value[writer] if writer >= 0 else 0
+
+    def registers_at(self, commit):
+        """
+        Whole register file after commit (commit -1: initial state)
+
+        Returns:
+            list: 32 register values
+        """
+        if commit < 0 or not len(self.write_rd):
+            return [0] * REGISTER_COUNT
+        commit = min(commit, len(self.write_rd) - 1)
+        checkpoint = commit // self.interval
+        base = checkpoint * REGISTER_COUNT
+        state = self.checkpoints[base:base + REGISTER_COUNT].tolist()
+        write_rd = self.write_rd
+        write_value = self.write_value
+        for c in range(checkpoint * self.interval, commit + 1):
+            rd = write_rd[c]
+            if rd:
+                state[rd] = write_value[c]
+        return state
+
+    def writes(self, reg):
+        """(commit, value) pairs of every write to reg, in commit order"""
+        return [(commit, self.write_value[commit]) for commit in self.reg_commits[reg]]
+
+    def memory_bytes(self):
+        """Approximate size of the history in bytes"""
+        arrays = [self.write_rd, self.write_value, self.checkpoints] + self.reg_commits
+        return sum(len(a) * a.itemsize for a in arrays)
+
+
+def format_registers(values, reference=None):
+    """
+    Register file as text, four registers per line
+
+    Args:
+        reference (list): Optional second register file; differing
+                          registers are marked with '*'
+    """
+    out = []
+    for row in range(0, REGISTER_COUNT, 4):
+        cells = []
+        for r in range(row, row + 4):
+            mark = '*' if reference is not None and reference[r] != values[r] else ' '
+            cells.append(f"x{r:<2} 0x{values[r]:08x}{mark}")
+        out.append('  ' + ' '.join(cells))
+    return '\n'.join(out)
+
+
+def main():
+    """Main function to handle command line arguments"""
+    parser = argparse.ArgumentParser(description='Register file of a commit trace at any commit')
+    parser.add_argument('log_file', help='Core trace or Spike trace')
+    parser.add_argument('commit', type=int, help='Commit number (1-based, as in the diff report)')
+    parser.add_argument('--history', metavar='REG', help='Also list the writes to a register (e.g. x10)')
+    parser.add_argument('--interval', type=int, default=CHECKPOINT_INTERVAL,
+                        help='Commits between checkpoints (default: %(default)s)')
+    args = parser.parse_args()
+
+    from trace_diff import iter_commit_lines
+
+    try:
+        import time
+        start = time.perf_counter()
+        history = RegisterHistory(iter_commit_lines(args.log_file), args.interval)
+        elapsed = time.perf_counter() - start
+    except OSError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    commit = args.commit - 1
+    if not 0 <= commit < len(history):
+        print(f"Error: commit must be between 1 and {len(history):,}")
+        sys.exit(1)
+
+    print(f"File: {args.log_file}")
+    print(f"Commits: {len(history):,} (history {history.memory_bytes():,} bytes, "
+          f"built in {elapsed:.3f} s)")
+    print(f"Register state after commit #{args.commit:,}:")
+    print(format_registers(history.registers_at(commit)))
+
+    if args.history:
+        reg = args.history.lower().lstrip('x')
+        if not reg.isdigit() or int(reg) >= REGISTER_COUNT:
+            print(f"Error: invalid register '{args.history}'")
+            sys.exit(1)
+        reg = int(reg)
+        writes = history.writes(reg)
+        print(f"\nWrites to x{reg}: {len(writes):,}")
+        for c, value in writes:
+            marker = '  <' if c == history.last_write(reg, commit) else ''
+            print(f"  #{c + 1:<10,} 0x{value:08x}{marker}")
+
+
+if __name__ == "__main__":
+    main()
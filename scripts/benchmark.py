@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Benchmark Harness
+
+Generates synthetic inputs in the exact formats of the simulation flow and
+times the processing scripts on them, so throughput and memory can be
+tracked across changes:
+
+    spike_filter     spike_log_filter.filter_spike_log   on a raw Spike log
+    perf_parse       parse_performance_log.parse_log_to_csv on a
+                     pipeline_performance_analyzer.sv log
+    perf_analyze     analyze_performance.analyze_csv     on the parsed CSV
+    region_extract   region_extractor.extract_regions_from_assembly
+    trace_compare    trace_diff.TraceComparator compare + text report on a
+                     tracer_3port.sv trace vs a filtered Spike trace
+
+Each size is the line count of every generated input (default 10k, 1M and
+10M lines); throughput is computed from the lines and bytes each benchmark
+actually reads (both traces for the comparator, the CSV for the analysis). Every benchmark runs in a fresh Python process, so its peak RSS
+is measured in isolation (Unix only; null elsewhere).
+
+Results are written as JSON. With --baseline a previous result file is
+compared and the exit code is 1 if any benchmark got slower than the
+tolerance allows.
+
+Usage:
+    python benchmark.py [--sizes 10k,1m,10m] [-o benchmark_results.json]
+                        [--only trace_compare] [--baseline old.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from itertools import chain
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_SIZES = '10k,1m,10m'
+DEFAULT_OUTPUT = 'benchmark_results.json'
+
+# A benchmark counts as a regression if it is this much slower than the baseline
+DEFAULT_TOLERANCE = 0.20
+
+# Slowdowns smaller than this (seconds) are timer noise, never a regression
+MIN_SLOWDOWN_SECONDS = 0.05
+
+BENCHMARKS = ('spike_filter', 'perf_parse', 'perf_analyze', 'region_extract', 'trace_compare')
+
+# Lines written per generator step
+WRITE_BATCH = 50000
+
+# One differing commit per this many commits between the synthetic core and Spike traces
+DIVERGENCE_EVERY = 50000
+
+# Spike boot ROM (reset vector at 0x1000) that precedes the program in Spike traces
+BOOT_ROM = [
+    (0x00001000, 0x00000297, 'auipc   t0, 0x0', ' x5  0x00001000'),
+    (0x00001004, 0x02028593, 'addi    a1, t0, 32', ' x11 0x00001020'),
+    (0x00001008, 0xf1402573, 'csrr    a0, mhartid', ' x10 0x00000000'),
+    (0x0000100c, 0x0182a283, 'lw      t0, 24(t0)', ' x5  0x80000000 mem 0x00001018'),
+    (0x00001010, 0x00028067, 'jr      t0', ''),
+]
+
+
+def parse_size(text):
+    """'10k' -> 10000, '1m' -> 1000000"""
+    text = text.strip().lower()
+    scale = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * scale)
+
+
+def format_size(lines):
+    for scale, suffix in ((1000000, 'm'), (1000, 'k')):
+        if lines >= scale and lines % scale == 0:
+            return f"{lines // scale}{suffix}"
+    return str(lines)
+
+
+#==============================================================================
+# Synthetic input generators
+#==============================================================================
+
+def _program(rng, size=4096):
+    """Static program image: (kind, insn, rd, mnemonic) per instruction slot"""
+    program = []
+    for _ in range(size):
+        kind = rng.choices(('alu', 'load', 'store', 'branch', 'csr'), (60, 15, 10, 14, 1))[0]
+        rd = rng.randrange(1, 32)
+        rs = rng.randrange(1, 32)
+        if kind == 'alu':
+            insn = (rng.randrange(1 << 12) << 20) | (rs << 15) | (rd << 7) | 0x13
+            text = f"addi    x{rd}, x{rs}, {insn >> 20}"
+        elif kind == 'load':
+            insn = (rs << 15) | (0b010 << 12) | (rd << 7) | 0x03
+            text = f"lw      x{rd}, 0(x{rs})"
+        elif kind == 'store':
+            insn = (rd << 20) | (rs << 15) | (0b010 << 12) | 0x23
+            text = f"sw      x{rd}, 0(x{rs})"
+        elif kind == 'branch':
+            insn = (rd << 20) | (rs << 15) | 0x63
+            text = f"beq     x{rs}, x{rd}, pc + 0"
+        else:
+            insn = (0x305 << 20) | (rs << 15) | (0b001 << 12) | 0x73
+            text = f"csrw    mtvec, x{rs}"
+        program.append((kind, insn, rd, text))
+    return program
+
+
+def iter_commits(count, seed=1):
+    """
+    Synthetic commit stream
+
+    Yields:
+        tuple: (pc, insn, mnemonic, core_suffix, spike_suffix) where the
+               suffixes are the register/memory part of the tracer and Spike
+               lines (Spike adds CSR writes)
+    """
+    rng = random.Random(seed)
+    program = _program(rng)
+    base = 0x80000000
+    slot = 0
+    for _ in range(count):
+        kind, insn, rd, text = program[slot]
+        pc = base + 4 * slot
+        value = rng.getrandbits(32)
+        address = 0x80010000 + 4 * rng.randrange(0x4000)
+        if kind == 'alu':
+            core = spike = f" x{rd:<2} 0x{value:08x}"
+        elif kind == 'load':
+            core = spike = f" x{rd:<2} 0x{value:08x} mem 0x{address:08x}"
+        elif kind == 'store':
+            core = spike = f" mem 0x{address:08x} 0x{value:08x}"
+        elif kind == 'csr':
+            core, spike = '', f" c773_mtvec 0x{value:08x}"
+        else:
+            core = spike = ''
+        yield pc, insn, text, core, spike
+
+        if kind == 'branch' and rng.random() < 0.5:
+            slot = max(0, slot - rng.randrange(1, 64))
+        else:
+            slot = (slot + 1) % len(program)
+
+
+def _write_lines(path, lines):
+    """Write an iterable of lines in batches"""
+    with open(path, 'w', newline='\n') as f:
+        batch = []
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= WRITE_BATCH:
+                f.write('\n'.join(batch) + '\n')
+                batch = []
+        if batch:
+            f.write('\n'.join(batch) + '\n')
+
+
+def generate_core_trace(path, lines, seed=1):
+    """tracer_3port.sv commit trace"""
+    _write_lines(path, (f"0x{pc:08x} (0x{insn:08x}){core}"
+                        for pc, insn, _, core, _ in iter_commits(lines, seed)))
+
+
+def generate_spike_trace(path, lines, seed=1):
+    """Filtered Spike trace of the same program: boot ROM, CSR writes, a few divergences"""
+    def spike_lines():
+        for pc, insn, _, suffix in BOOT_ROM:
+            yield f"0x{pc:08x} (0x{insn:08x}){suffix}"
+        for i, (pc, insn, _, _, spike) in enumerate(iter_commits(lines - len(BOOT_ROM), seed)):
+            if i % DIVERGENCE_EVERY == DIVERGENCE_EVERY - 1 and spike.startswith(' x'):
+                spike = spike[:-1] + ('0' if spike[-1] != '0' else '1')
+            yield f"0x{pc:08x} (0x{insn:08x}){spike}"
+    _write_lines(path, spike_lines())
+
+
+def generate_raw_spike_log(path, lines, seed=1):
+    """Unfiltered Spike log: a disassembly line and a commit line per instruction"""
+    def raw_lines():
+        program = ((pc, insn, text, spike) for pc, insn, text, _, spike in
+                   iter_commits(max(0, lines // 2 - len(BOOT_ROM)), seed))
+        for pc, insn, text, suffix in chain(BOOT_ROM, program):
+            yield f"core   0: 0x{pc:08x} (0x{insn:08x}) {text}"
+            yield f"core   0: 3 0x{pc:08x} (0x{insn:08x}){suffix}"
+    _write_lines(path, raw_lines())
+
+
+def _split(total, parts, rng):
+    """Random split of total into parts non-negative counts"""
+    cuts = sorted(rng.randrange(total + 1) for _ in range(parts - 1))
+    return [high - low for low, high in zip([0] + cuts, cuts + [total])]
+
+
+def _perf_block(cycle, rng, counters):
+    """
+    One CYCLE N REPORT block as written by pipeline_performance_analyzer.sv
+
+    Args:
+        counters (list): Per RS stall counters (mispredict, ROB, LSQ, buffer
+                         empty, both, only A, only B, CDB0-3 of A, CDB0-3 of
+                         B); they count from reset like the analyzer's and
+                         grow by the stalls of the last 1000 cycles
+    """
+    lines = ["", "========================================", f"CYCLE {cycle} REPORT",
+             "========================================", "",
+             "Instruction Mix Analysis (Last 1000 cycles):"]
+    branches = rng.randrange(50, 200)
+    lines += [f"  Commits:       {rng.randrange(800, 2400)}",
+              f"  Branches:      {branches}",
+              f"  Mispredicts:   {rng.randrange(0, branches // 4)}",
+              f"  Load/Stores:   {rng.randrange(100, 500)}", ""]
+    for rs, counts in enumerate(counters):
+        step = _split(rng.randrange(200, 800), 7, rng)
+        step += _split(step[4] + step[5], 4, rng) + _split(step[4] + step[6], 4, rng)
+        counts[:] = [total + added for total, added in zip(counts, step)]
+        mispred, rob, lsq, buffer_empty, both, only_a, only_b = counts[:7]
+        decode = rob + lsq
+        prev_stage = decode + buffer_empty
+        not_occupied = mispred + prev_stage
+        operands = both + only_a + only_b
+        stall = not_occupied + operands
+
+        def pct(part, whole):
+            return f"{part * 100.0 / whole:.1f}" if whole else "-nan"
+
+        lines += [f"RS{rs} (Pipeline {rs}) Analysis:",
+                  f"RS{rs} Stall:      {stall} cycles ({pct(stall, cycle)}%)",
+                  f"  Not Occupied:      {not_occupied} cycles ({pct(not_occupied, stall)}%)",
+                  f"    Misprediction Penalty: {mispred} ({pct(mispred, not_occupied)}%)",
+                  f"    Previous Stage Bottleneck: {prev_stage} ({pct(prev_stage, not_occupied)}%)",
+                  f"      Decode Not Ready: {decode} ({pct(decode, prev_stage)}%)",
+                  f"        ROB Full: {rob} ({pct(rob, decode)}%)",
+                  f"        LSQ Full: {lsq} ({pct(lsq, decode)}%)",
+                  f"      Instruction Buffer Empty: {buffer_empty} ({pct(buffer_empty, prev_stage)}%)",
+                  f"  Operands Not Ready: {operands} cycles ({pct(operands, stall)}%)",
+                  "    Dependency Pattern:",
+                  f"      Both waiting:   {both} ({pct(both, operands)}%)",
+                  f"      Only A waiting: {only_a} ({pct(only_a, operands)}%)",
+                  f"      Only B waiting: {only_b} ({pct(only_b, operands)}%)"]
+        for operand, waiting, cdb_counts in (('A', both + only_a, counts[7:11]),
+                                             ('B', both + only_b, counts[11:15])):
+            lines.append(f"    Operand {operand} waiting for:")
+            lines += [f"      CDB{cdb}: {count} ({pct(count, waiting)}%)"
+                      for cdb, count in enumerate(cdb_counts)]
+        lines.append("")
+    return lines
+
+
+def generate_perf_log(path, lines, seed=1):
+    """pipeline_performance_analyzer.sv log with about `lines` lines"""
+    rng = random.Random(seed)
+
+    def log_lines():
+        header = ["========================================", "Pipeline Performance Analyzer",
+                  "Focus: Why is issue_valid = 0?", "========================================", ""]
+        yield from header
+        written = len(header)
+        cycle = 1000
+        counters = [[0] * 15 for _ in range(3)]
+        while written < lines:
+            block = _perf_block(cycle, rng, counters)
+            yield from block
+            written += len(block)
+            cycle += 1000
+    _write_lines(path, log_lines())
+
+
+def generate_assembly(path, lines, seed=1):
+    """riscv-dv style assembly with region_N data sections of .word directives"""
+    rng = random.Random(seed)
+
+    def asm_lines():
+        yield ".section .text.init"
+        yield "main:"
+        written = 2
+        region = 0
+        while written < lines:
+            yield f'.section .region_{region},"aw",@progbits'
+            yield f"region_{region}:"
+            written += 2
+            for _ in range(min(4096, lines - written)):
+                words = ', '.join(f"0x{rng.getrandbits(32):08x}" for _ in range(4))
+                yield f".word {words}"
+                written += 1
+            region += 1
+    _write_lines(path, asm_lines())
+
+
+#==============================================================================
+# Benchmarks (each runs in its own process)
+#==============================================================================
+
+def generate_inputs(workdir, lines):
+    """Generate every input for one size; returns {name: path}"""
+    tag = format_size(lines)
+    paths = {
+        'raw_spike': os.path.join(workdir, f'spike_raw_{tag}.log'),
+        'perf_log': os.path.join(workdir, f'performance_analysis_{tag}.log'),
+        'assembly': os.path.join(workdir, f'regions_{tag}.S'),
+        'core_trace': os.path.join(workdir, f'trace_{tag}.log'),
+        'spike_trace': os.path.join(workdir, f'spike_trace_{tag}.log'),
+    }
+    generate_raw_spike_log(paths['raw_spike'], lines)
+    generate_perf_log(paths['perf_log'], lines)
+    generate_assembly(paths['assembly'], lines)
+    generate_core_trace(paths['core_trace'], lines)
+    generate_spike_trace(paths['spike_trace'], lines)
+    return paths
+
+
+def run_benchmark(name, paths, workdir):
+    """Run one benchmark in this process; returns (seconds, input files)"""
+    if name == 'spike_filter':
+        from spike_log_filter import filter_spike_log
+        inputs = [paths['raw_spike']]
+        start = time.perf_counter()
+        filter_spike_log(paths['raw_spike'], os.path.join(workdir, 'spike_filtered.log'))
+    elif name == 'perf_parse':
+        from parse_performance_log import parse_log_to_csv
+        inputs = [paths['perf_log']]
+        start = time.perf_counter()
+        parse_log_to_csv(paths['perf_log'], paths['perf_csv'])
+    elif name == 'perf_analyze':
+        from analyze_performance import analyze_csv
+        inputs = [paths['perf_csv']]
+        start = time.perf_counter()
+        analyze_csv(paths['perf_csv'])
+    elif name == 'region_extract':
+        from region_extractor import extract_regions_from_assembly
+        inputs = [paths['assembly']]
+        start = time.perf_counter()
+        extract_regions_from_assembly(paths['assembly'])
+    elif name == 'trace_compare':
+        from trace_diff import TraceComparator
+        inputs = [paths['core_trace'], paths['spike_trace']]
+        start = time.perf_counter()
+        TraceComparator().compare(paths['core_trace'], paths['spike_trace']).render_report()
+    else:
+        raise ValueError(f"unknown benchmark '{name}'")
+    elapsed = time.perf_counter() - start
+    return elapsed, inputs
+
+
+def count_lines(path):
+    """Number of lines of a file"""
+    count = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            count += block.count(b'\n')
+    return count
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None if unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def worker_main(name, paths_json, workdir):
+    """Child process entry point: run one benchmark, print its result as JSON"""
+    paths = json.loads(paths_json)
+    with contextlib.redirect_stdout(io.StringIO()):
+        elapsed, inputs = run_benchmark(name, paths, workdir)
+    print(json.dumps({'seconds': elapsed, 'peak_rss_mb': peak_rss_mb(),
+                      'input_lines': sum(count_lines(path) for path in inputs),
+                      'input_bytes': sum(os.path.getsize(path) for path in inputs)}))
+
+
+def run_isolated(name, paths, workdir):
+    """Run one benchmark in a fresh interpreter"""
+    command = [sys.executable, os.path.abspath(__file__), '--worker', name,
+               json.dumps(paths), workdir]
+    completed = subprocess.run(command, capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip()
+                           else f"exit code {completed.returncode}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_suite(sizes, benchmarks, workdir):
+    """
+    Generate inputs and run the benchmarks for every size
+
+    Returns:
+        list: Result dicts (benchmark, size, lines, seconds, input_lines,
+              input_bytes, lines_per_second, mb_per_second, peak_rss_mb or error)
+    """
+    results = []
+    for lines in sizes:
+        size_dir = os.path.join(workdir, format_size(lines))
+        os.makedirs(size_dir, exist_ok=True)
+        print(f"Generating {format_size(lines)}-line inputs...", flush=True)
+        start = time.perf_counter()
+        paths = generate_inputs(size_dir, lines)
+        paths['perf_csv'] = os.path.join(size_dir, 'performance_stats.csv')
+        print(f"  done in {time.perf_counter() - start:.1f} s", flush=True)
+
+        if 'perf_analyze' in benchmarks and 'perf_parse' not in benchmarks:
+            from parse_performance_log import parse_log_to_csv
+            with contextlib.redirect_stdout(io.StringIO()):
+                parse_log_to_csv(paths['perf_log'], paths['perf_csv'])
+
+        for name in BENCHMARKS:
+            if name not in benchmarks:
+                continue
+            result = {'benchmark': name, 'size': format_size(lines), 'lines': lines}
+            try:
+                measured = run_isolated(name, paths, size_dir)
+            except RuntimeError as e:
+                result['error'] = str(e)
+                print(f"  {name:<16} ERROR: {e}")
+                results.append(result)
+                continue
+            seconds = measured['seconds']
+            result.update(measured)
+            result['lines_per_second'] = measured['input_lines'] / seconds if seconds > 0 else None
+            result['mb_per_second'] = (measured['input_bytes'] / (1024 * 1024) / seconds
+                                       if seconds > 0 else None)
+            results.append(result)
+            rss = f"{measured['peak_rss_mb']:.0f} MB" if measured['peak_rss_mb'] is not None else '-'
+            print(f"  {name:<16} {seconds:>9.3f} s {result['lines_per_second']:>14,.0f} lines/s "
+                  f"{result['mb_per_second']:>8.1f} MB/s  peak RSS {rss}", flush=True)
+    return results
+
+
+def find_regressions(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Benchmarks slower than a baseline result file allows
+
+    Returns:
+        list: (benchmark, size, baseline_seconds, seconds) tuples
+    """
+    previous = {(r['benchmark'], r['size']): r for r in baseline.get('results', [])
+                if 'seconds' in r}
+    regressions = []
+    for result in results:
+        before = previous.get((result['benchmark'], result['size']))
+        if (before and 'seconds' in result and
+                result['seconds'] > before['seconds'] * (1 + tolerance) and
+                result['seconds'] - before['seconds'] >= MIN_SLOWDOWN_SECONDS):
+            regressions.append((result['benchmark'], result['size'], before['seconds'], result['seconds']))
+    return regressions
+
+
+def main():
+    """Main function to handle command line arguments"""
+    if len(sys.argv) == 5 and sys.argv[1] == '--worker':
+        worker_main(*sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(description='Benchmark the trace and performance scripts')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help=f'Comma separated input sizes in lines (default: {DEFAULT_SIZES})')
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, help='Run only these benchmarks')
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT,
+                        help=f'JSON result file (default: {DEFAULT_OUTPUT})')
+    parser.add_argument('--workdir', help='Directory for generated inputs (default: a temporary one)')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated inputs')
+    parser.add_argument('--baseline', help='Previous result file to check for slowdowns')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f'Allowed slowdown against the baseline (default: {DEFAULT_TOLERANCE * 100:.0f}%%)')
+    args = parser.parse_args()
+
+    try:
+        sizes = [parse_size(size) for size in args.sizes.split(',') if size.strip()]
+    except ValueError:
+        print(f"Error: invalid --sizes '{args.sizes}'")
+        sys.exit(2)
+    benchmarks = set(args.only or BENCHMARKS)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='riscv_bench_')
+    os.makedirs(workdir, exist_ok=True)
+    start = time.perf_counter()
+    try:
+        results = run_suite(sizes, benchmarks, workdir)
+    finally:
+        if not args.keep and not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sizes': [format_size(lines) for lines in sizes],
+        'elapsed_seconds': time.perf_counter() - start,
+        'results': results,
+    }
+    try:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    except OSError as e:
+        print(f"Error writing results: {e}")
+        sys.exit(2)
+    print(f"Results saved to: {args.output}")
+
+    failed = any('error' in result for result in results)
+    if args.baseline:
+        try:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading baseline: {e}")
+            sys.exit(2)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for name, size, before, after in regressions:
+            print(f"SLOWDOWN {name} @ {size}: {before:.3f} s -> {after:.3f} s "
+                  f"({(after - before) * 100.0 / before:+.1f}%)")
+        if not regressions:
+            print(f"No slowdowns beyond {args.tolerance:.0%} against {args.baseline}")
+        failed = failed or bool(regressions)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
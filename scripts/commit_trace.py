@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Commit Trace Parser
+
+Shared parser for the textual commit trace format written by
+tracer_3port.sv (core_sim/trace.log) and by spike_log_filter.py
+(Spike _filtered.log / spike_trace.log):
+
+    0x80000004 (0x00000313) x6  0x00000000
+    0x8000012c (0x00a14b83) x23 0x000000bf mem 0x80016b04
+    0x80000128 (0xfc7109a3) mem 0x80016acd 0xb4
+    0x80000020 (0x30199073) c769_misa 0x40000100
+
+Every record is reduced to pc, insn, rd, rd value, memory address,
+memory data and a flag word, so all tools agree on one interpretation.
+"""
+
+from collections import namedtuple
+
+CommitRecord = namedtuple('CommitRecord', ['pc', 'insn', 'rd', 'rd_value',
+                                           'mem_addr', 'mem_data', 'flags'])
+
+# Flag bits
+FLAG_RD_WRITE = 0x0001      # rd/rd_value hold an integer register write
+FLAG_FP_WRITE = 0x0002      # rd/rd_value hold a floating point register write
+FLAG_LOAD = 0x0004          # mem_addr holds a load address
+FLAG_STORE = 0x0008         # mem_addr/mem_data hold a store
+FLAG_CSR_WRITE = 0x0010     # the line also carries a CSR write (cNNN_name)
+FLAG_INSN_UNKNOWN = 0x0020  # instruction word was X in simulation (0xxxxxxxxx)
+STORE_SIZE_SHIFT = 8        # bits 8-9: log2 of the store size in bytes
+STORE_SIZE_MASK = 0x0300
+
+_HEX_DIGITS_TO_SIZE = {2: 0, 4: 1, 8: 2}
+
+
+def _hex(token):
+    """Parse a 0x prefixed hex token; X/Z digits from the simulator read as 0"""
+    try:
+        return int(token, 16)
+    except ValueError:
+        return 0
+
+
+def parse_commit_line(line):
+    """
+    Parse one commit trace line
+
+    Args:
+        line (str): Trace line, with or without trailing newline
+
+    Returns:
+        CommitRecord or None if the line is not a commit record
+    """
+    tokens = line.split()
+    if len(tokens) < 2 or not tokens[0].startswith('0x') or not tokens[1].startswith('(0x'):
+        return None
+
+    pc = _hex(tokens[0])
+    insn_text = tokens[1][1:-1]
+    flags = 0
+    if 'x' in insn_text[2:] or 'X' in insn_text[2:]:
+        insn = 0
+        flags |= FLAG_INSN_UNKNOWN
+    else:
+        insn = _hex(insn_text)
+
+    rd = 0
+    rd_value = 0
+    mem_addr = 0
+    mem_data = 0
+
+    i = 2
+    count = len(tokens)
+    while i < count:
+        token = tokens[i]
+        if token == 'mem':
+            if i + 1 >= count:
+                break
+            mem_addr = _hex(tokens[i + 1])
+            # A store carries the data right after the address
+            if i + 2 < count and tokens[i + 2].startswith('0x'):
+                data = tokens[i + 2]
+                mem_data = _hex(data)
+                flags |= FLAG_STORE
+                flags |= _HEX_DIGITS_TO_SIZE.get(len(data) - 2, 2) << STORE_SIZE_SHIFT
+                i += 3
+            else:
+                flags |= FLAG_LOAD
+                i += 2
+            continue
+
+        if i + 1 < count and tokens[i + 1].startswith('0x'):
+            kind = token[0]
+            if kind in 'xf' and token[1:].isdigit():
+                if not flags & (FLAG_RD_WRITE | FLAG_FP_WRITE):
+                    rd = int(token[1:])
+                    rd_value = _hex(tokens[i + 1])
+                    flags |= FLAG_RD_WRITE if kind == 'x' else FLAG_FP_WRITE
+            elif kind == 'c':
+                flags |= FLAG_CSR_WRITE
+            i += 2
+            continue
+        i += 1
+
+    return CommitRecord(pc, insn, rd, rd_value, mem_addr, mem_data, flags)
+
+
+def store_size(flags):
+    """Store size in bytes encoded in a record's flag word"""
+    return 1 << ((flags & STORE_SIZE_MASK) >> STORE_SIZE_SHIFT)
+
+
+def format_commit_record(record):
+    """
+    Render a record back into the tracer_3port.sv text format
+
+    CSR writes are not part of the record and are therefore not rendered.
+    """
+    pc, insn, rd, rd_value, mem_addr, mem_data, flags = record
+    if flags & FLAG_INSN_UNKNOWN:
+        text = f"0x{pc:08x} (0xxxxxxxxx)"
+    else:
+        text = f"0x{pc:08x} (0x{insn:08x})"
+
+    if flags & FLAG_STORE:
+        width = store_size(flags) * 2
+        return text + f" mem 0x{mem_addr:08x} 0x{mem_data:0{width}x}"
+
+    if flags & (FLAG_RD_WRITE | FLAG_FP_WRITE):
+        kind = 'x' if flags & FLAG_RD_WRITE else 'f'
+        spacing = ' ' if rd > 9 else '  '
+        text += f" {kind}{rd}{spacing}0x{rd_value:08x}"
+    if flags & FLAG_LOAD:
+        text += f" mem 0x{mem_addr:08x}"
+    return text
+
+
+def iter_commit_records(trace_file):
+    """
+    Stream CommitRecords from a textual trace file
+
+    Yields:
+        CommitRecord: One record per commit line (other lines are skipped)
+    """
+    with open(trace_file, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            record = parse_commit_line(line)
+            if record is not None:
+                yield record
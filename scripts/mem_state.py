@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Memory State Reconstruction and Load Checking
+
+Replays the stores (mem 0xADDR 0xDATA) of a core or Spike commit trace
+into a sparse, page-based memory image and checks every load against it:
+the value a load writes back (xN/fN 0xDATA mem 0xADDR) must agree with the
+bytes of the last stores to its address. This needs the core trace only,
+so store-to-load forwarding bugs in lsq_simple_top show up in one pass
+without running Spike.
+
+    MemoryImage     4 KiB pages of data plus the commit of the last store
+                    to every byte (-1: never stored)
+    MemoryHistory   store log indexed by word, for "value at address A
+                    after commit k" queries (bisection per byte)
+    LoadChecker     streaming load-vs-last-store check
+
+Store sizes come from the width of the data field (0x%2h/0x%4h/0x%8h in
+tracer_3port.sv), load sizes and sign extension from the instruction.
+Bytes that were never stored (program image, device registers) are not
+checked; a load that only partly covers stored bytes is checked on those
+byte lanes.
+
+Usage:
+    python mem_state.py core_sim/trace.log
+    python mem_state.py core_sim/trace.log --at 0x80016b04 1500
+"""
+
+import argparse
+import sys
+from array import array
+from bisect import bisect_right
+from typing import NamedTuple
+
+from commit_trace import (FLAG_FP_WRITE, FLAG_INSN_UNKNOWN, FLAG_LOAD, FLAG_RD_WRITE,
+                          FLAG_STORE, parse_commit_line, store_size)
+
+PAGE_BITS = 12
+PAGE_SIZE = 1 << PAGE_BITS
+PAGE_MASK = PAGE_SIZE - 1
+
+# Mismatches listed by the command line tool
+MAX_REPORTED = 50
+
+# funct3 of LOAD (0x03) -> (size, signed); FLW (LOAD-FP 0x07) is a word
+_LOAD_FUNCT3 = {0: (1, True), 1: (2, True), 2: (4, True), 4: (1, False), 5: (2, False)}
+
+
+def load_width(insn):
+    """
+    Access size and sign extension of a load instruction
+
+    Returns:
+        tuple: (size in bytes, signed) or None if insn is not a known load
+    """
+    if insn & 0x3 != 0x3:
+        # C.LW/C.FLW (quadrant 0) and C.LWSP/C.FLWSP (quadrant 2)
+        if insn & 0x3 in (0, 2) and (insn >> 13) & 0x7 in (2, 3):
+            return 4, True
+        return None
+    opcode = insn & 0x7F
+    funct3 = (insn >> 12) & 0x7
+    if opcode == 0x03:
+        return _LOAD_FUNCT3.get(funct3)
+    if opcode == 0x07 and funct3 == 2:
+        return 4, True
+    return None
+
+
+def sign_extend(value, size):
+    """Sign-extend a size-byte value to 32 bits"""
+    bits = size * 8
+    if bits < 32 and value >> (bits - 1) & 1:
+        value |= (0xFFFFFFFF << bits) & 0xFFFFFFFF
+    return value
+
+
+class MemoryImage:
+    """Sparse byte-addressed memory built from stores, allocated per page"""
+
+    def __init__(self):
+        self.pages = {}    # page number -> bytearray(PAGE_SIZE)
+        self.writers = {}  # page number -> array('q'), last store commit per byte
+
+    def _page(self, number):
+        page = self.pages.get(number)
+        if page is None:
+            page = self.pages[number] = bytearray(PAGE_SIZE)
+            self.writers[number] = array('q', [-1]) * PAGE_SIZE
+        return page
+
+    def store(self, addr, data, size, commit):
+        """Write the low size bytes of data (little endian) at addr"""
+        offset = addr & PAGE_MASK
+        if offset + size <= PAGE_SIZE:
+            number = addr >> PAGE_BITS
+            self._page(number)[offset:offset + size] = data.to_bytes(size, 'little')
+            self.writers[number][offset:offset + size] = array('q', [commit]) * size
+            return
+        for k in range(size):
+            self.store((addr + k) & 0xFFFFFFFF, (data >> (8 * k)) & 0xFF, 1, commit)
+
+    def load(self, addr, size):
+        """
+        Read size bytes at addr
+
+        Returns:
+            tuple: (value, known lane mask, last store commit or -1); bytes
+                   never stored read as 0 and are left out of the mask
+        """
+        offset = addr & PAGE_MASK
+        if offset + size <= PAGE_SIZE:
+            number = addr >> PAGE_BITS
+            writers = self.writers.get(number)
+            if writers is None:
+                return 0, 0, -1
+            lanes = writers[offset:offset + size]
+            last = max(lanes)
+            if last < 0:
+                return 0, 0, -1
+            # Bytes never stored are still zero in the page
+            value = int.from_bytes(self.pages[number][offset:offset + size], 'little')
+            if min(lanes) >= 0:
+                return value, (1 << (8 * size)) - 1, last
+            known = 0
+            for k, writer in enumerate(lanes):
+                if writer >= 0:
+                    known |= 0xFF << (8 * k)
+            return value, known, last
+
+        value = 0
+        known = 0
+        last = -1
+        for k in range(size):
+            a = (addr + k) & 0xFFFFFFFF
+            number = a >> PAGE_BITS
+            writers = self.writers.get(number)
+            if writers is None:
+                continue
+            writer = writers[a & PAGE_MASK]
+            if writer >= 0:
+                value |= self.pages[number][a & PAGE_MASK] << (8 * k)
+                known |= 0xFF << (8 * k)
+                last = max(last, writer)
+        return value, known, last
+
+    def page_count(self):
+        return len(self.pages)
+
+
+class MemoryHistory:
+    """
+    Every store of a trace, indexed by 32-bit word
+
+    Commit indices are 0-based positions in the sequence of commit lines,
+    as in arch_state.RegisterHistory; state "after" commit k includes its
+    store.
+    """
+
+    def __init__(self, lines):
+        self.store_commit = array('q')
+        self.store_addr = array('I')
+        self.store_data = array('I')
+        self.store_size = array('B')
+        self.word_stores = {}  # word address >> 2 -> array('q') of store indices
+        for commit, line in enumerate(lines):
+            if ' mem ' not in line:
+                continue
+            access = memory_access(line)
+            if access is None or access[0] != 'store':
+                continue
+            _, _, addr, data, size = access
+            index = len(self.store_commit)
+            self.store_commit.append(commit)
+            self.store_addr.append(addr)
+            self.store_data.append(data)
+            self.store_size.append(size)
+            first = addr >> 2
+            last = ((addr + size - 1) & 0xFFFFFFFF) >> 2
+            for word in {first, last}:
+                self.word_stores.setdefault(word, array('q')).append(index)
+
+    def __len__(self):
+        return len(self.store_commit)
+
+    def byte_at(self, addr, commit):
+        """
+        Byte at addr after commit
+
+        Returns:
+            tuple: (byte value, store commit) or None if never stored
+        """
+        stores = self.word_stores.get(addr >> 2)
+        if not stores:
+            return None
+        limit = bisect_right(self.store_commit, commit)  # stores up to commit
+        for i in range(bisect_right(stores, limit - 1) - 1, -1, -1):
+            index = stores[i]
+            lane = (addr - self.store_addr[index]) & 0xFFFFFFFF
+            if lane < self.store_size[index]:
+                return (self.store_data[index] >> (8 * lane)) & 0xFF, self.store_commit[index]
+        return None
+
+    def value_at(self, addr, commit, size=4):
+        """
+        Little-endian value of size bytes at addr after commit
+
+        Returns:
+            tuple: (value, known lane mask); unknown bytes read as 0
+        """
+        value = 0
+        known = 0
+        for k in range(size):
+            found = self.byte_at((addr + k) & 0xFFFFFFFF, commit)
+            if found is not None:
+                value |= found[0] << (8 * k)
+                known |= 0xFF << (8 * k)
+        return value, known
+
+
+def memory_access(line):
+    """
+    Memory access of a commit line
+
+    Returns:
+        tuple: ('store', pc, addr, data, size), ('load', pc, addr, value,
+               insn or None) or None. insn is None when it was X; value is
+               None for loads without a write-back (rd = x0).
+    """
+    tokens = line.split()
+    count = len(tokens)
+    try:
+        if count == 5 and tokens[2] == 'mem':
+            data = tokens[4]
+            if len(data) - 2 in (2, 4, 8):
+                return 'store', int(tokens[0], 16), int(tokens[3], 16), int(data, 16), (len(data) - 2) // 2
+        elif count == 6 and tokens[4] == 'mem' and tokens[2][0] in 'xf':
+            insn = tokens[1][1:-1]
+            return ('load', int(tokens[0], 16), int(tokens[5], 16), int(tokens[3], 16),
+                    int(insn, 16) if 'x' not in insn[2:] else None)
+    except ValueError:
+        pass  # X/Z digits: let the full parser read them as 0
+
+    record = parse_commit_line(line)
+    if record is None:
+        return None
+    flags = record.flags
+    if flags & FLAG_STORE:
+        return 'store', record.pc, record.mem_addr, record.mem_data, store_size(flags)
+    if flags & FLAG_LOAD:
+        insn = None if flags & FLAG_INSN_UNKNOWN else record.insn
+        value = record.rd_value if flags & (FLAG_RD_WRITE | FLAG_FP_WRITE) else None
+        return 'load', record.pc, record.mem_addr, value, insn
+    return None
+
+
+class LoadMismatch(NamedTuple):
+    """A load whose written-back value disagrees with the stored bytes"""
+    commit: int        # 0-based commit index of the load
+    pc: int
+    addr: int
+    size: int
+    value: int         # value written back by the load
+    expected: int      # value rebuilt from the stores (unknown bytes 0)
+    known: int         # byte lanes covered by earlier stores
+    store_commit: int  # commit of the youngest store involved
+
+
+class LoadChecker:
+    """
+    Streaming store replay and load check over one trace
+
+    Usage:
+        checker = LoadChecker()
+        for mismatch in checker.check(lines): ...
+        checker.loads, checker.checked, checker.stores
+    """
+
+    def __init__(self):
+        self.memory = MemoryImage()
+        self.stores = 0
+        self.loads = 0
+        self.checked = 0    # loads that read at least one stored byte
+        self.unknown = 0    # loads with an X or unrecognized instruction
+        self.mismatches = 0
+
+    def check(self, lines):
+        """
+        Replay the stores of lines and check their loads
+
+        Yields:
+            LoadMismatch: One per inconsistent load, in commit order
+        """
+        memory = self.memory
+        for commit, line in enumerate(lines):
+            if ' mem ' not in line:
+                continue
+            access = memory_access(line)
+            if access is None:
+                continue
+            kind, pc, addr, data, extra = access
+            if kind == 'store':
+                self.stores += 1
+                memory.store(addr, data, extra, commit)
+                continue
+            self.loads += 1
+            width = None if extra is None else load_width(extra)
+            if width is None or data is None:
+                # Loads to x0 print no write-back value
+                self.unknown += width is None
+                continue
+
+            size, signed = width
+            raw, known, last = memory.load(addr, size)
+            if not known:
+                continue
+            self.checked += 1
+            loaded = data & 0xFFFFFFFF
+            if known == (1 << (8 * size)) - 1:
+                # Whole access known: compare the extended register value
+                expected = sign_extend(raw, size) if signed else raw
+                ok = loaded == expected
+            else:
+                expected = raw
+                ok = loaded & known == raw
+            if not ok:
+                self.mismatches += 1
+                yield LoadMismatch(commit, pc, addr, size, loaded,
+                                   expected, known, last)
+
+
+def format_mismatch(mismatch):
+    """One-line description of a LoadMismatch (commits 1-based)"""
+    width = mismatch.size * 2
+    lanes = '' if mismatch.known == (1 << (8 * mismatch.size)) - 1 else f" (lanes 0x{mismatch.known:0{width}x})"
+    return (f"#{mismatch.commit + 1:<10,} pc 0x{mismatch.pc:08x}  load {mismatch.size}B "
+            f"@0x{mismatch.addr:08x}: got 0x{mismatch.value:08x}, stored 0x{mismatch.expected:08x}"
+            f"{lanes} by #{mismatch.store_commit + 1:,}")
+
+
+def parse_int(text):
+    """Integer from decimal or 0x-prefixed text (argparse type)"""
+    return int(text, 0)
+
+
+def main():
+    """Main function to handle command line arguments"""
+    parser = argparse.ArgumentParser(description='Check loads against replayed stores in a commit trace')
+    parser.add_argument('log_file', help='Core trace or Spike trace')
+    parser.add_argument('--at', nargs=2, metavar=('ADDR', 'COMMIT'), type=parse_int,
+                        help='Show the word at ADDR after COMMIT (1-based) instead')
+    parser.add_argument('--max', type=int, default=MAX_REPORTED,
+                        help='Mismatches listed (default: %(default)s)')
+    args = parser.parse_args()
+
+    from trace_diff import iter_commit_lines
+
+    try:
+        if args.at:
+            addr, commit = args.at
+            history = MemoryHistory(iter_commit_lines(args.log_file))
+            value, known = history.value_at(addr, commit - 1)
+            print(f"File: {args.log_file}")
+            print(f"Stores: {len(history):,}")
+            if not known:
+                print(f"0x{addr:08x} after commit #{commit:,}: never stored")
+            else:
+                text = ''.join(f"{(value >> (8 * k)) & 0xFF:02x}" if known >> (8 * k) & 0xFF else '??'
+                               for k in range(3, -1, -1))
+                print(f"0x{addr:08x} after commit #{commit:,}: 0x{text}")
+            return
+
+        checker = LoadChecker()
+        print(f"File: {args.log_file}")
+        print("Load mismatches:")
+        for mismatch in checker.check(iter_commit_lines(args.log_file)):
+            if checker.mismatches <= args.max:
+                print(f"  {format_mismatch(mismatch)}")
+    except OSError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if checker.mismatches > args.max:
+        print(f"  ... {checker.mismatches - args.max:,} more")
+    print(f"Stores: {checker.stores:,} ({checker.memory.page_count()} pages)")
+    print(f"Loads: {checker.loads:,} ({checker.checked:,} checked against stores, "
+          f"{checker.unknown:,} unknown instructions)")
+    print(f"Mismatches: {checker.mismatches:,}")
+    sys.exit(1 if checker.mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,178 @@ import csv
 import os
 import argparse
 import sys
+import time
+from collections import deque
+
+# Reservation stations reported by pipeline_performance_analyzer.sv (3-pipe core)
+RS_COUNT = 3
+
+# Instruction Mix satirlari -> CSV sutunu
+MIX_FIELDS = {
+    'Commits': 'Commits',
+    'Branches': 'Branches',
+    'Mispredicts': 'Mispredicts',
+    'Load/Stores': 'Load_Stores',
+}
+
+# RS bolumu satirlari -> CSV sutun eki (RSn_<ek>)
+RS_FIELDS = {
+    'Not Occupied': 'Not_Occupied',
+    'Misprediction Penalty': 'Mispred_Penalty',
+    'Previous Stage Bottleneck': 'Prev_Stage_Bottleneck',
+    'Decode Not Ready': 'Decode_Not_Ready',
+    'ROB Full': 'ROB_Full',
+    'LSQ Full': 'LSQ_Full',
+    'Instruction Buffer Empty': 'Buffer_Empty',
+    'Operands Not Ready': 'Operands_Not_Ready',
+    'Both waiting': 'Both_Waiting',
+    'Only A waiting': 'Only_A_Waiting',
+    'Only B waiting': 'Only_B_Waiting',
+}
+
+CDB_FIELDS = ('CDB0', 'CDB1', 'CDB2', 'CDB3')
+
+# Follow modu: dosya yoklama araligi (s) ve hareketli ortalama penceresi (rapor)
+FOLLOW_INTERVAL = 0.5
+ROLLING_REPORTS = 10
+
+# Dashboard'da gosterilen RS stall nedenleri (sutun eki, kisa ad)
+STALL_REASONS = (
+    ('ROB_Full', 'ROB'),
+    ('LSQ_Full', 'LSQ'),
+    ('Buffer_Empty', 'IBuf'),
+    ('Mispred_Penalty', 'Mispred'),
+    ('Operands_Not_Ready', 'Operand'),
+)
+
+
+def rs_columns(rs):
+    """CSV columns of one reservation station, in report order"""
+    columns = [f'RS{rs}_Stall'] + [f'RS{rs}_{suffix}' for suffix in RS_FIELDS.values()]
+    for operand in ('A', 'B'):
+        columns.extend(f'RS{rs}_{operand}_Wait_{cdb}' for cdb in CDB_FIELDS)
+    return columns
+
+
+# Sabit CSV semasi: eski sutunlar ayni sirada, ardindan RS metrikleri
+CSV_COLUMNS = ['Cycle', 'Commits', 'Branches', 'Mispredicts', 'Load_Stores', 'Mispred_Rate_Percent']
+for _rs in range(RS_COUNT):
+    CSV_COLUMNS.extend(rs_columns(_rs))
+COLUMN_INDEX = {name: i for i, name in enumerate(CSV_COLUMNS)}
+MISPRED_RATE_INDEX = COLUMN_INDEX['Mispred_Rate_Percent']
+
+def _section_fields():
+    """(rs, operand) -> {line label: column index}; None is the Instruction Mix section"""
+    sections = {None: {label: COLUMN_INDEX[column] for label, column in MIX_FIELDS.items()}}
+    for rs in range(RS_COUNT):
+        fields = {f'RS{rs} Stall': COLUMN_INDEX[f'RS{rs}_Stall']}
+        fields.update((label, COLUMN_INDEX[f'RS{rs}_{suffix}']) for label, suffix in RS_FIELDS.items())
+        sections[(rs, None)] = fields
+        for operand in ('A', 'B'):
+            operand_fields = dict(fields)
+            operand_fields.update((cdb, COLUMN_INDEX[f'RS{rs}_{operand}_Wait_{cdb}']) for cdb in CDB_FIELDS)
+            sections[(rs, operand)] = operand_fields
+    return sections
+
+
+_SECTION_FIELDS = _section_fields()
+
+_CYCLE_RE = re.compile(r'CYCLE (\d+) REPORT')
+_RS_HEADER_RE = re.compile(r'RS(\d+) \(Pipeline \d+\) Analysis$')
+_OPERAND_RE = re.compile(r'Operand ([AB]) waiting for$')
+
+
+class PerformanceLogParser:
+    """
+    Streaming, line-oriented parser for performance_analysis.log
+
+    Push one line at a time with feed(); a finished CYCLE N REPORT block is
+    returned as a row (list in CSV_COLUMNS order) as soon as it is complete,
+    i.e. at the blank line closing the last RS section, at the next report
+    header or at finish(). Metrics missing from a block are 0: the analyzer
+    omits sub-breakdowns whose parent count is 0.
+    """
+
+    def __init__(self):
+        self.row = None
+        self.rs = None
+        self.fields = _SECTION_FIELDS[None]
+
+    def _finish_row(self):
+        row = self.row
+        self.row = None
+        self.rs = None
+        self.fields = _SECTION_FIELDS[None]
+        if row is not None:
+            branches, mispreds = row[2], row[3]
+            # Misprediction orani ve Branch orani gibi turetilmis veriler de ekleyelim
+            mispred_rate = (mispreds / branches * 100.0) if branches > 0 else 0.0
+            row[MISPRED_RATE_INDEX] = f"{mispred_rate:.2f}"
+        return row
+
+    def feed(self, line):
+        """
+        Parse one log line
+
+        Returns:
+            list: A completed row, or None
+        """
+        label, colon, value = line.strip().partition(':')
+        if colon:
+            if self.row is None:
+                return None
+            index = self.fields.get(label)
+            if index is not None:
+                try:
+                    self.row[index] = int(value.split(None, 1)[0])
+                except (IndexError, ValueError):
+                    pass
+                return None
+            if value:
+                return None
+            # Section headers: "RS0 (Pipeline 0) Analysis:", "Operand A waiting for:"
+            match = _OPERAND_RE.match(label)
+            if match and self.rs is not None:
+                self.fields = _SECTION_FIELDS[(self.rs, match.group(1))]
+                return None
+            match = _RS_HEADER_RE.match(label)
+            if match and (int(match.group(1)), None) in _SECTION_FIELDS:
+                self.rs = int(match.group(1))
+                self.fields = _SECTION_FIELDS[(self.rs, None)]
+            return None
+
+        if not label:
+            # The last RS section of a report ends with a blank line
+            if self.row is not None and self.rs == RS_COUNT - 1:
+                return self._finish_row()
+            return None
+        if 'CYCLE ' in label:
+            match = _CYCLE_RE.search(label)
+            if match:
+                finished = self._finish_row()
+                self.row = [0] * len(CSV_COLUMNS)
+                self.row[0] = int(match.group(1))
+                return finished
+        elif label == 'FINAL REPORT':
+            return self._finish_row()
+        return None
+
+    def finish(self):
+        """End of input: the row of an unfinished report block, or None"""
+        return self._finish_row()
+
+
+def iter_performance_rows(lines):
+    """Yield one row (list in CSV_COLUMNS order) per report block of an iterable of lines"""
+    parser = PerformanceLogParser()
+    for line in lines:
+        row = parser.feed(line)
+        if row is not None:
+            yield row
+    row = parser.finish()
+    if row is not None:
+        yield row
+
 
 def parse_log_to_csv(log_file_path, output_csv_path):
     if not os.path.exists(log_file_path):
@@ -11,59 +183,219 @@ def parse_log_to_csv(log_file_path, output_csv_path):
         return
 
     print(f"Log dosyasi okunuyor: {log_file_path}")
-    
-    with open(log_file_path, 'r') as f:
-        content = f.read()
 
-    # Regex pattern to find Cycle and Instruction Mix data
-    # We use re.DOTALL to allow . to match newlines
-    pattern = r"CYCLE (\d+) REPORT.*?Instruction Mix Analysis.*?Commits:\s+(\d+).*?Branches:\s+(\d+).*?Mispredicts:\s+(\d+).*?Load/Stores:\s+(\d+)"
-    
-    matches = re.finditer(pattern, content, re.DOTALL)
-    
-    data_rows = []
-    
-    for match in matches:
-        cycle = int(match.group(1))
-        commits = int(match.group(2))
-        branches = int(match.group(3))
-        mispreds = int(match.group(4))
-        ls = int(match.group(5))
-        
-        # Misprediction orani ve Branch orani gibi turetilmis veriler de ekleyelim
-        mispred_rate = (mispreds / branches * 100.0) if branches > 0 else 0.0
-        
-        data_rows.append({
-            'Cycle': cycle,
-            'Commits': commits,
-            'Branches': branches,
-            'Mispredicts': mispreds,
-            'Load_Stores': ls,
-            'Mispred_Rate_Percent': f"{mispred_rate:.2f}"
-        })
-
-    if not data_rows:
+    # Log satir satir tek geciste okunur; her rapor blogu tamamlandiginda
+    # CSV'ye yazilir, bellek kullanimi log boyutundan bagimsizdir
+    row_count = 0
+    try:
+        with open(log_file_path, 'r', errors='replace') as f, \
+                open(output_csv_path, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(CSV_COLUMNS)
+            for row in iter_performance_rows(f):
+                writer.writerow(row)
+                row_count += 1
+    except Exception as e:
+        print(f"Dosya yazma hatasi: {e}")
+        return
+
+    if not row_count:
+        os.remove(output_csv_path)
         print("Log dosyasinda uygun formatta veri bulunamadi.")
         return
 
-    print(f"Toplam {len(data_rows)} veri noktasi bulundu.")
-    
-    # CSV dosyasina yaz
-    fieldnames = ['Cycle', 'Commits', 'Branches', 'Mispredicts', 'Load_Stores', 'Mispred_Rate_Percent']
-    
+    print(f"Toplam {row_count} veri noktasi bulundu.")
+    print(f"Basarili! Veriler suraya yazildi: {os.path.abspath(output_csv_path)}")
+    print("Bu dosyayi Excel ile acabilirsiniz.")
+
+def parse_log_to_columnar(log_file_path, output_path):
+    """
+    Parse a log into a typed columnar file (.parquet, .arrow/.feather, .npz)
+
+    Falls back to .npz when pyarrow is not installed.
+    """
+    from perf_columns import rows_to_columns, write_columns
+
+    if not os.path.exists(log_file_path):
+        print(f"Hata: Log dosyasi bulunamadi: {log_file_path}")
+        print("Lutfen simulasyonu calistirdiginizdan ve dosya yolunun dogru oldugundan emin olun.")
+        return
+
+    print(f"Log dosyasi okunuyor: {log_file_path}")
+    with open(log_file_path, 'r', errors='replace') as f:
+        rows = list(iter_performance_rows(f))
+    if not rows:
+        print("Log dosyasinda uygun formatta veri bulunamadi.")
+        return
+
+    print(f"Toplam {len(rows)} veri noktasi bulundu.")
     try:
-        with open(output_csv_path, 'w', newline='') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            
-            writer.writeheader()
-            for row in data_rows:
-                writer.writerow(row)
-                
-        print(f"Basarili! Veriler suraya yazildi: {os.path.abspath(output_csv_path)}")
-        print("Bu dosyayi Excel ile acabilirsiniz.")
-        
+        written = write_columns(rows_to_columns(CSV_COLUMNS, rows), output_path)
     except Exception as e:
         print(f"Dosya yazma hatasi: {e}")
+        return
+    if written != output_path:
+        print("pyarrow bulunamadi, NumPy .npz formatina geciliyor.")
+    print(f"Basarili! Veriler suraya yazildi: {os.path.abspath(written)}")
+
+
+def follow_lines(log_file_path, interval=FOLLOW_INTERVAL):
+    """
+    Yield complete lines of a growing log (like tail -f)
+
+    Waits for the file to appear. A partially written last line is held back
+    until its newline arrives. If the file is truncated (a new simulation
+    started) None is yielded and reading restarts from the beginning.
+    """
+    f = None
+    pending = ''
+    try:
+        while True:
+            if f is None:
+                try:
+                    f = open(log_file_path, 'r', errors='replace')
+                except FileNotFoundError:
+                    time.sleep(interval)
+                    continue
+
+            line = f.readline()
+            if line:
+                pending += line
+                if pending.endswith('\n'):
+                    yield pending
+                    pending = ''
+                continue
+
+            try:
+                truncated = os.path.getsize(log_file_path) < f.tell()
+            except OSError:
+                truncated = False
+            if truncated:
+                f.close()
+                f = None
+                pending = ''
+                yield None
+                continue
+            time.sleep(interval)
+    finally:
+        if f is not None:
+            f.close()
+
+
+def format_dashboard_row(row, previous, ipc_history):
+    """
+    One dashboard line for a finished report block
+
+    RS counters in the log are cumulative, so stall reasons are computed
+    from the difference to the previous block (the last report window).
+
+    Args:
+        row (list): Row in CSV_COLUMNS order
+        previous (list): Previous row, or None
+        ipc_history (deque): Recent IPC values, updated in place
+    """
+    cycle = row[0]
+    window = cycle - previous[0] if previous else cycle
+    ipc = row[1] / window if window > 0 else 0.0
+    ipc_history.append(ipc)
+    rolling_ipc = sum(ipc_history) / len(ipc_history)
+
+    parts = [f"{cycle:>10} {ipc:>6.3f} {rolling_ipc:>8.3f} {row[MISPRED_RATE_INDEX]:>8}"]
+    for rs in range(RS_COUNT):
+        stall_index = COLUMN_INDEX[f'RS{rs}_Stall']
+        # A counter going backwards means the analyzer restarted counting
+        base = previous if previous and row[stall_index] >= previous[stall_index] else None
+
+        def delta(suffix):
+            index = COLUMN_INDEX[f'RS{rs}_{suffix}']
+            return row[index] - (base[index] if base else 0)
+
+        stall = delta('Stall')
+        stall_pct = stall * 100.0 / window if window > 0 else 0.0
+        reasons = [(delta(suffix), name) for suffix, name in STALL_REASONS]
+        count, name = max(reasons)
+        reason = f"{name} {count * 100.0 / stall:.0f}%" if stall > 0 and count > 0 else '-'
+        parts.append(f"{stall_pct:>5.1f}% {reason:<12}")
+    return '  '.join(parts)
+
+
+def dashboard_header():
+    columns = [f"{'Cycle':>10} {'IPC':>6} {'Avg IPC':>8} {'Mispred%':>8}"]
+    columns.extend(f"{f'RS{rs} stall':>6} {'(neden)':<12}" for rs in range(RS_COUNT))
+    return '  '.join(columns)
+
+
+def follow_log_to_csv(log_file_path, output_csv_path=None, interval=FOLLOW_INTERVAL,
+                      rolling=ROLLING_REPORTS):
+    """
+    Follow a running simulation's performance log
+
+    New CYCLE N REPORT blocks are parsed as they are written, appended to
+    the CSV (flushed per row) and shown as a dashboard line with IPC
+    (commits per cycle of the report window), its rolling average over the
+    last `rolling` reports, the misprediction rate and, per RS, the stall
+    share of the window with its dominant reason. Stops at FINAL REPORT or
+    Ctrl+C.
+    """
+    print(f"Log dosyasi izleniyor: {log_file_path} (Ctrl+C ile durdurun)")
+    if not os.path.exists(log_file_path):
+        print("Log dosyasi henuz yok, olusturulmasi bekleniyor...")
+
+    csvfile = None
+    writer = None
+    if output_csv_path:
+        csvfile = open(output_csv_path, 'w', newline='')
+        writer = csv.writer(csvfile)
+        writer.writerow(CSV_COLUMNS)
+        csvfile.flush()
+
+    parser = PerformanceLogParser()
+    previous = None
+    ipc_history = deque(maxlen=rolling)
+    row_count = 0
+    header = dashboard_header()
+
+    def emit(row):
+        nonlocal previous, row_count
+        if row_count % 20 == 0:
+            print(header)
+            print("-" * len(header))
+        print(format_dashboard_row(row, previous, ipc_history), flush=True)
+        if writer:
+            writer.writerow(row)
+            csvfile.flush()
+        previous = row
+        row_count += 1
+
+    try:
+        for line in follow_lines(log_file_path, interval):
+            if line is None:
+                print("\nLog dosyasi kisaldi, yeni simulasyon basladi; bastan okunuyor.")
+                parser = PerformanceLogParser()
+                previous = None
+                ipc_history.clear()
+                continue
+            row = parser.feed(line)
+            if row is not None:
+                emit(row)
+            if line.strip() == 'FINAL REPORT':
+                print("\nFINAL REPORT bulundu, simulasyon tamamlandi.")
+                break
+    except KeyboardInterrupt:
+        print("\nIzleme durduruldu.")
+        row = parser.finish()
+        if row is not None:
+            emit(row)
+    finally:
+        if csvfile:
+            csvfile.close()
+
+    print(f"Toplam {row_count} veri noktasi islendi.")
+    if ipc_history:
+        print(f"Son {len(ipc_history)} rapor ortalama IPC: {sum(ipc_history) / len(ipc_history):.3f}")
+    if output_csv_path and row_count:
+        print(f"Veriler suraya yazildi: {os.path.abspath(output_csv_path)}")
+
 
 if __name__ == "__main__":
     # Varsayilan yollar
@@ -79,8 +411,25 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description='Performance Analysis Log Parser')
     parser.add_argument('--log', type=str, default=default_log_path, help='Giris log dosyasi yolu')
-    parser.add_argument('--out', type=str, default='performance_stats.csv', help='Cikis CSV dosyasi adi')
+    parser.add_argument('--out', type=str, default='performance_stats.csv',
+                        help='Cikis dosyasi adi (.csv; tipli sutun formati icin .parquet, .arrow, .feather veya .npz)')
+    parser.add_argument('--follow', '-f', action='store_true',
+                        help='Calisan simulasyonun logunu izle (tail -f), raporlari geldikce isle')
+    parser.add_argument('--interval', type=float, default=FOLLOW_INTERVAL,
+                        help=f'Follow modunda yoklama araligi, saniye (varsayilan: {FOLLOW_INTERVAL})')
+    parser.add_argument('--rolling', type=int, default=ROLLING_REPORTS,
+                        help=f'Ortalama IPC icin rapor sayisi (varsayilan: {ROLLING_REPORTS})')
     
     args = parser.parse_args()
     
-    parse_log_to_csv(args.log, args.out)
+    columnar = os.path.splitext(args.out)[1].lower() in ('.parquet', '.arrow', '.feather', '.npz')
+    if args.follow:
+        out = args.out
+        if columnar:
+            out = os.path.splitext(args.out)[0] + '.csv'
+            print(f"Follow modu satirlari CSV olarak yazar: {out}")
+        follow_log_to_csv(args.log, out, args.interval, args.rolling)
+    elif columnar:
+        parse_log_to_columnar(args.log, args.out)
+    else:
+        parse_log_to_csv(args.log, args.out)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Columnar Performance Data
+
+Typed, column-oriented storage for the per-window performance rows produced
+by parse_performance_log.py, as an alternative to CSV. Counters are stored
+as int64, Mispred_Rate_Percent as float64 (unrounded).
+
+Formats (chosen by file extension):
+    .parquet           Apache Parquet (pyarrow)
+    .arrow / .feather  Arrow IPC file, uncompressed, memory-mapped on load (pyarrow)
+    .npz               NumPy archive, one uncompressed array per column
+
+Parquet and Arrow need pyarrow; without it output falls back to .npz.
+Loading reads only the requested columns and does no text parsing.
+
+Usage:
+    python perf_columns.py info performance_stats.arrow
+    python perf_columns.py convert performance_stats.csv performance_stats.parquet
+"""
+
+import argparse
+import csv
+import os
+import sys
+
+import numpy as np
+
+ARROW_SUFFIXES = ('.arrow', '.feather')
+COLUMNAR_SUFFIXES = ('.parquet', '.npz') + ARROW_SUFFIXES
+
+# Column stored as float64; every other column is an int64 counter
+FLOAT_COLUMNS = ('Mispred_Rate_Percent',)
+
+
+def is_columnar(path):
+    """True if the path names a columnar file (by extension)"""
+    return os.path.splitext(path)[1].lower() in COLUMNAR_SUFFIXES
+
+
+def have_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def rows_to_columns(names, rows):
+    """
+    Typed NumPy columns from row lists
+
+    Args:
+        names (list): Column names (the parser's CSV_COLUMNS)
+        rows (list): Rows in column order
+
+    Returns:
+        dict: name -> np.ndarray (insertion ordered)
+    """
+    columns = {name: np.fromiter((row[i] for row in rows), dtype=np.int64, count=len(rows))
+               for i, name in enumerate(names) if name not in FLOAT_COLUMNS}
+    if 'Mispred_Rate_Percent' in names:
+        # Recomputed unrounded; the parser's row holds the CSV's 2-decimal text
+        branches = columns['Branches'].astype(np.float64)
+        mispreds = columns['Mispredicts'].astype(np.float64)
+        columns['Mispred_Rate_Percent'] = np.divide(mispreds * 100.0, branches,
+                                                    out=np.zeros(len(rows)), where=branches > 0)
+    return {name: columns[name] for name in names}
+
+
+def write_columns(columns, path):
+    """
+    Write columns in the format given by the file extension
+
+    Returns:
+        str: Path actually written (.npz if pyarrow is missing)
+    """
+    root, suffix = os.path.splitext(path)
+    suffix = suffix.lower()
+    if suffix != '.npz' and not have_pyarrow():
+        path = root + '.npz'
+        suffix = '.npz'
+
+    if suffix == '.npz':
+        np.savez(path, **columns)
+        return path
+
+    import pyarrow as pa
+    table = pa.table(columns)
+    if suffix == '.parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, path)
+    else:
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return path
+
+
+def column_names(path):
+    """Column names of a columnar file without loading any data"""
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == '.npz':
+        with np.load(path) as archive:
+            return list(archive.files)
+    if suffix == '.parquet':
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(path).names)
+    import pyarrow as pa
+    with pa.memory_map(path) as source:
+        return list(pa.ipc.open_file(source).schema.names)
+
+
+def read_columns(path, names=None):
+    """
+    Load columns from a columnar file
+
+    Args:
+        path (str): .parquet, .arrow/.feather or .npz file
+        names (list): Columns to load (default: all)
+
+    Returns:
+        dict: name -> np.ndarray in the requested order
+
+    Raises ValueError for unknown columns.
+    """
+    available = column_names(path)
+    if names is None:
+        names = available
+    missing = [name for name in names if name not in available]
+    if missing:
+        raise ValueError(f"Column(s) not found in {path}: {', '.join(missing)}")
+
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == '.npz':
+        # Members are only read when accessed
+        with np.load(path) as archive:
+            return {name: archive[name] for name in names}
+    if suffix == '.parquet':
+        import pyarrow.parquet as pq
+        table = pq.read_table(path, columns=list(names))
+    else:
+        import pyarrow as pa
+        # Zero-copy: the arrays point into the memory-mapped file
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all().select(list(names))
+    return {name: table.column(name).to_numpy() for name in names}
+
+
+def csv_to_columns(csv_path):
+    """Typed columns of a parse_performance_log CSV"""
+    with open(csv_path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        names = next(reader)
+        rows = [[float(value) if name in FLOAT_COLUMNS else int(value)
+                 for name, value in zip(names, row)] for row in reader]
+    columns = {}
+    for i, name in enumerate(names):
+        dtype = np.float64 if name in FLOAT_COLUMNS else np.int64
+        columns[name] = np.fromiter((row[i] for row in rows), dtype=dtype, count=len(rows))
+    return columns
+
+
+def main():
+    """Main function to handle command line arguments"""
+    parser = argparse.ArgumentParser(description='Columnar performance data tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    info_parser = subparsers.add_parser('info', help='Show the columns of a columnar file')
+    info_parser.add_argument('path')
+
+    convert_parser = subparsers.add_parser('convert', help='Convert a performance CSV to a columnar file')
+    convert_parser.add_argument('csv_path')
+    convert_parser.add_argument('output', help='.parquet, .arrow, .feather or .npz')
+
+    args = parser.parse_args()
+    try:
+        if args.command == 'info':
+            columns = read_columns(args.path)
+            rows = len(next(iter(columns.values()))) if columns else 0
+            print(f"File: {args.path}")
+            print(f"Rows: {rows:,}")
+            print(f"Columns: {len(columns)}")
+            for name, values in columns.items():
+                print(f"  {name:<30} {values.dtype}")
+        else:
+            if not is_columnar(args.output):
+                print(f"Error: unsupported output format '{args.output}'")
+                sys.exit(1)
+            path = write_columns(csv_to_columns(args.csv_path), args.output)
+            print(f"Written: {path}")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Multi-run Performance Database
+
+Collects the per-window performance rows of many simulation runs into one
+local SQLite database so runs can be compared and tracked without
+re-parsing their logs.
+
+Sources (found recursively below the given roots, or named directly):
+    performance_analysis*.log / *.txt   raw pipeline_performance_analyzer.sv logs
+    performance_stats*.csv              parse_performance_log.py CSV output
+    performance_stats*.parquet/.arrow/.feather/.npz   columnar output
+
+Derived stats files are only ingested from directories without a raw log.
+Each ingestion of a source becomes one run, named after its path below the
+root, with a configuration taken from the path (test19_3pipe -> '3pipe')
+unless given. A source that changed since its last ingestion (size or mtime)
+is loaded as a new run next to the earlier ones, so re-simulating the same
+test builds up its trend; unchanged sources are skipped.
+
+Schema:
+    runs(id, name, config, label, source, source_size, source_mtime, ingested_at)
+    windows(run_id, Cycle, <metrics of parse_performance_log.CSV_COLUMNS>)
+    indexes on runs(name), runs(config), runs(source, source_size, source_mtime)
+    and windows(run_id, Cycle)
+
+Usage:
+    python perf_db.py ingest ../digital/sim/run [--config 3pipe] [--label rtl-change]
+    python perf_db.py runs [--config 3pipe]
+    python perf_db.py compare RUN_A RUN_B
+    python perf_db.py trend [--config 3pipe]
+"""
+
+import argparse
+import csv
+import glob
+import os
+import re
+import sqlite3
+import sys
+from datetime import datetime
+
+from parse_performance_log import CSV_COLUMNS, MISPRED_RATE_INDEX, iter_performance_rows
+
+DEFAULT_DB = 'performance_runs.db'
+
+LOG_PATTERNS = ('performance_analysis*.log', 'performance_analysis*.txt')
+STATS_PATTERNS = ('performance_stats*.csv', 'performance_stats*.parquet', 'performance_stats*.arrow',
+                  'performance_stats*.feather', 'performance_stats*.npz')
+
+METRIC_COLUMNS = CSV_COLUMNS[1:]
+_CONFIG_RE = re.compile(r'(\d+)[_-]?pipe', re.I)
+
+# Run summary columns and how to print them
+SUMMARY_FIELDS = (
+    ('windows', 'Windows', '{:>8,}'),
+    ('cycles', 'Cycles', '{:>11,}'),
+    ('ipc', 'IPC', '{:>7.3f}'),
+    ('mispred_rate', 'Mispred%', '{:>8.2f}'),
+) + tuple((f'rs{rs}_stall', f'RS{rs} stall%', '{:>11.1f}') for rs in range(3))
+
+
+def connect(db_path=DEFAULT_DB):
+    """Open (and create if needed) a performance database"""
+    conn = sqlite3.connect(db_path)
+    _drop_unique_source(conn)
+    metric_defs = ', '.join(f'"{name}" {"REAL" if name == "Mispred_Rate_Percent" else "INTEGER"}'
+                            for name in METRIC_COLUMNS)
+    conn.executescript(f"""
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            config TEXT NOT NULL,
+            label TEXT,
+            source TEXT NOT NULL,
+            source_size INTEGER,
+            source_mtime REAL,
+            ingested_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_runs_name ON runs(name);
+        CREATE INDEX IF NOT EXISTS idx_runs_config ON runs(config);
+        CREATE INDEX IF NOT EXISTS idx_runs_source ON runs(source, source_size, source_mtime);
+        CREATE TABLE IF NOT EXISTS windows (
+            run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+            "Cycle" INTEGER NOT NULL,
+            {metric_defs},
+            PRIMARY KEY (run_id, "Cycle")
+        ) WITHOUT ROWID;
+    """)
+    return conn
+
+
+def _drop_unique_source(conn):
+    """Rebuild a runs table of an older database that kept one run per source"""
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'runs'").fetchone()
+    if not row or 'UNIQUE' not in row[0]:
+        return
+    with conn:
+        conn.execute(row[0].replace('UNIQUE', '', 1).replace('runs', 'runs_rebuilt', 1))
+        conn.execute("INSERT INTO runs_rebuilt SELECT * FROM runs")
+        conn.execute("DROP TABLE runs")
+        conn.execute("ALTER TABLE runs_rebuilt RENAME TO runs")
+
+
+def detect_config(path):
+    """Configuration of a run from its path (e.g. test19_3pipe -> '3pipe')"""
+    match = _CONFIG_RE.search(os.path.abspath(path))
+    return f"{match.group(1)}pipe" if match else 'default'
+
+
+def find_performance_files(root):
+    """
+    Performance sources below root
+
+    Raw logs are preferred; stats files are only taken from directories
+    that have no raw log (they would duplicate it).
+    """
+    if os.path.isfile(root):
+        return [root]
+    by_dir = {}
+    for kind, patterns in (('log', LOG_PATTERNS), ('stats', STATS_PATTERNS)):
+        for pattern in patterns:
+            for path in glob.glob(os.path.join(root, '**', pattern), recursive=True):
+                by_dir.setdefault(os.path.dirname(path), {}).setdefault(kind, []).append(path)
+    files = []
+    for kinds in by_dir.values():
+        files.extend(kinds.get('log') or kinds.get('stats', []))
+    return sorted(files)
+
+
+def read_source_rows(path):
+    """
+    Rows of a source as lists in CSV_COLUMNS order (None for missing metrics)
+    """
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in ('.log', '.txt'):
+        with open(path, 'r', errors='replace') as f:
+            for row in iter_performance_rows(f):
+                row[MISPRED_RATE_INDEX] = float(row[MISPRED_RATE_INDEX])
+                yield row
+        return
+
+    if suffix == '.csv':
+        with open(path, 'r', newline='') as f:
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield [_number(record.get(name)) for name in CSV_COLUMNS]
+        return
+
+    from perf_columns import column_names, read_columns
+    available = set(column_names(path))
+    columns = read_columns(path, [name for name in CSV_COLUMNS if name in available])
+    values = [columns[name].tolist() if name in columns else None for name in CSV_COLUMNS]
+    count = len(values[0]) if values[0] is not None else 0
+    for i in range(count):
+        yield [column[i] if column is not None else None for column in values]
+
+
+def _number(text):
+    if text is None or text == '':
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def run_name(path, root=None):
+    """Run name: source path below root without extension"""
+    base = root if root and os.path.isdir(root) else os.path.dirname(os.path.dirname(os.path.abspath(path)))
+    return os.path.splitext(os.path.relpath(os.path.abspath(path), os.path.abspath(base)))[0].replace(os.sep, '/')
+
+
+def ingest_file(conn, path, name=None, config=None, label=None, force=False):
+    """
+    Load one source into the database as a new run
+
+    Earlier runs of the source are kept. A run of the same source, size and
+    mtime means the source is unchanged: it is skipped, or replaced if forced.
+
+    Returns:
+        tuple: (run_id, window_count), or None if the source is unchanged
+    """
+    source = os.path.abspath(path)
+    st = os.stat(source)
+    existing = conn.execute(
+        "SELECT id FROM runs WHERE source = ? AND source_size = ? AND source_mtime = ? "
+        "ORDER BY id DESC LIMIT 1", (source, st.st_size, st.st_mtime)).fetchone()
+    if existing and not force:
+        return None
+
+    with conn:
+        if existing:
+            conn.execute("DELETE FROM windows WHERE run_id = ?", (existing[0],))
+            conn.execute("DELETE FROM runs WHERE id = ?", (existing[0],))
+        cursor = conn.execute(
+            "INSERT INTO runs (name, config, label, source, source_size, source_mtime, ingested_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (name or run_name(path), config or detect_config(path), label, source,
+             st.st_size, st.st_mtime, datetime.now().isoformat(timespec='seconds')))
+        run_id = cursor.lastrowid
+        columns = ', '.join(f'"{name}"' for name in CSV_COLUMNS)
+        placeholders = ', '.join('?' * (len(CSV_COLUMNS) + 1))
+        conn.executemany(
+            f"INSERT OR REPLACE INTO windows (run_id, {columns}) VALUES ({placeholders})",
+            ([run_id] + row for row in read_source_rows(path)))
+        count = conn.execute("SELECT COUNT(*) FROM windows WHERE run_id = ?", (run_id,)).fetchone()[0]
+    return run_id, count
+
+
+def find_run(conn, run):
+    """Run id of a run given by id or name (latest ingestion wins)"""
+    row = None
+    if str(run).isdigit():
+        row = conn.execute("SELECT id FROM runs WHERE id = ?", (int(run),)).fetchone()
+    if row is None:
+        row = conn.execute("SELECT id FROM runs WHERE name = ? ORDER BY id DESC LIMIT 1",
+                           (run,)).fetchone()
+    if row is None:
+        raise ValueError(f"run '{run}' not found")
+    return row[0]
+
+
+def run_summaries(conn, config=None, run_ids=None):
+    """
+    Per-run summary computed in SQL
+
+    IPC is total commits over the last reported cycle; RS stall counters are
+    cumulative in the log, so their share is the last value over the cycles.
+
+    Returns:
+        list: dicts with id, name, config, label, ingested_at and SUMMARY_FIELDS keys
+    """
+    stall_exprs = ', '.join(
+        f'100.0 * MAX(w."RS{rs}_Stall") / NULLIF(MAX(w."Cycle"), 0) AS rs{rs}_stall' for rs in range(3))
+    query = f"""
+        SELECT r.id, r.name, r.config, r.label, r.ingested_at,
+               COUNT(w."Cycle") AS windows,
+               MAX(w."Cycle") AS cycles,
+               1.0 * SUM(w."Commits") / NULLIF(MAX(w."Cycle"), 0) AS ipc,
+               100.0 * SUM(w."Mispredicts") / NULLIF(SUM(w."Branches"), 0) AS mispred_rate,
+               {stall_exprs}
+        FROM runs r LEFT JOIN windows w ON w.run_id = r.id
+    """
+    conditions, params = [], []
+    if config:
+        conditions.append("r.config = ?")
+        params.append(config)
+    if run_ids:
+        conditions.append(f"r.id IN ({', '.join('?' * len(run_ids))})")
+        params.extend(run_ids)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " GROUP BY r.id ORDER BY r.config, r.ingested_at, r.id"
+    cursor = conn.execute(query, params)
+    names = [d[0] for d in cursor.description]
+    return [dict(zip(names, row)) for row in cursor]
+
+
+def load_run_columns(conn, run, columns=None):
+    """
+    Windows of one run as a NumPy array
+
+    Args:
+        run: Run id or name
+        columns (list): Metric columns (default: all metrics)
+
+    Returns:
+        tuple: (names, data) with data shaped (len(names), windows), float64
+    """
+    import numpy as np
+    run_id = find_run(conn, run)
+    names = list(columns) if columns else list(METRIC_COLUMNS)
+    unknown = [name for name in names if name not in CSV_COLUMNS]
+    if unknown:
+        raise ValueError(f"Column(s) not found: {', '.join(unknown)}")
+    selected = ', '.join(f'"{name}"' for name in names)
+    rows = conn.execute(f'SELECT {selected} FROM windows WHERE run_id = ? ORDER BY "Cycle"',
+                        (run_id,)).fetchall()
+    data = np.array(rows, dtype=np.float64).reshape(len(rows), len(names)).T
+    return names, np.nan_to_num(data)
+
+
+def _format_value(fmt, value):
+    if value is None:
+        width = int(re.search(r'>(\d+)', fmt).group(1))
+        return '-'.rjust(width)
+    return fmt.format(value)
+
+
+def print_run_table(summaries, show_delta=False):
+    """Print run summaries, optionally with the IPC change to the previous run of a config"""
+    header = f"{'Run':<40} {'Config':<8} " + ' '.join(
+        f"{title:>{len(_format_value(fmt, 0))}}" for _, title, fmt in SUMMARY_FIELDS)
+    if show_delta:
+        header += f" {'dIPC%':>7}"
+    print(header)
+    print("-" * len(header))
+    previous = {}
+    for summary in summaries:
+        label = summary['name'] if len(summary['name']) <= 40 else "..." + summary['name'][-37:]
+        line = f"{label:<40} {summary['config']:<8} " + ' '.join(
+            _format_value(fmt, summary[key]) for key, _, fmt in SUMMARY_FIELDS)
+        if show_delta:
+            before = previous.get(summary['config'])
+            if before and summary['ipc'] is not None:
+                line += f" {(summary['ipc'] - before) * 100.0 / before:>+7.2f}"
+            else:
+                line += f" {'-':>7}"
+            if summary['ipc']:
+                previous[summary['config']] = summary['ipc']
+        if summary['label']:
+            line += f"  [{summary['label']}]"
+        print(line)
+    print("-" * len(header))
+
+
+def print_comparison(conn, base, other):
+    """Side-by-side summary of two runs with relative changes"""
+    base_id, other_id = find_run(conn, base), find_run(conn, other)
+    by_id = {s['id']: s for s in run_summaries(conn, run_ids=[base_id, other_id])}
+    a, b = by_id[base_id], by_id[other_id]
+    print(f"Base:  {a['name']} ({a['config']}, {a['ingested_at']})")
+    print(f"Other: {b['name']} ({b['config']}, {b['ingested_at']})")
+    print("-" * 60)
+    print(f"{'Metric':<14} {'Base':>12} {'Other':>12} {'Change':>12}")
+    print("-" * 60)
+    for key, title, fmt in SUMMARY_FIELDS:
+        change = '-'
+        if a[key] and b[key] is not None:
+            change = f"{(b[key] - a[key]) * 100.0 / a[key]:+.2f}%"
+        print(f"{title:<14} {_format_value(fmt, a[key]):>12} {_format_value(fmt, b[key]):>12} {change:>12}")
+    print("-" * 60)
+
+
+def main():
+    """Main function to handle command line arguments"""
+    parser = argparse.ArgumentParser(description='Multi-run performance database')
+    parser.add_argument('--db', default=DEFAULT_DB, help=f'Database file (default: {DEFAULT_DB})')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest_parser = subparsers.add_parser('ingest', help='Load performance logs/stats into the database')
+    ingest_parser.add_argument('paths', nargs='+', help='Directories to search or files to load')
+    ingest_parser.add_argument('--config', help='Configuration name (default: from the path, e.g. 3pipe)')
+    ingest_parser.add_argument('--label', help='Free-form label, e.g. the RTL revision')
+    ingest_parser.add_argument('--force', action='store_true', help='Reload unchanged sources')
+
+    runs_parser = subparsers.add_parser('runs', help='List runs with summary metrics')
+    runs_parser.add_argument('--config', help='Only runs of this configuration')
+
+    compare_parser = subparsers.add_parser('compare', help='Compare two runs (id or name)')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('other')
+
+    trend_parser = subparsers.add_parser('trend', help='Runs in ingestion order with IPC change')
+    trend_parser.add_argument('--config', help='Only runs of this configuration')
+
+    args = parser.parse_args()
+    try:
+        conn = connect(args.db)
+        if args.command == 'ingest':
+            loaded = skipped = 0
+            for root in args.paths:
+                files = find_performance_files(root)
+                if not files:
+                    print(f"No performance logs found under '{root}'")
+                for path in files:
+                    result = ingest_file(conn, path, run_name(path, root), args.config, args.label,
+                                         args.force)
+                    if result is None:
+                        skipped += 1
+                        continue
+                    loaded += 1
+                    print(f"Ingested {run_name(path, root)}: {result[1]} windows")
+            print(f"Runs loaded: {loaded}, unchanged: {skipped} -> {args.db}")
+        elif args.command == 'runs':
+            print_run_table(run_summaries(conn, args.config))
+        elif args.command == 'compare':
+            print_comparison(conn, args.base, args.other)
+        else:
+            print_run_table(run_summaries(conn, args.config), show_delta=True)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
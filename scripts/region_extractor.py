@@ -20,6 +20,8 @@ import sys
 import os
 from pathlib import Path
 
+from trace_reader import TraceReader
+
 
 def extract_regions_from_assembly(assembly_file):
     """
@@ -34,63 +36,63 @@ def extract_regions_from_assembly(assembly_file):
     regions = {}
     
     try:
-        with open(assembly_file, 'r', encoding='utf-8') as f:
-            content = f.read()
+        # Lines are decoded one at a time from the memory-mapped file
+        lines = TraceReader(assembly_file)
     except Exception as e:
         print(f"Error reading file {assembly_file}: {e}")
         return regions
     
-    # Split content into lines for processing
-    lines = content.split('\n')
     current_region = None
     in_region_section = False
     
-    for line_num, line in enumerate(lines, 1):
-        line = line.strip()
+    # The mapping is released even if a line fails to parse
+    with lines:
+        for line_num, line in enumerate(lines, 1):
+            line = line.strip()
         
-        # Check for region label (e.g., "region_0:", "region_1:")
-        region_match = re.match(r'^(region_\d+):\s*$', line)
-        if region_match:
-            current_region = region_match.group(1)
-            regions[current_region] = []
-            in_region_section = True
-            print(f"Found {current_region} at line {line_num}")
-            continue
+            # Check for region label (e.g., "region_0:", "region_1:")
+            region_match = re.match(r'^(region_\d+):\s*$', line)
+            if region_match:
+                current_region = region_match.group(1)
+                regions[current_region] = []
+                in_region_section = True
+                print(f"Found {current_region} at line {line_num}")
+                continue
         
-        # Check for section directive that indicates we're in a region section
-        if line.startswith('.section .region_'):
-            in_region_section = True
-            continue
+            # Check for section directive that indicates we're in a region section
+            if line.startswith('.section .region_'):
+                in_region_section = True
+                continue
         
-        # Check for new section that's not a region (end of current region)
-        if line.startswith('.section') and '.region_' not in line:
-            in_region_section = False
-            current_region = None
-            continue
+            # Check for new section that's not a region (end of current region)
+            if line.startswith('.section') and '.region_' not in line:
+                in_region_section = False
+                current_region = None
+                continue
         
-        # Process .word directives if we're in a region
-        if in_region_section and current_region and line.startswith('.word'):
-            # Extract hex values from .word directive
-            # Pattern matches: .word 0x12345678, 0xabcdef00, ...
-            word_pattern = r'\.word\s+(.*)'
-            match = re.match(word_pattern, line)
+            # Process .word directives if we're in a region
+            if in_region_section and current_region and line.startswith('.word'):
+                # Extract hex values from .word directive
+                # Pattern matches: .word 0x12345678, 0xabcdef00, ...
+                word_pattern = r'\.word\s+(.*)'
+                match = re.match(word_pattern, line)
             
-            if match:
-                hex_values_str = match.group(1)
-                # Find all hex values in the line
-                hex_values = re.findall(r'0x([0-9a-fA-F]{8})', hex_values_str)
+                if match:
+                    hex_values_str = match.group(1)
+                    # Find all hex values in the line
+                    hex_values = re.findall(r'0x([0-9a-fA-F]{8})', hex_values_str)
                 
-                for hex_val in hex_values:
-                    # Convert 32-bit hex to 8-bit bytes in little-endian format
-                    # 0xAABBCCDD becomes: DD, CC, BB, AA
-                    hex_val = hex_val.upper()
-                    byte3 = hex_val[6:8]  # DD (LSB)
-                    byte2 = hex_val[4:6]  # CC
-                    byte1 = hex_val[2:4]  # BB
-                    byte0 = hex_val[0:2]  # AA (MSB)
+                    for hex_val in hex_values:
+                        # Convert 32-bit hex to 8-bit bytes in little-endian format
+                        # 0xAABBCCDD becomes: DD, CC, BB, AA
+                        hex_val = hex_val.upper()
+                        byte3 = hex_val[6:8]  # DD (LSB)
+                        byte2 = hex_val[4:6]  # CC
+                        byte1 = hex_val[2:4]  # BB
+                        byte0 = hex_val[0:2]  # AA (MSB)
                     
-                    # Add bytes in little-endian order
-                    regions[current_region].extend([byte3, byte2, byte1, byte0])
+                        # Add bytes in little-endian order
+                        regions[current_region].extend([byte3, byte2, byte1, byte0])
     
     return regions
 
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Regression-wide Trace Comparison Runner
+
+Finds every riscv-dv test below a regression root that has both
+core_sim/trace.log and core_sim/spike_trace.log, compares all pairs across
+a process pool and prints one summary table (match rate, first divergence
+PC, timing). Results can also be written as an HTML dashboard, JSON or a
+JUnit XML report for CI.
+
+Usage:
+    python regression_compare.py [ROOT] [-j N] [--html report.html]
+                                 [--json results.json] [--junit results.xml]
+
+ROOT defaults to digital/sim/run/riscv_dv_test/all_tests of this repository.
+The exit code is 0 if every test matches and 1 if any test differs or
+fails. Tests that match only after same-cycle reordering (see
+trace_reorder.py) pass with status 'reorder', counted in the summary.
+"""
+
+import argparse
+import glob
+import html
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from trace_diff import TraceComparator, find_first_divergence, format_junit
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'digital',
+                            'sim', 'run', 'riscv_dv_test', 'all_tests')
+
+CORE_TRACE = os.path.join('core_sim', 'trace.log')
+SPIKE_TRACE = os.path.join('core_sim', 'spike_trace.log')
+
+
+def discover_trace_pairs(root):
+    """
+    Find every <test>/core_sim/{trace.log, spike_trace.log} pair below root
+
+    Returns:
+        list: Sorted (test_name, core_file, spike_file) tuples
+    """
+    pairs = []
+    pattern = os.path.join(root, '**', CORE_TRACE)
+    for core_file in glob.glob(pattern, recursive=True):
+        test_dir = os.path.dirname(os.path.dirname(core_file))
+        spike_file = os.path.join(test_dir, SPIKE_TRACE)
+        if os.path.isfile(spike_file):
+            name = os.path.relpath(test_dir, root)
+            pairs.append((name, core_file, spike_file))
+    return sorted(pairs)
+
+
+def compare_pair(core_file, spike_file):
+    """
+    Process pool entry point: compare one pair
+
+    The match statistics come from the full anchored diff; the first
+    divergence is taken from the streaming search, which skips the Spike
+    boot ROM, so it points at the first real disagreement.
+
+    Returns:
+        dict: Summary in the trace_diff JSON schema, or an error string
+    """
+    try:
+        start = time.perf_counter()
+        summary = TraceComparator().compare(core_file, spike_file).summary(max_differences=0)
+        divergence = find_first_divergence(core_file, spike_file, context=0)
+        summary['statistics']['elapsed_seconds'] = time.perf_counter() - start
+    except Exception as e:
+        return str(e)
+
+    if divergence is None:
+        summary['first_divergence'] = None
+    else:
+        line = divergence.core_line or divergence.spike_line
+        summary['first_divergence'] = {
+            'pc': line.split(None, 1)[0],
+            'core_index': divergence.core_index,
+            'spike_index': divergence.spike_index,
+            'core_line': divergence.core_line,
+            'spike_line': divergence.spike_line,
+        }
+    summary['identical'] = summary['identical'] and divergence is None
+    summary.pop('differences')
+    return summary
+
+
+def compare_regression(root, jobs=None):
+    """
+    Compare every trace pair below root across a process pool
+
+    Returns:
+        list: (test_name, summary dict or error string) tuples sorted by name
+    """
+    pairs = discover_trace_pairs(root)
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(compare_pair, core_file, spike_file): name
+                   for name, core_file, spike_file in pairs}
+        for future in as_completed(futures):
+            results.append((futures[future], future.result()))
+    results.sort(key=lambda result: result[0])
+    return results
+
+
+def test_status(summary):
+    """'match', 'reorder' (match after reordering), 'differ' or 'error' for one result"""
+    if not isinstance(summary, dict):
+        return 'error'
+    if not summary['identical']:
+        return 'differ'
+    return 'reorder' if summary.get('reordered') else 'match'
+
+
+def print_summary_table(results, elapsed):
+    """Print the per-test summary table"""
+    print(f"{'Test':<40} {'Status':<7} {'Match %':>8} {'Core':>10} {'Spike':>10} "
+          f"{'First divergence':>18} {'Time s':>8}")
+    print("-" * 107)
+    for name, summary in results:
+        status = test_status(summary)
+        label = name if len(name) <= 40 else "..." + name[-37:]
+        if status == 'error':
+            print(f"{label:<40} {status:<7} {'-':>8} {'-':>10} {'-':>10} {'-':>18} {'-':>8}")
+            print(f"    Error: {summary}")
+            continue
+        stats = summary['statistics']
+        first = summary['first_divergence']
+        first_text = f"{first['pc']} #{first['core_index'] + 1}" if first else '-'
+        print(f"{label:<40} {status:<7} {summary['match_percent']:>8.2f} "
+              f"{stats['core_entries']:>10,} {stats['spike_entries']:>10,} "
+              f"{first_text:>18} {stats['elapsed_seconds']:>8.2f}")
+    print("-" * 107)
+
+    counts = {status: sum(1 for _, s in results if test_status(s) == status)
+              for status in ('match', 'reorder', 'differ', 'error')}
+    print(f"Tests: {len(results)} (match: {counts['match']}, reorder: {counts['reorder']}, "
+          f"differ: {counts['differ']}, error: {counts['error']}) in {elapsed:.2f} s")
+
+
+def render_html_dashboard(root, results, elapsed):
+    """Self-contained HTML dashboard, worst match rate first"""
+    q = html.escape
+
+    def sort_key(result):
+        summary = result[1]
+        return (-1.0, result[0]) if not isinstance(summary, dict) else (summary['match_percent'], result[0])
+
+    rows = []
+    for name, summary in sorted(results, key=sort_key):
+        status = test_status(summary)
+        if status == 'error':
+            rows.append(f'<tr class="error"><td>{q(name)}</td><td>error</td>'
+                        f'<td colspan="5">{q(summary)}</td></tr>')
+            continue
+        stats = summary['statistics']
+        first = summary['first_divergence']
+        first_text = (f"{q(first['pc'])} (core #{first['core_index'] + 1}, "
+                      f"Spike #{first['spike_index'] + 1})" if first else '-')
+        detail = ''
+        if first:
+            detail = q(f"core:  {first['core_line']}\nspike: {first['spike_line']}")
+        pct = summary['match_percent']
+        rows.append(
+            f'<tr class="{status}"><td>{q(name)}</td><td>{status}</td>'
+            f'<td><div class="bar"><div style="width:{pct:.1f}%"></div></div>{pct:.2f}%</td>'
+            f'<td>{stats["core_entries"]:,}</td><td>{stats["spike_entries"]:,}</td>'
+            f'<td title="{detail}">{first_text}</td><td>{stats["elapsed_seconds"]:.2f}</td></tr>')
+
+    counts = {status: sum(1 for _, s in results if test_status(s) == status)
+              for status in ('match', 'reorder', 'differ', 'error')}
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>RISC-V Trace Regression</title>
+<style>
+body {{ font-family: 'Segoe UI', sans-serif; background: #1e1e1e; color: #ffffff; margin: 24px; }}
+table {{ border-collapse: collapse; width: 100%; }}
+th, td {{ padding: 6px 10px; border-bottom: 1px solid #3c3c3c; text-align: left; }}
+th {{ background: #252526; }}
+td {{ font-family: Consolas, monospace; }}
+tr.match td:nth-child(2) {{ color: #16c79a; }}
+tr.reorder td:nth-child(2) {{ color: #ffd54f; }}
+tr.differ td:nth-child(2) {{ color: #ffa726; }}
+tr.error td {{ color: #ff6b6b; }}
+.bar {{ display: inline-block; width: 120px; height: 10px; background: #3c3c3c; margin-right: 8px; }}
+.bar div {{ height: 100%; background: #0078d4; }}
+</style></head><body>
+<h1>🚀 RISC-V Trace Regression</h1>
+<p>Root: {q(os.path.abspath(root))}<br>Generated: {datetime.now().isoformat(timespec='seconds')}<br>
+Tests: {len(results)} &mdash; match: {counts['match']}, reorder: {counts['reorder']}, differ: {counts['differ']},
+error: {counts['error']} &mdash; {elapsed:.2f} s</p>
+<table>
+<tr><th>Test</th><th>Status</th><th>Match</th><th>Core commits</th><th>Spike commits</th>
+<th>First divergence</th><th>Time (s)</th></tr>
+{chr(10).join(rows)}
+</table></body></html>
+"""
+
+
+def main():
+    """Main function to handle command line arguments"""
+    parser = argparse.ArgumentParser(description='Compare core and Spike traces of a whole regression')
+    parser.add_argument('root', nargs='?', default=DEFAULT_ROOT,
+                        help='Regression root holding <test>/core_sim/ directories')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Worker processes (default: number of CPUs)')
+    parser.add_argument('--html', help='Write an HTML dashboard to this file')
+    parser.add_argument('--json', help='Write per-test results as JSON to this file')
+    parser.add_argument('--junit', help='Write a JUnit XML report to this file')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.root):
+        print(f"Error: regression root '{args.root}' not found!")
+        sys.exit(2)
+
+    start = time.perf_counter()
+    results = compare_regression(args.root, args.jobs)
+    elapsed = time.perf_counter() - start
+    if not results:
+        print(f"No trace pairs found under '{args.root}'")
+        sys.exit(2)
+
+    print_summary_table(results, elapsed)
+
+    try:
+        if args.html:
+            with open(args.html, 'w', encoding='utf-8') as f:
+                f.write(render_html_dashboard(args.root, results, elapsed))
+            print(f"HTML dashboard saved to: {args.html}")
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump({name: summary for name, summary in results}, f, indent=2)
+            print(f"JSON results saved to: {args.json}")
+        if args.junit:
+            with open(args.junit, 'w', encoding='utf-8') as f:
+                f.write(format_junit(results, suite_name='riscv_dv_regression'))
+            print(f"JUnit report saved to: {args.junit}")
+    except OSError as e:
+        print(f"Error writing report: {e}")
+        sys.exit(2)
+
+    statuses = {test_status(summary) for _, summary in results}
+    sys.exit(1 if statuses & {'differ', 'error'} else 0)
+
+
+if __name__ == "__main__":
+    main()
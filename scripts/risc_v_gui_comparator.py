@@ -22,15 +22,47 @@ from tkinter import ttk, filedialog, messagebox
 from tkinter.font import Font
 import threading
 import queue
+import time
 import os
 import sys
 import json
 import re
 from datetime import datetime
+from array import array
+from bisect import bisect_left, bisect_right
 from typing import List, Tuple, Optional
 
-# Import our professional comparator
-from professional_log_comparator import ProfessionalLogComparator, LogEntry, DiffResult, DiffType
+# Import the anchored trace diff engine
+from trace_diff import (TraceComparator, REPORT_CONTEXT, ROW_MATCH,
+                        find_first_divergence, format_first_divergence)
+from trace_search import TraceIndex, next_hit, parse_query, prev_hit
+from trace_cache import ResultCache
+from trace_loops import is_loop_record
+from arch_state import REGISTER_COUNT
+
+# Virtualized diff viewer: rows kept in the Text widgets beyond the visible
+# window, and rows moved per mouse wheel step
+OVERSCAN_ROWS = 50
+WHEEL_ROWS = 3
+MISSING_TEXT = '--- (missing) ---'
+
+# Background loading: rows per queued batch, Tk time budget per frame (s)
+# and delay between frames (ms)
+LOAD_BATCH_ROWS = 4096
+LOAD_FRAME_BUDGET = 0.012
+LOAD_POLL_MS = 15
+
+# Width of the difference overview strip (px); pixel rows holding at least
+# MINIMAP_DENSE differences are drawn in the stronger color
+MINIMAP_WIDTH = 16
+MINIMAP_DENSE = 8
+
+# Register panel: four registers per line
+REGISTER_ROWS = 8
+
+# RISC-V syntax highlighting, one pass per rendered line
+HIGHLIGHT_PATTERN = re.compile(r'(?P<address>0x[0-9a-fA-F]+)|(?P<register>\bx\d+\b)|'
+                               r'(?P<csr>\bc\d+_\w+\b)|(?P<memory>\bmem\b)')
 
 class ModernTheme:
     """Modern theme configuration"""
@@ -76,7 +108,7 @@ class ModernTheme:
 class ProgressDialog:
     """Professional progress dialog with cancellation support"""
     
-    def __init__(self, parent, title="Processing..."):
+    def __init__(self, parent, title="Processing...", modal=True):
         self.parent = parent
         self.cancelled = False
         
@@ -86,7 +118,8 @@ class ProgressDialog:
         self.dialog.geometry("400x200")
         self.dialog.resizable(False, False)
         self.dialog.transient(parent)
-        self.dialog.grab_set()
+        if modal:
+            self.dialog.grab_set()
         
         # Center the dialog
         self.dialog.geometry("+%d+%d" % (
@@ -129,11 +162,22 @@ class ProgressDialog:
         try:
             if hasattr(self, 'status_label') and self.status_label.winfo_exists():
                 self.status_label.config(text=status_text)
-                self.dialog.update()
+                self.dialog.update_idletasks()
         except tk.TclError:
             # Dialog was destroyed, ignore
             pass
     
+    def set_progress(self, fraction):
+        """Switch to a determinate progress bar showing fraction (0..1)"""
+        try:
+            if self.progress.winfo_exists():
+                if str(self.progress.cget('mode')) != 'determinate':
+                    self.progress.stop()
+                    self.progress.config(mode='determinate', maximum=100)
+                self.progress.config(value=fraction * 100)
+        except tk.TclError:
+            pass
+    
     def cancel(self):
         """Cancel the operation"""
         self.cancelled = True
@@ -234,7 +278,36 @@ class DiffViewer:
         self.font_size_var = tk.IntVar(value=10)  # Initialize font size variable first
         self.setup_widgets()
         self.configure_tags()
-        self.current_diff_lines = []
+        
+        # Viewer model: display row -> ComparisonResult row. Only the rows
+        # between window_start and window_end live in the Text widgets.
+        self.result = None
+        self.view_rows = array('l')
+        self.current_diff_lines = array('l')  # ascending 1-based display rows
+        self.top_row = 0
+        self.current_row = 0
+        self.window_start = 0
+        self.window_end = 0
+        self.line_height = None
+        
+        # Search state: index over the result, pattern to highlight (text and
+        # regex queries) and matching display rows in ascending order
+        self.search_index = None
+        self.search_query = ''
+        self.search_pattern = None
+        self.search_hits = array('l')
+        self.search_hidden = 0
+        
+        # Register panel state: result whose register histories are built
+        # (or being built) in the background
+        self.registers_ready = None
+        self.registers_building = None
+        
+        # Background loader state
+        self.load_queue = None
+        self.load_cancel = None
+        self.load_total = 0
+        self.load_dialog = None
         
     def setup_widgets(self):
         """Setup side-by-side diff viewer widgets with modern design"""
@@ -260,9 +333,14 @@ class DiffViewer:
                                      style='Modern.TEntry')
         self.search_entry.pack(side=tk.LEFT, padx=(0, 5))
         self.search_entry.bind('<Return>', self.search_text)
+        self.search_entry.bind('<Shift-Return>', self.search_previous)
         
         ttk.Button(search_frame, text="Find", command=self.search_text, 
-                  style='Accent.TButton').pack(side=tk.LEFT, padx=(0, 15))
+                  style='Accent.TButton').pack(side=tk.LEFT, padx=(0, 5))
+        
+        # Match counter ("3/120"); queries: text, /regex/, pc=, rd=, mem=
+        self.search_status_var = tk.StringVar(value="")
+        ttk.Label(search_frame, textvariable=self.search_status_var).pack(side=tk.LEFT, padx=(0, 15))
         
         # Font size controls with modern styling
         font_frame = ttk.Frame(toolbar)
@@ -313,6 +391,24 @@ class DiffViewer:
         # Export button
         ttk.Button(toolbar, text="💾 Export", command=self.export_diff).pack(side=tk.RIGHT)
         
+        # Register state of the selected row, packed first so it keeps its height
+        register_frame = ttk.Frame(self.frame, padding="10", relief='flat')
+        register_frame.pack(side=tk.BOTTOM, fill=tk.X, pady=(8, 0))
+        
+        register_header = ttk.Frame(register_frame)
+        register_header.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(register_header, text="🧮 Register State", 
+                 font=('Segoe UI', 11, 'bold')).pack(side=tk.LEFT)
+        self.register_status_var = tk.StringVar(value="Click a row to show the registers (core | spike)")
+        ttk.Label(register_header, textvariable=self.register_status_var).pack(side=tk.LEFT, padx=(15, 0))
+        
+        current_theme = getattr(self.parent, 'theme', ModernTheme.DARK)
+        self.register_text = tk.Text(register_frame, height=REGISTER_ROWS, wrap=tk.NONE,
+                                     font=('Consolas', 9), state=tk.DISABLED,
+                                     bg=current_theme['text_bg'], fg=current_theme['text_fg'],
+                                     relief='flat', borderwidth=0, cursor='arrow')
+        self.register_text.pack(fill=tk.X)
+        
         # Create main comparison frame
         comparison_frame = ttk.Frame(self.frame)
         comparison_frame.pack(fill=tk.BOTH, expand=True)
@@ -326,6 +422,16 @@ class DiffViewer:
                                font=('Segoe UI', 11, 'bold'))
         core_header.pack(anchor=tk.W, pady=(0, 8))
         
+        # Difference overview strip at the far right; click to jump to a cluster
+        current_theme = getattr(self.parent, 'theme', ModernTheme.DARK)
+        self.minimap_colors = (current_theme['warning'], current_theme['error'], current_theme['accent'])
+        self.minimap = tk.Canvas(comparison_frame, width=MINIMAP_WIDTH, highlightthickness=0,
+                                 bg=current_theme['panel_bg'], cursor='hand2')
+        self.minimap.pack(side=tk.RIGHT, fill=tk.Y, padx=(8, 0))
+        self.minimap.bind('<Configure>', lambda event: self.draw_minimap())
+        self.minimap.bind('<Button-1>', self.on_minimap_click)
+        self.minimap.bind('<B1-Motion>', self.on_minimap_drag)
+        
         # Right panel - Spike Log with modern flat design
         right_panel = ttk.Frame(comparison_frame, padding="10", relief='flat', borderwidth=0)
         right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=(8, 0))
@@ -340,12 +446,16 @@ class DiffViewer:
         self.setup_text_panel(right_panel, 'spike')
         
         # Bind synchronized scrolling
+        self.sync_scrollbars()
+        self.core_text.bind('<Configure>', lambda event: self.scroll_to(self.top_row, force=True))
         self.core_text.bind('<MouseWheel>', self.on_mousewheel)
         self.spike_text.bind('<MouseWheel>', self.on_mousewheel)
         self.core_text.bind('<Button-4>', self.on_mousewheel)
         self.core_text.bind('<Button-5>', self.on_mousewheel)
         self.spike_text.bind('<Button-4>', self.on_mousewheel)
         self.spike_text.bind('<Button-5>', self.on_mousewheel)
+        self.core_text.bind('<Button-1>', self.on_row_click)
+        self.spike_text.bind('<Button-1>', self.on_row_click)
         
     def setup_text_panel(self, parent, side):
         """Setup text panel with line numbers and modern theming"""
@@ -386,9 +496,8 @@ class DiffViewer:
         v_scrollbar = ttk.Scrollbar(text_frame, orient=tk.VERTICAL, command=text_widget.yview)
         h_scrollbar = ttk.Scrollbar(text_frame, orient=tk.HORIZONTAL, command=text_widget.xview)
         
-        text_widget.config(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
-        
-        text_widget.config(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        # The vertical scrollbar follows the virtual row position, not the widget
+        text_widget.config(xscrollcommand=h_scrollbar.set)
         
         # Pack scrollbars and text
         v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
@@ -416,6 +525,7 @@ class DiffViewer:
             text_widget.tag_configure('missing', background='#2a2a2a', foreground='#888888')
             text_widget.tag_configure('normal', background='#2d2d2d', foreground='#ffffff')
             text_widget.tag_configure('highlight', background='#404040', foreground='#ffd43b')
+            text_widget.tag_configure('loop', background='#1f2a3a', foreground='#74c0fc')
             
             # RISC-V instruction highlighting
             text_widget.tag_configure('address', foreground='#74c0fc', font=('Consolas', font_size, 'bold'))
@@ -423,298 +533,225 @@ class DiffViewer:
             text_widget.tag_configure('register', foreground='#a9e34b')
             text_widget.tag_configure('memory', foreground='#da77f2')
             text_widget.tag_configure('csr', foreground='#ff9800')
-        
-    def display_diff(self, diff_text):
-        """Display side-by-side comparison from diff text"""
-        print(f"🔍 DEBUG: Starting display_diff with {len(diff_text)} characters of diff text")
-        
-        # Parse the comparison report to extract the unified diff section
-        lines = diff_text.split('\n')
-        print(f"🔍 DEBUG: Split diff text into {len(lines)} lines")
-        
-        # Find the differences section
-        diff_lines = []
-        in_diff_section = False
-        
-        for line in lines:
-            if line.startswith("🔍 DETAILED DIFFERENCES"):
-                in_diff_section = True
-                print(f"🔍 DEBUG: Found detailed differences section")
-                continue
-            elif not in_diff_section:
-                continue
-            elif line.startswith(('@@ HUNK', '- ', '+ ', '  ')):
-                diff_lines.append(line)
-        
-        print(f"🔍 DEBUG: Extracted {len(diff_lines)} diff lines from report")
-        
-        # Process the unified diff sequentially to maintain correct order
-        core_entries = []
-        spike_entries = []
-        
-        self.process_unified_diff_sequentially(diff_lines, core_entries, spike_entries)
-        
-        print(f"🔍 DEBUG: After processing: {len(core_entries)} core entries, {len(spike_entries)} spike entries")
-        
-        # Display the entries
-        self.populate_text_widgets_sequential(core_entries, spike_entries)
+            text_widget.tag_configure('search_highlight', background='#ffd43b', foreground='#000000')
+        self.register_text.tag_configure('different', background='#4a1a1a', foreground='#ff6b6b')
+        
+    def display_result(self, result, progress_dialog=None):
+        """
+        Display side-by-side comparison from a structured ComparisonResult
+        
+        Rows are prepared by a worker thread and appended to the view in the
+        background, so the viewer can be used while the rest is streaming in.
+        progress_dialog (optional) shows the loading progress and cancels it.
+        """
+        self.cancel_loading()
+        self.result = result
+        self.search_index = TraceIndex(result)
+        self.search_query = ''
+        self.search_pattern = None
+        self.search_hits = array('l')
+        self.search_hidden = 0
+        self.search_status_var.set("")
+        self.view_rows = array('l')
+        self.current_diff_lines = array('l')
+        self.top_row = 0
+        self.current_row = 0
+        self.registers_ready = None
+        self.registers_building = None
+        self.register_status_var.set("Click a row to show the registers (core | spike)")
+        self.set_register_text([])
+        self.load_total = 0
+        self.load_dialog = progress_dialog
+        self.scroll_to(0, force=True)
+        
+        self.load_queue = queue.Queue(maxsize=64)
+        self.load_cancel = threading.Event()
+        threading.Thread(target=self.produce_rows,
+                         args=(result, self.load_queue, self.load_cancel),
+                         daemon=True).start()
+        self.frame.after(LOAD_POLL_MS, self.drain_rows, self.load_queue)
     
-    def process_unified_diff_sequentially(self, diff_lines, core_entries, spike_entries):
-        """Process unified diff line by line, maintaining order and smart pairing"""
-        i = 0
-        while i < len(diff_lines):
-            line = diff_lines[i]
-            
-            if line.startswith('@@ HUNK'):
-                # Skip hunk headers
-                i += 1
-                continue
-                
-            elif line.startswith('  '):  # Context line
-                content = line[2:]
-                core_entries.append(('normal', content))
-                spike_entries.append(('normal', content))
-                i += 1
-                
-            elif line.startswith('- '):  # Deletion
-                deletions = []
-                j = i
-                
-                # Collect all consecutive deletions
-                while j < len(diff_lines) and diff_lines[j].startswith('- '):
-                    deletions.append(diff_lines[j][2:])
-                    j += 1
-                
-                # Collect all consecutive insertions that follow
-                insertions = []
-                while j < len(diff_lines) and diff_lines[j].startswith('+ '):
-                    insertions.append(diff_lines[j][2:])
-                    j += 1
-                
-                # Now intelligently pair deletions and insertions
-                self.pair_deletions_insertions(deletions, insertions, core_entries, spike_entries)
-                
-                i = j  # Skip to after the processed block
-                
-            elif line.startswith('+ '):  # Pure insertion (no preceding deletions)
-                insertions = []
-                j = i
-                
-                # Collect all consecutive insertions
-                while j < len(diff_lines) and diff_lines[j].startswith('+ '):
-                    insertions.append(diff_lines[j][2:])
-                    j += 1
-                
-                # Add as pure insertions
-                for insertion in insertions:
-                    core_entries.append(('missing', '--- (missing) ---'))
-                    spike_entries.append(('different', insertion))
-                
-                i = j
-            else:
-                i += 1
-    
-    def pair_deletions_insertions(self, deletions, insertions, core_entries, spike_entries):
-        """Process insertions first in order, then pair remaining deletions"""
-        # Create PC mappings for matching
-        deletion_pcs = {}
-        for deletion in deletions:
-            pc = self.extract_pc_address(deletion)
-            if pc:
-                deletion_pcs[pc] = deletion
-        
-        # Track which deletions have been used
-        used_deletions = set()
-        
-        # Process ALL insertions in their original order first
-        for insertion in insertions:
-            ins_pc = self.extract_pc_address(insertion)
-            
-            # Check if this insertion has a matching deletion
-            if ins_pc and ins_pc in deletion_pcs:
-                # This insertion has a matching deletion - pair them
-                matching_deletion = deletion_pcs[ins_pc]
-                core_entries.append(('different', matching_deletion))
-                spike_entries.append(('different', insertion))
-                used_deletions.add(matching_deletion)
-            else:
-                # This is a pure insertion (no matching deletion)
-                core_entries.append(('missing', '--- (missing) ---'))
-                spike_entries.append(('different', insertion))
-        
-        # Add any remaining unmatched deletions as pure deletions
-        for deletion in deletions:
-            if deletion not in used_deletions:
-                core_entries.append(('different', deletion))
-                spike_entries.append(('missing', '--- (missing) ---'))
-    
-    def extract_pc_address(self, line_content):
-        """Extract PC address from a log line for matching purposes"""
-        # Look for the first hex address in the line (PC address)
-        match = re.search(r'0x[0-9a-fA-F]+', line_content)
-        return match.group(0) if match else None
-    
-    def populate_text_widgets_sequential(self, core_entries, spike_entries):
-        """Populate both text widgets with entries in the correct order"""
-        # Debug logging
-        print(f"🔍 DEBUG: Populating text widgets with {len(core_entries)} core entries and {len(spike_entries)} spike entries")
-        
-        # Enable editing
-        self.core_text.config(state=tk.NORMAL)
-        self.spike_text.config(state=tk.NORMAL)
-        self.core_lines.config(state=tk.NORMAL)
-        self.spike_lines.config(state=tk.NORMAL)
-        
-        # Clear existing content
-        self.core_text.delete(1.0, tk.END)
-        self.spike_text.delete(1.0, tk.END)
-        self.core_lines.delete(1.0, tk.END)
-        self.spike_lines.delete(1.0, tk.END)
-        
-        # Store diff line numbers for navigation
-        self.current_diff_lines = []
-        
-        # Ensure both lists have the same length
-        max_len = max(len(core_entries), len(spike_entries))
-        print(f"🔍 DEBUG: Maximum length calculated as {max_len}")
-        
-        while len(core_entries) < max_len:
-            core_entries.append(('missing', '--- (missing) ---'))
-        while len(spike_entries) < max_len:
-            spike_entries.append(('missing', '--- (missing) ---'))
-        
-        # Optimize for large datasets - batch insertions and use efficient text operations
-        core_content = []
-        spike_content = []
-        line_numbers = []
-        
-        # Prepare all content first
-        for i, ((core_tag, core_content_line), (spike_tag, spike_content_line)) in enumerate(zip(core_entries, spike_entries), 1):
-            core_content.append((core_tag, core_content_line))
-            spike_content.append((spike_tag, spike_content_line))
-            line_numbers.append(f"{i:5d}")
-            
-            # Track diff lines
-            if core_tag == 'different' or spike_tag == 'different':
-                self.current_diff_lines.append(i)
-        
-        print(f"🔍 DEBUG: Prepared {len(core_content)} lines for core and {len(spike_content)} lines for spike")
-        print(f"🔍 DEBUG: Found {len(self.current_diff_lines)} difference lines")
+    @staticmethod
+    def produce_rows(result, load_queue, cancel):
+        """Worker thread: queue display rows in batches of LOAD_BATCH_ROWS"""
+        def put(item):
+            while not cancel.is_set():
+                try:
+                    load_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        # Only the rows around differences are shown, like the report hunks.
+        # The sorted difference index is computed once, before any rows, so
+        # navigation and the overview strip cover the whole result at once.
+        ranges = result.hunk_ranges(REPORT_CONTEXT)
+        diff_rows = result.diff_rows
+        diff_lines = array('l')
+        offset = 1
+        for start, end in ranges:
+            first = bisect_left(diff_rows, start)
+            last = bisect_left(diff_rows, end)
+            diff_lines.extend(diff_rows[i] - start + offset for i in range(first, last))
+            offset += end - start
+        if not put(('index', offset - 1, diff_lines)):
+            return
         
-        # Batch insert content to improve performance
-        self.insert_content_batch(self.core_text, self.core_lines, core_content, line_numbers)
-        self.insert_content_batch(self.spike_text, self.spike_lines, spike_content, line_numbers)
+        for start, end in ranges:
+            for batch_start in range(start, end, LOAD_BATCH_ROWS):
+                batch_end = min(end, batch_start + LOAD_BATCH_ROWS)
+                if not put(('rows', array('l', range(batch_start, batch_end)))):
+                    return
+        put(('done',))
+    
+    def drain_rows(self, load_queue):
+        """Tk side of the loader: append queued batches within a frame budget"""
+        if load_queue is not self.load_queue:
+            return  # superseded by a newer result
+        if self.load_dialog is not None and self.load_dialog.cancelled:
+            self.cancel_loading()
+            self.line_count_var.set(f"Lines: {len(self.view_rows):,} (cancelled)")
+            return
         
-        # Update diff counter
-        diff_count = len(self.current_diff_lines)
-        self.diff_counter_var.set(f"Differences: {diff_count}")
+        done = False
+        deadline = time.perf_counter() + LOAD_FRAME_BUDGET
+        while time.perf_counter() < deadline:
+            try:
+                item = load_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] == 'rows':
+                self.view_rows.extend(item[1])
+            elif item[0] == 'index':
+                self.load_total = item[1]
+                self.current_diff_lines = item[2]
+                self.diff_counter_var.set(f"Differences: {len(self.current_diff_lines):,}")
+                self.draw_minimap()
+            else:
+                done = True
+                break
         
-        # Update line count display
-        self.line_count_var.set(f"Lines: {max_len:,}")
+        loaded = len(self.view_rows)
         
-        # Disable editing
-        self.core_text.config(state=tk.DISABLED)
-        self.spike_text.config(state=tk.DISABLED)
-        self.core_lines.config(state=tk.DISABLED)
-        self.spike_lines.config(state=tk.DISABLED)
+        # Re-render only if the visible window still has unloaded rows
+        wanted_end = min(loaded, self.top_row + self.visible_row_count() + OVERSCAN_ROWS)
+        self.scroll_to(self.top_row, force=self.window_end < wanted_end)
         
-        # Synchronize scrollbars
-        self.sync_scrollbars()
+        if done:
+            self.line_count_var.set(f"Lines: {loaded:,}")
+            self.load_queue = None
+            self.close_load_dialog()
+            return
         
-        print(f"🔍 DEBUG: Text widgets populated successfully")
+        if self.load_total:
+            self.line_count_var.set(f"Lines: {loaded:,} / {self.load_total:,}")
+            if self.load_dialog is not None:
+                self.load_dialog.set_progress(loaded / self.load_total)
+                self.load_dialog.update_status(f"Loaded {loaded:,} of {self.load_total:,} rows")
+        self.frame.after(LOAD_POLL_MS, self.drain_rows, load_queue)
     
-    def insert_content_batch(self, text_widget, line_widget, content_list, line_numbers):
-        """Insert content in batches for better performance with large datasets"""
-        batch_size = 1000  # Process in batches to avoid UI freezing
-        total_lines = len(content_list)
-        print(f"🔍 DEBUG: Starting batch insertion of {total_lines} lines")
-        
-        # Show progress for large files
-        if total_lines > 1000:
-            print(f"📊 Processing large file with {total_lines:,} lines - this may take a moment...")
-        
-        for batch_start in range(0, len(content_list), batch_size):
-            batch_end = min(batch_start + batch_size, len(content_list))
-            print(f"🔍 DEBUG: Processing batch {batch_start} to {batch_end}")
-            
-            # Show progress
-            if hasattr(self, 'parent') and hasattr(self.parent, 'root'):
-                self.show_load_progress(batch_end, total_lines)
-            
-            # Insert text content in batch
-            text_batch = []
-            line_batch = []
-            
-            for i in range(batch_start, batch_end):
-                tag, content_line = content_list[i]
-                text_batch.append(content_line + '\n')
-                line_batch.append(line_numbers[i] + '\n')
-            
-            # Insert all text at once for this batch
-            batch_start_pos = text_widget.index(tk.INSERT)
-            text_widget.insert(tk.END, ''.join(text_batch))
-            line_widget.insert(tk.END, ''.join(line_batch))
-            
-            # Apply tags to the batch
-            current_line = batch_start + 1
-            for i in range(batch_start, batch_end):
-                tag, content_line = content_list[i]
-                
-                line_start = f"{current_line}.0"
-                line_end = f"{current_line}.end"
-                
-                # Apply main tag
-                text_widget.tag_add(tag, line_start, line_end)
-                
-                # Apply RISC-V highlighting if not missing
-                if tag != 'missing':
-                    self.apply_riscv_highlighting(text_widget, content_line, line_start)
-                
-                current_line += 1
-            
-            # Update UI periodically for very large datasets
-            if batch_end % 2000 == 0:  # Update every 2000 lines
-                text_widget.update_idletasks()
-                print(f"🔍 DEBUG: UI updated at line {batch_end}")
-        
-        # Final check - verify all content was inserted
-        final_line_count = int(text_widget.index('end-1c').split('.')[0]) - 1
-        print(f"🔍 DEBUG: Batch insertion complete. Expected: {total_lines}, Actual: {final_line_count}")
-        
-        if final_line_count < total_lines:
-            print(f"⚠️  WARNING: Some lines may not have been inserted properly!")
-            print(f"⚠️  This could be due to Text widget limitations or memory constraints.")
+    def cancel_loading(self):
+        """Stop the background loader, keeping the rows loaded so far"""
+        if self.load_cancel is not None:
+            self.load_cancel.set()
+        self.load_queue = None
+        self.close_load_dialog()
+    
+    def close_load_dialog(self):
+        """Close the loading progress dialog if one is open"""
+        if self.load_dialog is not None:
+            self.load_dialog.destroy()
+            self.load_dialog = None
+    
+    def row_entries(self, display_row):
+        """(tag, text) pairs of the core and spike side of a display row"""
+        kind, core_line, spike_line = self.result.row(self.view_rows[display_row])
+        if kind == ROW_MATCH:
+            # Folded spin loops stand out from ordinary matching commits
+            tag = 'loop' if is_loop_record(core_line) else 'normal'
+            return (tag, core_line), (tag, spike_line)
+        return (('different', core_line) if core_line is not None else ('missing', MISSING_TEXT),
+                ('different', spike_line) if spike_line is not None else ('missing', MISSING_TEXT))
+    
+    def visible_row_count(self):
+        """Number of rows that fit in the text panels"""
+        if self.line_height is None:
+            self.line_height = max(1, Font(font=self.core_text.cget('font')).metrics('linespace'))
+        return max(1, self.core_text.winfo_height() // self.line_height)
+    
+    def scroll_to(self, top_row, force=False):
+        """Make top_row the first visible row, rendering a new window if needed"""
+        total = len(self.view_rows)
+        visible = self.visible_row_count()
+        top_row = max(0, min(int(top_row), total - visible))
+        self.top_row = top_row
+        
+        if force or top_row < self.window_start or top_row + visible > self.window_end:
+            self.render_window(top_row, visible)
+        
+        line = f"{top_row - self.window_start + 1}.0"
+        for widget in (self.core_text, self.spike_text, self.core_lines, self.spike_lines):
+            widget.yview(line)
+        
+        # Scrollbar position is relative to the whole result
+        if total:
+            first, last = top_row / total, min(1.0, (top_row + visible) / total)
         else:
-            print(f"✅ All {total_lines:,} lines inserted successfully!")
-        
-        # Force final UI update
-        text_widget.update_idletasks()
-        
+            first, last = 0.0, 1.0
+        self.core_v_scroll.set(first, last)
+        self.spike_v_scroll.set(first, last)
+        self.update_minimap_viewport()
+    
+    def render_window(self, top_row, visible):
+        """Materialize the visible rows plus overscan in the text widgets"""
+        start = max(0, top_row - OVERSCAN_ROWS)
+        end = min(len(self.view_rows), top_row + visible + OVERSCAN_ROWS)
+        self.window_start = start
+        self.window_end = end
+        
+        entries = [self.row_entries(row) for row in range(start, end)]
+        line_numbers = ''.join(f"{row + 1:5d}\n" for row in range(start, end))
+        
+        for line_widget in (self.core_lines, self.spike_lines):
+            line_widget.config(state=tk.NORMAL)
+            line_widget.delete(1.0, tk.END)
+            line_widget.insert(tk.END, line_numbers)
+            line_widget.config(state=tk.DISABLED)
+        
+        # Field query hits (pc=, rd=, mem=) are highlighted as whole rows
+        hits = self.search_hits if self.search_pattern is None else ()
+        hit_lines = []
+        if hits:
+            first = bisect_left(hits, start)
+            last = bisect_left(hits, end)
+            hit_lines = [hits[i] - start + 1 for i in range(first, last)]
+        
+        for side, text_widget in enumerate((self.core_text, self.spike_text)):
+            text_widget.config(state=tk.NORMAL)
+            text_widget.delete(1.0, tk.END)
+            text_widget.insert(tk.END, ''.join(entry[side][1] + '\n' for entry in entries))
+            for line, entry in enumerate(entries, 1):
+                tag, content = entry[side]
+                line_start = f"{line}.0"
+                text_widget.tag_add(tag, line_start, f"{line}.end")
+                if tag != 'missing':
+                    self.apply_riscv_highlighting(text_widget, content, line_start)
+            for line in hit_lines:
+                text_widget.tag_add('highlight', f"{line}.0", f"{line}.end")
+            text_widget.config(state=tk.DISABLED)
+    
     def apply_riscv_highlighting(self, text_widget, content, line_start):
-        """Apply RISC-V instruction syntax highlighting"""
-        # Highlight PC addresses (0x...)
-        for match in re.finditer(r'0x[0-9a-fA-F]+', content):
-            start_idx = f"{line_start}+{match.start()}c"
-            end_idx = f"{line_start}+{match.end()}c"
-            text_widget.tag_add('address', start_idx, end_idx)
-        
-        # Highlight register names (x1, x2, etc.)
-        for match in re.finditer(r'\bx\d+\b', content):
-            start_idx = f"{line_start}+{match.start()}c"
-            end_idx = f"{line_start}+{match.end()}c"
-            text_widget.tag_add('register', start_idx, end_idx)
-        
-        # Highlight CSR names (c###_name)
-        for match in re.finditer(r'\bc\d+_\w+\b', content):
-            start_idx = f"{line_start}+{match.start()}c"
-            end_idx = f"{line_start}+{match.end()}c"
-            text_widget.tag_add('csr', start_idx, end_idx)
-        
-        # Highlight memory operations
-        for match in re.finditer(r'\bmem\b', content):
-            start_idx = f"{line_start}+{match.start()}c"
-            end_idx = f"{line_start}+{match.end()}c"
-            text_widget.tag_add('memory', start_idx, end_idx)
+        """Apply RISC-V syntax and search highlighting to one rendered line"""
+        for match in HIGHLIGHT_PATTERN.finditer(content):
+            text_widget.tag_add(match.lastgroup, f"{line_start}+{match.start()}c",
+                                f"{line_start}+{match.end()}c")
+        
+        if self.search_pattern is not None:
+            for match in self.search_pattern.finditer(content):
+                if match.end() > match.start():
+                    text_widget.tag_add('search_highlight', f"{line_start}+{match.start()}c",
+                                        f"{line_start}+{match.end()}c")
     
     def on_mousewheel(self, event):
         """Handle synchronized scrolling"""
@@ -724,126 +761,286 @@ class DiffViewer:
         else:
             delta = -1 if event.num == 4 else 1
         
-        # Scroll both text widgets
-        self.core_text.yview_scroll(int(delta), "units")
-        self.spike_text.yview_scroll(int(delta), "units")
-        self.core_lines.yview_scroll(int(delta), "units")
-        self.spike_lines.yview_scroll(int(delta), "units")
-        
+        self.scroll_to(self.top_row + int(delta) * WHEEL_ROWS)
         return "break"
     
+    def on_vscroll(self, *args):
+        """Translate scrollbar commands into virtual row positions"""
+        total = len(self.view_rows)
+        if args[0] == 'moveto':
+            self.scroll_to(float(args[1]) * total)
+        elif args[0] == 'scroll':
+            step = self.visible_row_count() if args[2] == 'pages' else 1
+            self.scroll_to(self.top_row + int(args[1]) * step)
+    
     def sync_scrollbars(self):
         """Synchronize scrollbar commands"""
-        def sync_yview(*args):
-            self.core_text.yview(*args)
-            self.spike_text.yview(*args)
-            self.core_lines.yview(*args)
-            self.spike_lines.yview(*args)
-        
         def sync_xview_core(*args):
             self.core_text.xview(*args)
         
         def sync_xview_spike(*args):
             self.spike_text.xview(*args)
         
-        self.core_v_scroll.config(command=sync_yview)
-        self.spike_v_scroll.config(command=sync_yview)
+        self.core_v_scroll.config(command=self.on_vscroll)
+        self.spike_v_scroll.config(command=self.on_vscroll)
         self.core_h_scroll.config(command=sync_xview_core)
         self.spike_h_scroll.config(command=sync_xview_spike)
     
     def search_text(self, event=None):
-        """Search for text in both panels"""
-        search_term = self.search_var.get()
-        if not search_term:
+        """Search both traces; repeating the same query moves to the next match"""
+        query = self.search_var.get().strip()
+        if query and query == self.search_query:
+            self.jump_to_search_hit(next_hit(self.search_hits, self.current_row))
             return
         
-        # Clear previous highlights
-        for text_widget in [self.core_text, self.spike_text]:
-            text_widget.tag_remove('search_highlight', 1.0, tk.END)
+        self.search_query = query
+        self.search_pattern = None
+        self.search_hits = array('l')
+        self.search_hidden = 0
+        self.search_status_var.set("")
+        if not query or self.search_index is None:
+            self.scroll_to(self.top_row, force=True)
+            return
         
-        # Search in both panels
-        found_positions = []
+        try:
+            kind, value = parse_query(query)
+        except ValueError as e:
+            self.search_query = ''
+            messagebox.showwarning("Invalid Search", str(e))
+            return
         
-        for text_widget in [self.core_text, self.spike_text]:
-            start_pos = 1.0
-            while True:
-                pos = text_widget.search(search_term, start_pos, stopindex=tk.END)
-                if not pos:
-                    break
-                
-                end_pos = f"{pos}+{len(search_term)}c"
-                text_widget.tag_add('search_highlight', pos, end_pos)
-                found_positions.append((text_widget, pos))
-                start_pos = end_pos
+        # The first field query builds the trace index, so run it off the Tk thread
+        self.search_status_var.set("Searching...")
+        index = self.search_index
         
-        # Configure search highlight
-        for text_widget in [self.core_text, self.spike_text]:
-            text_widget.tag_configure('search_highlight', background='#ffd43b', foreground='#000000')
+        def worker():
+            try:
+                rows = index.search(query)
+            except ValueError as e:
+                rows = e
+            self.frame.after(0, lambda: self.search_completed(index, query, kind, value, rows))
         
-        # Jump to first occurrence
-        if found_positions:
-            first_widget, first_pos = found_positions[0]
-            first_widget.see(first_pos)
+        threading.Thread(target=worker, daemon=True).start()
     
-    def next_diff(self):
-        """Navigate to next difference"""
-        if not self.current_diff_lines:
+    def search_completed(self, index, query, kind, value, rows):
+        """Map result rows to display rows and jump to the first match"""
+        if index is not self.search_index or query != self.search_query:
+            return  # a newer search or result replaced this one
+        if isinstance(rows, ValueError):
+            self.search_query = ''
+            self.search_status_var.set("")
+            messagebox.showwarning("Invalid Search", str(rows))
             return
         
-        current_line = int(self.core_text.index(tk.INSERT).split('.')[0])
+        # view_rows is ascending, so each hit maps to a display row by bisection
+        view_rows = self.view_rows
+        hits = array('l')
+        for row in rows:
+            display_row = bisect_left(view_rows, row)
+            if display_row < len(view_rows) and view_rows[display_row] == row:
+                hits.append(display_row)
         
-        # Find next diff line
-        next_line = None
-        for line_num in self.current_diff_lines:
-            if line_num > current_line:
-                next_line = line_num
-                break
+        self.search_hits = hits
+        self.search_hidden = len(rows) - len(hits)
+        self.search_pattern = value if kind != 'fields' else None
         
-        if next_line is None and self.current_diff_lines:
-            next_line = self.current_diff_lines[0]  # Wrap to first
+        if hits:
+            self.jump_to_search_hit(next_hit(hits, self.current_row - 1), force=True)
+        else:
+            self.search_status_var.set("No matches" + self.hidden_hits_note())
+            self.scroll_to(self.top_row, force=True)
+    
+    def search_previous(self, event=None):
+        """Move to the previous match of the current search"""
+        if self.search_hits:
+            self.jump_to_search_hit(prev_hit(self.search_hits, self.current_row))
+    
+    def jump_to_search_hit(self, display_row, force=False):
+        """Jump to a matching display row and update the match counter"""
+        if display_row is None:
+            return
+        position = bisect_left(self.search_hits, display_row) + 1
+        self.search_status_var.set(f"{position:,}/{len(self.search_hits):,}" + self.hidden_hits_note())
+        self.jump_to_line(display_row + 1, force=force)
+    
+    def hidden_hits_note(self):
+        """Status bar suffix for matches outside the difference view"""
+        return f" ({self.search_hidden:,} outside view)" if self.search_hidden else ""
+    
+    def loaded_diff_count(self):
+        """Number of indexed differences whose rows are already loaded"""
+        return bisect_right(self.current_diff_lines, len(self.view_rows))
+    
+    def next_diff(self):
+        """Navigate to next difference"""
+        loaded = self.loaded_diff_count()
+        if not loaded:
+            return
         
-        if next_line:
-            self.jump_to_line(next_line)
+        # Binary search for the first difference after the current row
+        i = bisect_right(self.current_diff_lines, self.current_row + 1, 0, loaded)
+        self.jump_to_diff(i if i < loaded else 0)  # Wrap to first
     
     def prev_diff(self):
         """Navigate to previous difference"""
-        if not self.current_diff_lines:
+        loaded = self.loaded_diff_count()
+        if not loaded:
             return
         
-        current_line = int(self.core_text.index(tk.INSERT).split('.')[0])
-        
-        # Find previous diff line
-        prev_line = None
-        for line_num in reversed(self.current_diff_lines):
-            if line_num < current_line:
-                prev_line = line_num
-                break
-        
-        if prev_line is None and self.current_diff_lines:
-            prev_line = self.current_diff_lines[-1]  # Wrap to last
+        # Binary search for the last difference before the current row
+        i = bisect_left(self.current_diff_lines, self.current_row + 1, 0, loaded)
+        self.jump_to_diff(i - 1 if i > 0 else loaded - 1)  # Wrap to last
+    
+    def jump_to_diff(self, diff_index):
+        """Jump to the n-th difference and show its position in the counter"""
+        self.diff_counter_var.set(f"Differences: {diff_index + 1:,}/{len(self.current_diff_lines):,}")
+        self.jump_to_line(self.current_diff_lines[diff_index])
+    
+    def draw_minimap(self):
+        """Draw the difference overview: one mark per pixel row holding differences"""
+        canvas = self.minimap
+        canvas.delete('all')
+        total = self.load_total or len(self.view_rows)
+        height = canvas.winfo_height()
+        if not total or height <= 1:
+            return
         
-        if prev_line:
-            self.jump_to_line(prev_line)
+        counts = [0] * height
+        for line in self.current_diff_lines:
+            counts[(line - 1) * height // total] += 1
+        
+        sparse, dense, viewport = self.minimap_colors
+        for y, count in enumerate(counts):
+            if count:
+                canvas.create_line(0, y, MINIMAP_WIDTH, y,
+                                   fill=dense if count >= MINIMAP_DENSE else sparse)
+        canvas.create_rectangle(0, 0, MINIMAP_WIDTH - 1, 0, outline=viewport, tags='viewport')
+        self.update_minimap_viewport()
+    
+    def update_minimap_viewport(self):
+        """Move the overview's viewport box to the visible rows"""
+        total = self.load_total or len(self.view_rows)
+        height = self.minimap.winfo_height()
+        if not total or height <= 1:
+            return
+        top = self.top_row * height // total
+        bottom = (self.top_row + self.visible_row_count()) * height // total
+        self.minimap.coords('viewport', 0, top, MINIMAP_WIDTH - 1, max(top + 2, bottom))
+    
+    def minimap_row(self, event):
+        """Display row under a pointer position on the overview strip"""
+        total = self.load_total or len(self.view_rows)
+        height = max(1, self.minimap.winfo_height())
+        return min(total - 1, max(0, event.y * total // height))
     
-    def jump_to_line(self, line_num):
+    def on_minimap_click(self, event):
+        """Jump to the difference cluster nearest to the clicked position"""
+        loaded = self.loaded_diff_count()
+        if not loaded:
+            return
+        line = self.minimap_row(event) + 1
+        diffs = self.current_diff_lines
+        i = bisect_left(diffs, line, 0, loaded)
+        if i == loaded or (i > 0 and line - diffs[i - 1] < diffs[i] - line):
+            i -= 1
+        self.jump_to_diff(i)
+    
+    def on_minimap_drag(self, event):
+        """Scroll with the pointer while dragging on the overview strip"""
+        if self.view_rows:
+            self.scroll_to(self.minimap_row(event) - self.visible_row_count() // 2)
+    
+    def jump_to_line(self, line_num, force=False):
         """Jump to specific line in both panels"""
-        line_pos = f"{line_num}.0"
-        
-        # Jump in both text widgets
-        self.core_text.see(line_pos)
-        self.spike_text.see(line_pos)
-        self.core_lines.see(line_pos)
-        self.spike_lines.see(line_pos)
+        row = line_num - 1
+        self.current_row = row
+        
+        # Center the row unless it is already on screen
+        visible = self.visible_row_count()
+        if force or not self.top_row <= row < self.top_row + visible:
+            self.scroll_to(row - visible // 2, force=force)
+        self.show_registers()
+    
+    def on_row_click(self, event):
+        """Select the clicked row and show its register state"""
+        line = int(event.widget.index(f"@{event.x},{event.y}").split('.')[0])
+        display_row = self.window_start + line - 1
+        if 0 <= display_row < len(self.view_rows):
+            self.current_row = display_row
+            self.show_registers()
+    
+    def show_registers(self):
+        """Show core and Spike register files after the selected row"""
+        result = self.result
+        if result is None or not 0 <= self.current_row < len(self.view_rows):
+            return
+        if self.registers_ready is not result:
+            # Histories are built once per result, off the Tk thread
+            if self.registers_building is not result:
+                self.registers_building = result
+                self.register_status_var.set("Building register history...")
+                
+                def worker():
+                    try:
+                        result.register_histories()
+                    except Exception as e:
+                        error_message = str(e) or type(e).__name__
+                        self.frame.after(0, lambda: self.registers_failed(result, error_message))
+                        return
+                    self.frame.after(0, lambda: self.registers_built(result))
+                
+                threading.Thread(target=worker, daemon=True).start()
+            return
         
-        # Set cursor position
-        self.core_text.mark_set(tk.INSERT, line_pos)
-        self.spike_text.mark_set(tk.INSERT, line_pos)
+        row = self.view_rows[self.current_row]
+        core, spike = result.registers_at(row)
+        differing = sum(1 for a, b in zip(core, spike) if a != b)
+        ci = result.side_commit(row, 'core')
+        sj = result.side_commit(row, 'spike')
+        self.register_status_var.set(
+            f"Line {self.current_row + 1:,} - core commit #{ci + 1:,}, spike commit #{sj + 1:,} - "
+            f"{differing} register(s) differ")
+        
+        lines = []
+        for first in range(0, REGISTER_COUNT, 4):
+            lines.append([(f"x{r:<2} 0x{core[r]:08x} | 0x{spike[r]:08x}", core[r] != spike[r])
+                          for r in range(first, first + 4)])
+        self.set_register_text(lines)
+    
+    def registers_built(self, result):
+        """Register histories of a result are ready"""
+        if result is not self.result:
+            return  # a newer result replaced this one
+        self.registers_ready = result
+        self.show_registers()
+    
+    def registers_failed(self, result, error_message):
+        """Building the register histories failed; the next click tries again"""
+        if result is not self.result:
+            return
+        self.registers_building = None
+        self.register_status_var.set(f"Register history failed: {error_message}")
+    
+    def set_register_text(self, lines):
+        """Fill the register panel with lines of (text, differs) cells"""
+        widget = self.register_text
+        widget.config(state=tk.NORMAL)
+        widget.delete(1.0, tk.END)
+        for number, cells in enumerate(lines, 1):
+            column = 0
+            for text, differs in cells:
+                widget.insert(tk.END, text + '    ')
+                if differs:
+                    widget.tag_add('different', f"{number}.{column}", f"{number}.{column + len(text)}")
+                column += len(text) + 4
+            widget.insert(tk.END, '\n')
+        widget.config(state=tk.DISABLED)
     
     def goto_line(self, event=None):
         """Go to specific line number"""
         try:
             line_num = int(self.goto_line_var.get())
-            total_lines = int(self.core_text.index('end-1c').split('.')[0]) - 1
+            total_lines = len(self.view_rows)
             
             if 1 <= line_num <= total_lines:
                 self.jump_to_line(line_num)
@@ -871,6 +1068,8 @@ class DiffViewer:
             
             # Reconfigure tags with new font size
             self.configure_tags()
+            self.line_height = None
+            self.scroll_to(self.top_row, force=True)
             
         except (tk.TclError, ValueError):
             # Ignore invalid font size values
@@ -899,6 +1098,7 @@ class DiffViewer:
                 'missing': {'background': '#2a2a2a', 'foreground': '#888888'},
                 'normal': {'background': '#2d2d2d', 'foreground': '#ffffff'},
                 'highlight': {'background': '#404040', 'foreground': '#ffd43b'},
+                'loop': {'background': '#1f2a3a', 'foreground': '#74c0fc'},
                 'address': {'foreground': '#74c0fc'},
                 'instruction': {'foreground': '#ffa8a8'},
                 'register': {'foreground': '#a9e34b'},
@@ -913,6 +1113,7 @@ class DiffViewer:
                 'missing': {'background': '#f5f5f5', 'foreground': '#666666'},
                 'normal': {'background': '#ffffff', 'foreground': '#333333'},
                 'highlight': {'background': '#e3f2fd', 'foreground': '#1976d2'},
+                'loop': {'background': '#e8f0fe', 'foreground': '#1565c0'},
                 'address': {'foreground': '#1976d2'},
                 'instruction': {'foreground': '#d32f2f'},
                 'register': {'foreground': '#388e3c'},
@@ -931,34 +1132,16 @@ class DiffViewer:
                                             font=('Consolas', font_size, 'bold'))
                 else:
                     text_widget.tag_configure(tag, **tag_colors)
-    
-    def show_load_progress(self, current_line, total_lines):
-        """Show progress during large file loading"""
-        if total_lines > 1000:  # Only show progress for large files
-            progress_percent = (current_line / total_lines) * 100
-            if current_line % 500 == 0:  # Update every 500 lines
-                print(f"📊 Loading progress: {current_line}/{total_lines} ({progress_percent:.1f}%)")
-                # Try to update the main window title through parent chain
-                try:
-                    root_window = self.parent
-                    while hasattr(root_window, 'parent') and root_window.parent:
-                        root_window = root_window.parent
-                    if hasattr(root_window, 'title'):
-                        root_window.title(f"🚀 RISC-V Log Comparator - Loading {progress_percent:.1f}%")
-                        root_window.update_idletasks()
-                except:
-                    pass
         
-        # Reset title when done
-        if current_line >= total_lines:
-            try:
-                root_window = self.parent
-                while hasattr(root_window, 'parent') and root_window.parent:
-                    root_window = root_window.parent
-                if hasattr(root_window, 'title'):
-                    root_window.title("🚀 RISC-V Log Comparator v3.0 ")
-            except:
-                pass
+        # Register panel
+        theme = ModernTheme.DARK if theme_name == 'dark' else ModernTheme.LIGHT
+        self.register_text.configure(bg=theme['text_bg'], fg=theme['text_fg'])
+        self.register_text.tag_configure('different', **colors['different'])
+        
+        # Difference overview strip
+        self.minimap_colors = (theme['warning'], theme['error'], theme['accent'])
+        self.minimap.configure(bg=theme['panel_bg'])
+        self.draw_minimap()
     
     def export_diff(self):
         """Export side-by-side comparison"""
@@ -974,24 +1157,16 @@ class DiffViewer:
         
         if filename:
             try:
-                core_content = self.core_text.get(1.0, tk.END)
-                spike_content = self.spike_text.get(1.0, tk.END)
-                
                 # Create side-by-side export
                 export_content = "🚀 PROFESSIONAL RISC-V SIDE-BY-SIDE COMPARISON\n"
                 export_content += "=" * 80 + "\n\n"
                 
-                core_lines = core_content.strip().split('\n')
-                spike_lines = spike_content.strip().split('\n')
-                
-                max_lines = max(len(core_lines), len(spike_lines))
-                
                 export_content += f"{'CORE LOG':<40} | {'SPIKE LOG':<40}\n"
                 export_content += "-" * 40 + " | " + "-" * 40 + "\n"
                 
-                for i in range(max_lines):
-                    core_line = core_lines[i] if i < len(core_lines) else ""
-                    spike_line = spike_lines[i] if i < len(spike_lines) else ""
+                # Rows come from the viewer model, not from the rendered window
+                for row in range(len(self.view_rows) if self.result else 0):
+                    (_, core_line), (_, spike_line) = self.row_entries(row)
                     
                     # Truncate long lines
                     if len(core_line) > 37:
@@ -1022,8 +1197,8 @@ class RISCVLogComparatorGUI:
         # Comparison state
         self.core_file = None
         self.spike_file = None
-        self.last_comparison_report = None
-        self.comparator = ProfessionalLogComparator()
+        self.last_result = None
+        self.comparator = TraceComparator(cache=ResultCache())
         
     def setup_window(self):
         """Setup main window"""
@@ -1251,6 +1426,11 @@ class RISCVLogComparatorGUI:
                                      state='disabled')
         self.compare_btn.pack(side=tk.LEFT, padx=(0, 5))
         
+        self.first_diff_btn = ttk.Button(control_frame, text="⚡ First Diff", 
+                                        command=self.find_first_divergence,
+                                        state='disabled')
+        self.first_diff_btn.pack(side=tk.LEFT, padx=(0, 5))
+        
         ttk.Button(control_frame, text="🌙", width=3,
                   command=self.toggle_theme).pack(side=tk.LEFT, padx=(0, 5))
         
@@ -1342,6 +1522,8 @@ class RISCVLogComparatorGUI:
         file_menu.add_command(label="Open Core Log...", command=self.select_core_file)
         file_menu.add_command(label="Open Spike Log...", command=self.select_spike_file)
         file_menu.add_separator()
+        file_menu.add_command(label="Find First Divergence", command=self.find_first_divergence)
+        file_menu.add_separator()
         file_menu.add_command(label="Export Report...", command=self.export_report)
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.root.quit)
@@ -1418,9 +1600,11 @@ class RISCVLogComparatorGUI:
         """Update compare button state"""
         if self.core_file and self.spike_file:
             self.compare_btn.config(state='normal')
+            self.first_diff_btn.config(state='normal')
             self.status_var.set("Ready")
         else:
             self.compare_btn.config(state='disabled')
+            self.first_diff_btn.config(state='disabled')
             self.status_var.set("Select files")
     
     def compare_logs(self):
@@ -1465,19 +1649,53 @@ class RISCVLogComparatorGUI:
                 safe_update_progress(f"{step}: {message}")
             
             # Run comparison with progress callback
-            safe_update_progress("Computing LCS differences...")
-            report = self.comparator.compare_logs(self.core_file, self.spike_file)
+            safe_update_progress("Computing anchored trace differences...")
+            result = self.comparator.compare(self.core_file, self.spike_file)
+            if self.comparator.cache_hit:
+                self.log_to_console("♻️ Result loaded from the comparison cache")
             
-            safe_update_progress("Finalizing comparison report...")
+            safe_update_progress("Preparing side-by-side view...")
             
             if hasattr(self, 'progress_dialog') and not self.progress_dialog.cancelled:
-                self.last_comparison_report = report
+                self.last_result = result
                 self.root.after(0, self.comparison_completed)
             
         except Exception as e:
             if hasattr(self, 'progress_dialog') and not self.progress_dialog.cancelled:
                 self.root.after(0, lambda: self.comparison_failed(str(e)))
     
+    def find_first_divergence(self):
+        """Stream both logs and stop at the first mismatching commit"""
+        if not self.core_file or not self.spike_file:
+            messagebox.showerror("Error", "Please select both core and spike log files")
+            return
+        
+        self.log_to_console("⚡ Searching for the first divergence...")
+        self.status_var.set("Searching first divergence...")
+        core_file, spike_file = self.core_file, self.spike_file
+        
+        def worker():
+            try:
+                divergence = find_first_divergence(core_file, spike_file)
+                report = format_first_divergence(divergence, core_file, spike_file)
+                self.root.after(0, lambda: self.first_divergence_completed(divergence, report))
+            except Exception as e:
+                error_message = str(e)
+                self.root.after(0, lambda: self.comparison_failed(error_message))
+        
+        threading.Thread(target=worker, daemon=True).start()
+    
+    def first_divergence_completed(self, divergence, report):
+        """Show the first divergence report in the console tab"""
+        for line in report.rstrip('\n').split('\n'):
+            self.log_to_console(line)
+        self.notebook.select(2)
+        
+        if divergence is None:
+            self.status_var.set("No divergence - traces are identical")
+        else:
+            self.status_var.set(f"First divergence at core commit #{divergence.core_index + 1:,}")
+    
     def monitor_comparison(self):
         """Monitor comparison thread"""
         if hasattr(self, 'comparison_thread') and self.comparison_thread.is_alive():
@@ -1502,46 +1720,36 @@ class RISCVLogComparatorGUI:
 
         
         
-        # Update statistics
-        self.statistics_panel.update_stats(self.comparator.stats)
-        
-        # Extract diff content for viewer
-        report_lines = self.last_comparison_report.split('\n')
-        diff_start = -1
+        result = self.last_result
+        stats = result.stats
         
-        for i, line in enumerate(report_lines):
-            if line.startswith("🔍 DETAILED DIFFERENCES"):
-                diff_start = i
-                break
+        # Update statistics
+        self.statistics_panel.update_stats(stats)
         
-        if diff_start >= 0:
-            diff_content = '\n'.join(report_lines[diff_start:])
-            self.diff_viewer.display_diff(diff_content)
+        # The viewer consumes the aligned rows directly, streaming them in the
+        # background; the non-modal dialog lets the viewer be used meanwhile
+        load_dialog = ProgressDialog(self.root, "Loading Differences", modal=False)
+        load_dialog.title_label.config(text="Loading Difference View...")
+        self.diff_viewer.display_result(result, load_dialog)
         
         # Switch to statistics tab
         self.notebook.select(0)
         
         # Update status
-        match_pct = (self.comparator.stats.get('perfect_matches', 0) / 
-                    (self.comparator.stats.get('perfect_matches', 0) + 
-                     self.comparator.stats.get('deletions', 0) + 
-                     self.comparator.stats.get('insertions', 0)) * 100) if \
-                    (self.comparator.stats.get('perfect_matches', 0) + 
-                     self.comparator.stats.get('deletions', 0) + 
-                     self.comparator.stats.get('insertions', 0)) > 0 else 0
+        match_pct = result.match_percent
         
         self.status_var.set(f"Comparison completed - {match_pct:.2f}% match rate")
         self.log_to_console(f"✅ Comparison completed successfully!")
         self.log_to_console(f"📊 Match rate: {match_pct:.2f}%")
-        self.log_to_console(f"🔢 LCS Length: {self.comparator.stats.get('lcs_length', 0):,}")
+        self.log_to_console(f"🔢 LCS Length: {stats.get('lcs_length', 0):,}")
         
         # Show success message
         messagebox.showinfo(
             "Comparison Complete", 
             f"Log comparison completed successfully!\n\n"
             f"Match Rate: {match_pct:.2f}%\n"
-            f"Perfect Matches: {self.comparator.stats.get('perfect_matches', 0):,}\n"
-            f"Differences: {self.comparator.stats.get('deletions', 0) + self.comparator.stats.get('insertions', 0):,}"
+            f"Perfect Matches: {stats.get('perfect_matches', 0):,}\n"
+            f"Differences: {stats.get('deletions', 0) + stats.get('insertions', 0):,}"
         )
     
     def comparison_failed(self, error_message):
@@ -1560,7 +1768,7 @@ class RISCVLogComparatorGUI:
     
     def export_report(self):
         """Export comparison report"""
-        if not self.last_comparison_report:
+        if not self.last_result:
             messagebox.showwarning("No Report", "No comparison report available to export")
             return
         
@@ -1577,21 +1785,23 @@ class RISCVLogComparatorGUI:
         
         if filename:
             try:
+                # The text report is only rendered when it is exported
+                report = self.last_result.render_report()
                 if filename.endswith('.json'):
                     # Export as JSON
                     data = {
                         'timestamp': datetime.now().isoformat(),
                         'core_file': os.path.basename(self.core_file) if self.core_file else None,
                         'spike_file': os.path.basename(self.spike_file) if self.spike_file else None,
-                        'statistics': self.comparator.stats,
-                        'report': self.last_comparison_report
+                        'statistics': self.last_result.stats,
+                        'report': report
                     }
                     with open(filename, 'w', encoding='utf-8') as f:
                         json.dump(data, f, indent=2)
                 else:
                     # Export as text
                     with open(filename, 'w', encoding='utf-8') as f:
-                        f.write(self.last_comparison_report)
+                        f.write(report)
                 
                 self.log_to_console(f"💾 Report exported to: {os.path.basename(filename)}")
                 messagebox.showinfo("Export Success", f"Report exported successfully to:\n{filename}")
@@ -1900,7 +2110,9 @@ Perfect for RISC-V verification workflows!"""
 • Red lines (-): Core-only entries
 • Green lines (+): Spike-only entries
 • White lines: Context around differences
-• Use Search to find specific patterns
+• Use Search to find specific patterns (Enter: next, Shift+Enter: previous)
+  - text or /regex/
+  - pc=0x80000104, rd=x13, mem=0x80001000 (combine with spaces)
 • Navigate with Next/Prev Diff buttons
 
 💾 Export Options:
@@ -2,100 +2,358 @@
 # -*- coding: utf-8 -*-
 """
 Spike Log Filter Script
-Filters Spike simulation log to keep only execution lines (core   0: 3)
+Filters Spike simulation log to keep only commit lines (core N: P ...)
 and removes the prefix for cleaner output.
 
+The log is streamed in large binary chunks, so memory use stays constant
+regardless of the log size. Commit records can either be written to a
+``_filtered.log`` file or consumed directly through iter_spike_commits().
+
 Created by Şükrü-AI for RISC-V log processing
 """
 
-import sys
+import argparse
+import glob
 import os
+import re
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Read size for the streaming engine (bytes)
+CHUNK_SIZE = 4 * 1024 * 1024
+
+# Write buffer size for the filtered output file (bytes)
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# A Spike commit line looks like:
+#   core   0: 3 0x80000000 (0xf14022f3) x5  0x00000000
+# where the first number is the hart ID and the second one the privilege level.
+# Disassembly lines ("core   0: 0x80000000 (0xf14022f3) csrr ...") have no
+# privilege field and are dropped. Leading blanks before "core" are allowed.
+SpikeCommit = namedtuple('SpikeCommit', ['hart', 'priv', 'line'])
+
+FilterStats = namedtuple('FilterStats', ['input_file', 'output_file', 'total_lines',
+                                         'filtered_lines', 'input_bytes', 'elapsed'])
+
+
+def _alternation(values):
+    """Build a regex alternation for a set of integer IDs (None matches any)"""
+    if values is None:
+        return rb'\d+'
+    return b'(?:' + b'|'.join(str(int(v)).encode() for v in sorted(set(values))) + b')'
+
+
+def compile_commit_pattern(harts=None, privs=None):
+    """
+    Compile the commit line matcher for the requested harts/privilege levels
+
+    Args:
+        harts (iterable): Hart IDs to keep (None keeps every hart)
+        privs (iterable): Privilege levels to keep (None keeps every level)
+    """
+    return re.compile(rb'^[ \t]*core +(' + _alternation(harts) + rb'): (' +
+                      _alternation(privs) + rb') (0x[^\r\n]*)', re.M)
+
+
+def iter_blocks(input_file, chunk_size=CHUNK_SIZE):
+    """
+    Read a file in large binary chunks that always end on a line boundary
+
+    Yields:
+        bytes: Block of complete lines (the last block may lack a newline)
+    """
+    remainder = b''
+    with open(input_file, 'rb') as infile:
+        while True:
+            chunk = infile.read(chunk_size)
+            if not chunk:
+                break
+            chunk = remainder + chunk
+            cut = chunk.rfind(b'\n') + 1
+            if cut == 0:
+                remainder = chunk
+                continue
+            remainder = chunk[cut:]
+            yield chunk[:cut]
+    if remainder:
+        yield remainder
+
+
+def iter_spike_commits(input_file, harts=None, privs=None, chunk_size=CHUNK_SIZE):
+    """
+    Stream commit records out of a raw Spike log without writing any file
+
+    Args:
+        input_file (str): Path to input Spike log file
+        harts (iterable): Hart IDs to keep (None keeps every hart)
+        privs (iterable): Privilege levels to keep (None keeps every level)
+
+    Yields:
+        SpikeCommit: (hart, priv, line) with the "core N: P" prefix removed
+    """
+    pattern = compile_commit_pattern(harts, privs)
+    for block in iter_blocks(input_file, chunk_size):
+        for match in pattern.finditer(block):
+            yield SpikeCommit(int(match.group(1)), int(match.group(2)),
+                              match.group(3).decode('ascii', 'replace'))
+
+
+def filter_spike_file(input_file, output_file=None, harts=None, privs=None,
+                      chunk_size=CHUNK_SIZE):
+    """
+    Filter one Spike log into its ``_filtered.log`` counterpart
+
+    Raises OSError if the input cannot be read or the output cannot be written.
+
+    Returns:
+        FilterStats: Line counts, input size and elapsed time
+    """
+    if output_file is None:
+        output_file = default_output_path(input_file)
+
+    pattern = compile_commit_pattern(harts, privs)
+    total_lines = 0
+    filtered_lines = 0
+    input_bytes = 0
+
+    start = time.perf_counter()
+    with open(output_file, 'wb', buffering=WRITE_BUFFER_SIZE) as outfile:
+        for block in iter_blocks(input_file, chunk_size):
+            input_bytes += len(block)
+            total_lines += block.count(b'\n')
+            lines = pattern.findall(block)
+            if lines:
+                # Only the third group (the commit text) goes to the output
+                outfile.write(b'\n'.join(line for _, _, line in lines))
+                outfile.write(b'\n')
+                filtered_lines += len(lines)
+        if input_bytes and not block.endswith(b'\n'):
+            total_lines += 1
+    elapsed = time.perf_counter() - start
+
+    return FilterStats(input_file, output_file, total_lines, filtered_lines,
+                       input_bytes, elapsed)
+
 
-def filter_spike_log(input_file, output_file=None):
+def default_output_path(input_file):
+    """Return the conventional ``<name>_filtered.log`` path for an input log"""
+    base_name = os.path.splitext(input_file)[0]
+    return f"{base_name}_filtered.log"
+
+
+def throughput_mb_s(stats):
+    """Input throughput of a filter run in MB/s"""
+    if stats.elapsed <= 0:
+        return 0.0
+    return stats.input_bytes / (1024 * 1024) / stats.elapsed
+
+
+def filter_spike_log(input_file, output_file=None, harts=None, privs=None):
     """
-    Filter Spike log file to keep only execution lines
-    
+    Filter Spike log file to keep only commit lines
+
     Args:
         input_file (str): Path to input Spike log file
         output_file (str): Path to output file (optional)
+        harts (iterable): Hart IDs to keep (None keeps every hart)
+        privs (iterable): Privilege levels to keep (None keeps every level)
     """
-    
+
     if not os.path.exists(input_file):
         print(f"Error: Input file '{input_file}' not found!")
         return False
-    
+
     # If no output file specified, create one based on input filename
     if output_file is None:
-        base_name = os.path.splitext(input_file)[0]
-        output_file = f"{base_name}_filtered.log"
-    
+        output_file = default_output_path(input_file)
+
+    print(f"Processing: {input_file}")
+    print(f"Output: {output_file}")
+    print("=" * 50)
+
     try:
-        with open(input_file, 'r', encoding='utf-8') as infile:
-            with open(output_file, 'w', encoding='utf-8') as outfile:
-                
-                filtered_lines = 0
-                total_lines = 0
-                
-                print(f"Processing: {input_file}")
-                print(f"Output: {output_file}")
-                print("=" * 50)
-                
-                for line in infile:
-                    total_lines += 1
-                    
-                    # Check if line starts with "core   0: 3"
-                    if line.strip().startswith("core   0: 3"):
-                        # Remove "core   0: 3" prefix and any extra spaces
-                        filtered_line = line.replace("core   0: 3", "", 1).lstrip()
-                        
-                        # Write the cleaned line
-                        outfile.write(filtered_line)
-                        filtered_lines += 1
-                        
-                        # Show progress for every 1000 lines
-                        if filtered_lines % 1000 == 0:
-                            print(f"Processed {filtered_lines} execution lines...")
-                
-                print("=" * 50)
-                print(f"Summary:")
-                print(f"Total lines read: {total_lines:,}")
-                print(f"Execution lines found: {filtered_lines:,}")
-                print(f"Lines filtered out: {total_lines - filtered_lines:,}")
-                print(f"Compression ratio: {(1 - filtered_lines/total_lines)*100:.1f}%")
-                print(f"Filtered log saved to: {output_file}")
-                
-                return True
-                
+        stats = filter_spike_file(input_file, output_file, harts, privs)
     except Exception as e:
         print(f"Error processing file: {e}")
         return False
 
+    total_lines = stats.total_lines
+    filtered_lines = stats.filtered_lines
+    compression = (1 - filtered_lines/total_lines)*100 if total_lines else 0.0
+
+    print(f"Summary:")
+    print(f"Total lines read: {total_lines:,}")
+    print(f"Execution lines found: {filtered_lines:,}")
+    print(f"Lines filtered out: {total_lines - filtered_lines:,}")
+    print(f"Compression ratio: {compression:.1f}%")
+    print(f"Throughput: {throughput_mb_s(stats):.1f} MB/s "
+          f"({stats.input_bytes / (1024 * 1024):.1f} MB in {stats.elapsed:.2f} s)")
+    print(f"Filtered log saved to: {output_file}")
+
+    return True
+
+
+def discover_spike_logs(root):
+    """
+    Find every raw Spike log below a regression root
+
+    riscv-dv places Spike logs in ``<test>/<out_dir>/spike_sim/*.log``; files
+    that are already ``_filtered.log`` outputs are skipped.
+
+    Returns:
+        list: Sorted list of raw Spike log paths
+    """
+    pattern = os.path.join(root, '**', 'spike_sim', '*.log')
+    return sorted(path for path in glob.glob(pattern, recursive=True)
+                  if not path.endswith('_filtered.log'))
+
+
+def is_up_to_date(input_file, output_file):
+    """True if output_file exists and is not older than input_file"""
+    try:
+        return os.path.getmtime(output_file) >= os.path.getmtime(input_file)
+    except OSError:
+        return False
+
+
+def _batch_worker(input_file, harts, privs):
+    """Process pool entry point: filter one file and report errors as text"""
+    try:
+        return filter_spike_file(input_file, None, harts, privs), None
+    except Exception as e:
+        return None, str(e)
+
+
+def filter_spike_tree(root, harts=None, privs=None, jobs=None, force=False):
+    """
+    Filter every raw Spike log under root across a process pool
+
+    Args:
+        root (str): Regression root (e.g. digital/sim/run/riscv_dv_test)
+        harts (iterable): Hart IDs to keep (None keeps every hart)
+        privs (iterable): Privilege levels to keep (None keeps every level)
+        jobs (int): Worker processes (default: number of CPUs)
+        force (bool): Re-filter files whose output is already up to date
+
+    Returns:
+        list: (input_file, status, FilterStats or None, error or None) tuples
+    """
+    results = []
+    pending = []
+    for input_file in discover_spike_logs(root):
+        if not force and is_up_to_date(input_file, default_output_path(input_file)):
+            results.append((input_file, 'skipped', None, None))
+        else:
+            pending.append(input_file)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {pool.submit(_batch_worker, input_file, harts, privs): input_file
+                       for input_file in pending}
+            for future in as_completed(futures):
+                stats, error = future.result()
+                status = 'failed' if error else 'filtered'
+                results.append((futures[future], status, stats, error))
+
+    results.sort(key=lambda result: result[0])
+    return results
+
+
+def print_batch_summary(root, results, elapsed):
+    """Print the per-file summary table of a batch run"""
+    print(f"{'File':<60} {'Status':<9} {'Lines':>12} {'Commits':>12} {'MB/s':>8}")
+    print("-" * 105)
+    total_bytes = 0
+    for input_file, status, stats, error in results:
+        name = os.path.relpath(input_file, root)
+        if len(name) > 60:
+            name = "..." + name[-57:]
+        if stats:
+            total_bytes += stats.input_bytes
+            print(f"{name:<60} {status:<9} {stats.total_lines:>12,} "
+                  f"{stats.filtered_lines:>12,} {throughput_mb_s(stats):>8.1f}")
+        else:
+            print(f"{name:<60} {status:<9} {'-':>12} {'-':>12} {'-':>8}")
+            if error:
+                print(f"    Error: {error}")
+    print("-" * 105)
+
+    counts = {status: sum(1 for r in results if r[1] == status)
+              for status in ('filtered', 'skipped', 'failed')}
+    print(f"Files: {len(results)} (filtered: {counts['filtered']}, "
+          f"up to date: {counts['skipped']}, failed: {counts['failed']})")
+    if total_bytes and elapsed > 0:
+        print(f"Aggregate throughput: {total_bytes / (1024 * 1024) / elapsed:.1f} MB/s "
+              f"in {elapsed:.2f} s")
+
+
+def parse_id_list(text):
+    """Parse a comma separated list of integers ("0,1") for --hart/--priv"""
+    try:
+        return [int(value) for value in text.split(',') if value.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid ID list: '{text}'")
+
+
 def main():
     """Main function to handle command line arguments"""
-    
+
     print("Spike Log Filter - by Şükrü-AI")
     print("=" * 40)
-    
-    # Check command line arguments
-    if len(sys.argv) < 2:
-        print("Usage:")
-        print(f"   python {sys.argv[0]} <input_log_file> [output_file]")
-        print("\nExamples:")
-        print(f"   python {sys.argv[0]} spike_sim.log")
-        print(f"   python {sys.argv[0]} spike_sim.log filtered_output.log")
-        print("\nIf no output file is specified, it will create one automatically.")
+
+    parser = argparse.ArgumentParser(
+        description='Keep only commit lines of Spike logs and strip the "core N: P" prefix',
+        epilog='If no output file is specified, <input>_filtered.log is created for each input. '
+               'The classic form "spike_log_filter.py INPUT OUTPUT" still works when OUTPUT '
+               'does not exist yet.')
+    parser.add_argument('inputs', nargs='*', help='Spike log file(s) to filter')
+    parser.add_argument('-o', '--output', help='Output file (only with a single input)')
+    parser.add_argument('--hart', type=parse_id_list, default=None,
+                        help='Comma separated hart IDs to keep (default: all)')
+    parser.add_argument('--priv', type=parse_id_list, default=None,
+                        help='Comma separated privilege levels to keep (default: all)')
+    parser.add_argument('--batch', metavar='ROOT',
+                        help='Filter every spike_sim/*.log below ROOT in parallel')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Worker processes for --batch (default: number of CPUs)')
+    parser.add_argument('--force', action='store_true',
+                        help='With --batch, re-filter logs whose output is up to date')
+
+    args = parser.parse_args()
+
+    if args.batch:
+        if args.inputs or args.output:
+            parser.error("--batch cannot be combined with input/output files")
+        start = time.perf_counter()
+        results = filter_spike_tree(args.batch, args.hart, args.priv, args.jobs, args.force)
+        if not results:
+            print(f"No Spike logs found under '{args.batch}'")
+            sys.exit(1)
+        print_batch_summary(args.batch, results, time.perf_counter() - start)
+        if any(status == 'failed' for _, status, _, _ in results):
+            sys.exit(1)
         return
-    
-    input_file = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else None
-    
-    # Process the file
-    success = filter_spike_log(input_file, output_file)
-    
+
+    if not args.inputs:
+        parser.error("no input files given (or use --batch ROOT)")
+    if args.output and len(args.inputs) > 1:
+        parser.error("--output can only be used with a single input file")
+    if not args.output and len(args.inputs) == 2 and not os.path.exists(args.inputs[1]):
+        # Positional [output_file] of the original command line
+        args.output = args.inputs.pop()
+
+    # Process the files
+    success = True
+    for input_file in args.inputs:
+        success &= filter_spike_log(input_file, args.output, args.hart, args.priv)
+        print()
+
     if success:
-        print("\nProcessing completed successfully!")
+        print("Processing completed successfully!")
     else:
-        print("\nProcessing failed!")
+        print("Processing failed!")
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests of the spin-loop collapse (trace_loops.py) and its use in trace_diff.py
+
+Usage:
+    python -m pytest scripts/test_trace_loops.py
+"""
+
+from trace_diff import TraceComparator
+from trace_loops import collapse_loops
+
+ADDI = 0x00150513      # addi a0, a0, 1
+SW = 0x00a12023        # sw a0, 0(sp)
+AUIPC = 0x00000f17     # auipc t5, 0
+
+
+def jal_x0(offset):
+    """Instruction word of j offset"""
+    imm = offset & 0x1FFFFF
+    return (((imm >> 20) & 0x1) << 31 | ((imm >> 1) & 0x3FF) << 21 |
+            ((imm >> 11) & 0x1) << 20 | ((imm >> 12) & 0xFF) << 12 | 0x6F)
+
+
+def straight_line(pc, count, value=0):
+    """count register-writing commits from pc on"""
+    return [f"0x{pc + 4 * i:08x} (0x{ADDI:08x}) x10 0x{value + i:08x}" for i in range(count)]
+
+
+def tohost_loop(pc):
+    """One iteration of the riscv-dv write_tohost loop"""
+    return [f"0x{pc:08x} (0x{AUIPC:08x}) x30 0x{pc:08x}",
+            f"0x{pc + 4:08x} (0x{SW:08x}) mem 0x80001000 0x00000001",
+            f"0x{pc + 8:08x} (0x{jal_x0(-8):08x})"]
+
+
+def write_trace(path, lines):
+    path.write_text(''.join(line + '\n' for line in lines))
+    return str(path)
+
+
+def test_double_committed_store_is_not_end_of_test(tmp_path):
+    store = "0x80000050 (0x00a12023) mem 0x80002000 0x00000005"
+    spike = straight_line(0x80000000, 20) + [store] + straight_line(0x80000054, 40, 100)
+    core = spike[:21] + [store] + spike[21:]
+
+    collapsed, collapser = collapse_loops(core)
+    assert collapsed == core
+    assert collapser.end_of_test is None
+
+    comparator = TraceComparator()
+    comparator.compare(write_trace(tmp_path / 'trace.log', core),
+                       write_trace(tmp_path / 'spike.log', spike))
+    assert comparator.stats['deletions'] == 1
+    assert comparator.stats['insertions'] == 0
+    assert comparator.stats['loops_removed'] == 0
+
+
+def test_short_store_loop_does_not_hide_divergence(tmp_path):
+    head = straight_line(0x80000000, 10) + tohost_loop(0x80000100) * 2
+    core = head + straight_line(0x80000200, 10, 1)
+    spike = head + straight_line(0x80000200, 10, 2)
+
+    comparator = TraceComparator()
+    comparator.compare(write_trace(tmp_path / 'trace.log', core),
+                       write_trace(tmp_path / 'spike.log', spike))
+    assert comparator.stats['deletions'] == 10
+    assert comparator.stats['insertions'] == 10
+
+
+def test_end_of_test_loop_stops_reading():
+    head = straight_line(0x80000000, 10)
+    lines = head + tohost_loop(0x80000100) * 1000 + ["0x80000200 (0x00000013)"]
+
+    collapsed, collapser = collapse_loops(lines)
+    assert collapsed == head + tohost_loop(0x80000100) + \
+        ["0x80000100 (loop end of test, period 3)"]
+    assert collapser.end_of_test == len(head) + 3 * 3
+    assert collapser.removed == 2 * 3
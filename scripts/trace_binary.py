@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Binary Commit Trace Format
+
+Converts textual commit traces (core trace.log or Spike filtered log) into
+a fixed-width binary record file so that later tools can load them without
+any text parsing.
+
+File layout (little endian):
+    Header (32 bytes)
+        magic        4s   b'RVCT'
+        version      u16
+        record_size  u16
+        count        u64  number of records
+        reserved     16 bytes
+    Records (24 bytes each)
+        pc, insn, rd_value, mem_addr, mem_data   u32 each
+        rd                                       u8
+        reserved                                 u8
+        flags                                    u16 (commit_trace.FLAG_*)
+
+Readers can memory-map the record area as a NumPy structured array with
+load_trace(), or iterate it with the standard library via iter_binary_records().
+
+Usage:
+    python trace_binary.py convert trace.log [-o trace.rvct]
+    python trace_binary.py info trace.rvct
+    python trace_binary.py dump trace.rvct [--head N]
+"""
+
+import argparse
+import os
+import struct
+import sys
+
+from commit_trace import CommitRecord, format_commit_record, iter_commit_records
+
+MAGIC = b'RVCT'
+VERSION = 1
+HEADER = struct.Struct('<4sHHQ16x')
+RECORD = struct.Struct('<IIIIIBxH')
+HEADER_SIZE = HEADER.size
+RECORD_SIZE = RECORD.size
+
+# Records buffered in memory before each write
+WRITE_BATCH = 65536
+
+# NumPy view of one record, kept as a plain description so that importing
+# this module does not require NumPy
+RECORD_FIELDS = {
+    'names': ['pc', 'insn', 'rd_value', 'mem_addr', 'mem_data', 'rd', 'flags'],
+    'formats': ['<u4', '<u4', '<u4', '<u4', '<u4', 'u1', '<u2'],
+    'offsets': [0, 4, 8, 12, 16, 20, 22],
+    'itemsize': RECORD_SIZE,
+}
+
+
+def record_dtype():
+    """NumPy structured dtype matching the on-disk record layout"""
+    import numpy as np
+    return np.dtype(RECORD_FIELDS)
+
+
+def default_output_path(trace_file):
+    """Return the conventional ``<name>.rvct`` path for a text trace"""
+    return os.path.splitext(trace_file)[0] + '.rvct'
+
+
+def write_binary_trace(records, output_file):
+    """
+    Write an iterable of CommitRecords to a binary trace file
+
+    Returns:
+        int: Number of records written
+    """
+    pack = RECORD.pack
+    count = 0
+    with open(output_file, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE, 0))
+        batch = []
+        for pc, insn, rd, rd_value, mem_addr, mem_data, flags in records:
+            batch.append(pack(pc, insn, rd_value, mem_addr, mem_data, rd, flags))
+            if len(batch) >= WRITE_BATCH:
+                f.write(b''.join(batch))
+                count += len(batch)
+                batch = []
+        if batch:
+            f.write(b''.join(batch))
+            count += len(batch)
+        # Patch the record count now that it is known
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE, count))
+    return count
+
+
+def convert_trace(trace_file, output_file=None):
+    """
+    Convert a textual commit trace to the binary format
+
+    Returns:
+        tuple: (output_file, record_count)
+    """
+    if output_file is None:
+        output_file = default_output_path(trace_file)
+
+    return output_file, write_binary_trace(iter_commit_records(trace_file), output_file)
+
+
+def read_header(binary_file):
+    """
+    Read and validate the header of a binary trace
+
+    Returns:
+        int: Number of records in the file
+    """
+    with open(binary_file, 'rb') as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) != HEADER_SIZE:
+        raise ValueError(f"{binary_file}: file too short for a trace header")
+    magic, version, record_size, count = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError(f"{binary_file}: not a binary commit trace")
+    if version != VERSION or record_size != RECORD_SIZE:
+        raise ValueError(f"{binary_file}: unsupported trace version {version} "
+                         f"(record size {record_size})")
+    return count
+
+
+def load_trace(binary_file):
+    """
+    Memory-map a binary trace as a read-only NumPy structured array
+
+    Fields: pc, insn, rd_value, mem_addr, mem_data, rd, flags
+    """
+    import numpy as np
+    count = read_header(binary_file)
+    if count == 0:
+        return np.zeros(0, dtype=record_dtype())
+    return np.memmap(binary_file, dtype=record_dtype(), mode='r',
+                     offset=HEADER_SIZE, shape=(count,))
+
+
+def iter_binary_records(binary_file):
+    """
+    Iterate a binary trace as CommitRecords using only the standard library
+    """
+    count = read_header(binary_file)
+    with open(binary_file, 'rb') as f:
+        f.seek(HEADER_SIZE)
+        remaining = count
+        while remaining:
+            chunk = f.read(min(remaining, WRITE_BATCH) * RECORD_SIZE)
+            if not chunk:
+                break
+            for pc, insn, rd_value, mem_addr, mem_data, rd, flags in RECORD.iter_unpack(chunk):
+                yield CommitRecord(pc, insn, rd, rd_value, mem_addr, mem_data, flags)
+            remaining -= len(chunk) // RECORD_SIZE
+
+
+def main():
+    """Main function to handle command line arguments"""
+    parser = argparse.ArgumentParser(description='Binary commit trace converter')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = subparsers.add_parser('convert', help='Convert text trace(s) to binary')
+    convert_parser.add_argument('inputs', nargs='+', help='Core trace.log or Spike filtered log')
+    convert_parser.add_argument('-o', '--output', help='Output file (only with a single input)')
+
+    info_parser = subparsers.add_parser('info', help='Show header information')
+    info_parser.add_argument('binary_file')
+
+    dump_parser = subparsers.add_parser('dump', help='Print records in text form')
+    dump_parser.add_argument('binary_file')
+    dump_parser.add_argument('--head', type=int, default=None, help='Only print the first N records')
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'convert':
+            if args.output and len(args.inputs) > 1:
+                parser.error("--output can only be used with a single input file")
+            for trace_file in args.inputs:
+                output_file, count = convert_trace(trace_file, args.output)
+                in_size = os.path.getsize(trace_file)
+                out_size = os.path.getsize(output_file)
+                print(f"{trace_file} -> {output_file}: {count:,} records "
+                      f"({in_size:,} -> {out_size:,} bytes)")
+        elif args.command == 'info':
+            count = read_header(args.binary_file)
+            print(f"File: {args.binary_file}")
+            print(f"Version: {VERSION}")
+            print(f"Record size: {RECORD_SIZE} bytes")
+            print(f"Records: {count:,}")
+        elif args.command == 'dump':
+            for i, record in enumerate(iter_binary_records(args.binary_file)):
+                if args.head is not None and i >= args.head:
+                    break
+                print(format_commit_record(record))
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Comparison Result Cache
+
+On-disk cache for trace comparisons, keyed by content hashes of both input
+traces and the comparator options. Only the compact diff runs and the
+statistics (plus the loop records of collapsed traces) are stored; the
+commit lines are re-read from the inputs, which have to be read anyway to
+hash them.
+
+Entry layout (<key>.rvdiff, little endian):
+    magic        4s   b'RVDC'
+    version      u16
+    reserved     u16
+    stats_size   u32  size of the JSON block
+    stats        JSON {"stats": statistics, "extra": comparator data or null}
+    runs         zlib compressed int64 array, 4 values per run:
+                 (kind, core_start or -1, spike_start or -1, length)
+
+Entries are evicted least recently used first (file modification time is
+refreshed on every hit) once the directory exceeds its size limit.
+
+Usage:
+    python trace_cache.py info [--cache-dir DIR]
+    python trace_cache.py clear [--cache-dir DIR]
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import struct
+import zlib
+from array import array
+
+MAGIC = b'RVDC'
+VERSION = 3
+HEADER = struct.Struct('<4sHHI')
+ENTRY_SUFFIX = '.rvdiff'
+
+DEFAULT_CACHE_DIR = os.environ.get('RISCV_TRACE_CACHE') or os.path.join(
+    os.path.expanduser('~'), '.cache', 'riscv_trace_diff')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def content_digest(data):
+    """Content hash of one input file's bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_key(core_digest, spike_digest, options):
+    """
+    Cache key for a comparison
+
+    Args:
+        core_digest (str): content_digest() of the core trace
+        spike_digest (str): content_digest() of the Spike trace
+        options (dict): Comparator options that change the result
+    """
+    text = json.dumps([VERSION, core_digest, spike_digest, options], sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()[:40]
+
+
+class ResultCache:
+    """Size-limited LRU directory of comparison results"""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def get(self, key):
+        """
+        Look up a result
+
+        Returns:
+            tuple: (runs, stats, extra) with runs a list of 4-int tuples, or None
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            magic, version, _, stats_size = HEADER.unpack_from(data)
+            if magic != MAGIC or version != VERSION:
+                return None
+            offset = HEADER.size
+            block = json.loads(data[offset:offset + stats_size])
+            values = array('q')
+            values.frombytes(zlib.decompress(data[offset + stats_size:]))
+            os.utime(path)  # mark as recently used
+        except (OSError, ValueError, struct.error, zlib.error):
+            return None
+        runs = list(zip(values[0::4], values[1::4], values[2::4], values[3::4]))
+        return runs, block['stats'], block['extra']
+
+    def put(self, key, runs, stats, extra=None):
+        """
+        Store a result (runs as 4-int tuples, -1 for a missing side)
+
+        Args:
+            extra: Optional JSON-serializable data returned with the result
+        """
+        values = array('q')
+        for run in runs:
+            values.extend(run)
+        stats_data = json.dumps({'stats': stats, 'extra': extra}).encode()
+        payload = (HEADER.pack(MAGIC, VERSION, 0, len(stats_data)) + stats_data +
+                   zlib.compress(values.tobytes(), 1))
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(temp_path, path)
+        self.evict()
+
+    def entries(self):
+        """(path, size, last_used) of every entry, least recently used first"""
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, '*' + ENTRY_SUFFIX)):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, st.st_size, st.st_mtime))
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    def evict(self):
+        """Remove least recently used entries until the size limit holds"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        """Remove every entry"""
+        for path, _, _ in self.entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def main():
+    """Main function to handle command line arguments"""
+    parser = argparse.ArgumentParser(description='Manage the trace comparison result cache')
+    parser.add_argument('command', choices=('info', 'clear'))
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Cache directory')
+    args = parser.parse_args()
+
+    cache = ResultCache(args.cache_dir)
+    if args.command == 'clear':
+        cache.clear()
+        print(f"Cache cleared: {args.cache_dir}")
+        return
+
+    entries = cache.entries()
+    total = sum(size for _, size, _ in entries)
+    print(f"Cache directory: {args.cache_dir}")
+    print(f"Entries: {len(entries)}")
+    print(f"Size: {total / (1024 * 1024):.1f} MB (limit {cache.max_bytes / (1024 * 1024):.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
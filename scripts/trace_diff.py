@@ -0,0 +1,1234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Anchored Commit Trace Diff Engine
+
+Compares a core commit trace (trace.log from tracer_3port.sv) with a Spike
+commit trace in near-linear time. Instead of a full LCS table both commit
+streams are walked in lockstep; when they diverge, the engine looks for the
+closest resynchronization anchor (an identical commit followed by a few more
+identical commits) inside a bounded window and reports everything skipped on
+the way as deletions (core only) or insertions (Spike only).
+
+Cost is O(N + D * W) for N commits, D divergent regions and window W, which
+keeps million-instruction traces in the seconds range. Long identical
+stretches are skipped with slice comparisons instead of per-commit steps.
+Each difference block is then realigned with an exact bit-parallel LCS
+(up to HUNK_LCS_LIMIT commits per side), so identical commits too short
+to anchor on still count as matches.
+
+The module has no GUI dependencies and doubles as the headless command line
+comparator for CI: --format json/junit writes machine-readable results and
+the exit code is 0 for identical traces, 1 for differences and 2 for errors.
+Traces that are identical only after same-cycle reordering exit with 0;
+the report, JSON ('reordered') and JUnit (system-err) give the count.
+
+Spin loops (the riscv-dv tohost end-of-test loop in particular) are folded
+into single loop records before diffing (see trace_loops.py); the same loop
+matches on both sides whatever its iteration count. Before that, commits the
+3-wide core retired out of program order within one cycle are put back in
+order (see trace_reorder.py); this needs trace_timestamp.log next to the
+core trace, without it the core trace is compared as written.
+
+Usage:
+    python trace_diff.py core_sim/trace.log core_sim/spike_trace.log
+    python trace_diff.py trace.log spike_trace.log --format junit -o result.xml
+    python trace_diff.py trace.log spike_trace.log --first-divergence --format json
+"""
+
+import argparse
+import html
+import json
+import os
+import re
+import sys
+import time
+from array import array
+from bisect import bisect_right
+from collections import deque
+from enum import Enum
+from itertools import chain, repeat
+from typing import Dict, List, NamedTuple, Optional
+
+from commit_trace import FLAG_RD_WRITE, parse_commit_line
+from trace_loops import CollapsedTrace, LoopCollapser, collapse_loops, loop_key
+from trace_reader import open_commit_trace
+from trace_reorder import (ReorderedTrace, StreamReorderer, canonicalize, iter_commit_cycles,
+                           read_commit_cycles, timestamp_log_for)
+
+# Search window (commits on each side) used to resynchronize after a divergence
+DEFAULT_WINDOW = 512
+
+# Number of commits after an anchor that must also match for it to be accepted
+ANCHOR_CONFIRM = 3
+
+# Commits per side of a difference block that are realigned with an exact LCS
+HUNK_LCS_LIMIT = 4096
+
+# Context lines shown around each hunk of the text report
+REPORT_CONTEXT = 3
+
+# Commits of context shown before/after the first divergence
+DIVERGENCE_CONTEXT = 5
+
+# Differences listed in JSON output unless --max-differences says otherwise
+JSON_DIFFERENCES = 100
+
+# Spike commits searched for the core's first PC, to skip the Spike boot ROM
+# (0x1000 reset vector code that the core trace does not contain)
+BOOT_ROM_SEARCH = 16
+
+# CSR writes (c769_misa 0x40000100) are only emitted by Spike, never by the
+# core tracer, so they are ignored when comparing commits
+_CSR_WRITE_RE = re.compile(r' c\d+_\w+ 0x[0-9a-fA-F]+')
+
+
+class DiffType(Enum):
+    """Kind of a diff entry"""
+    MATCH = 'match'            # identical commit on both sides
+    DELETION = 'deletion'      # commit only present in the core trace
+    INSERTION = 'insertion'    # commit only present in the Spike trace
+
+
+class DiffResult(NamedTuple):
+    """One entry of an aligned comparison"""
+    diff_type: DiffType
+    core_index: Optional[int]      # 0-based commit index in the core trace
+    spike_index: Optional[int]     # 0-based commit index in the Spike trace
+    core_line: Optional[str]
+    spike_line: Optional[str]
+
+
+class FirstDivergence(NamedTuple):
+    """First commit where the core and Spike traces disagree"""
+    core_index: int                        # 0-based commit index in the core trace
+    spike_index: int                       # 0-based commit index in the Spike trace
+    core_line: Optional[str]               # None if the core trace ended first
+    spike_line: Optional[str]              # None if the Spike trace ended first
+    before: List[str]                      # agreed commits before it
+    core_after: List[str]
+    spike_after: List[str]
+    registers: Dict[int, int]              # x0-x31 at that point
+
+
+def normalize_commit_line(line, ignore_csr=True):
+    """Canonical form of a commit line used for comparison"""
+    line = line.rstrip()
+    if ignore_csr and ' c' in line:
+        line = _CSR_WRITE_RE.sub('', line)
+    return line
+
+
+def read_trace_bytes(log_file):
+    """
+    Read a trace file and split it into commit lines
+
+    The whole file is read and decoded at once, which is the fastest way to
+    get every line; trace_reader.open_commit_trace() gives lazy access.
+
+    Returns:
+        tuple: (raw_lines, file_bytes)
+    """
+    with open(log_file, 'rb') as f:
+        data = f.read()
+    text = data.decode('utf-8', errors='replace')
+    lines = text.splitlines()
+
+    # Tracer and filtered Spike output hold nothing but clean commit lines;
+    # only other files need the per-line filter
+    clean = ('\r' not in text and '\t' not in text and ' \n' not in text and
+             not text.endswith(' ') and
+             text.count('\n0x') + text.startswith('0x') == len(lines))
+    if clean:
+        return lines, data
+    return [line.rstrip() for line in lines if line.startswith('0x')], data
+
+
+def normalize_commit_lines(raw_lines, ignore_csr=True):
+    """normalize_commit_line() for a whole list of rstripped commit lines"""
+    if not ignore_csr:
+        return raw_lines
+    sub = _CSR_WRITE_RE.sub
+    return [sub('', line) if ' c' in line else line for line in raw_lines]
+
+
+def read_commit_lines(log_file, ignore_csr=True):
+    """
+    Read the commit lines of a trace
+
+    Returns:
+        tuple: (raw_lines, normalized_lines)
+    """
+    raw_lines, _ = read_trace_bytes(log_file)
+    return raw_lines, normalize_commit_lines(raw_lines, ignore_csr)
+
+
+def iter_commit_lines(log_file):
+    """Stream the commit lines of a trace (trailing whitespace removed)"""
+    with open(log_file, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if line.startswith('0x'):
+                yield line.rstrip()
+
+
+def loop_keys(lines, keys, loops):
+    """Comparison keys with the iteration counts of loop records removed"""
+    if not loops:
+        return keys
+    if keys is lines:
+        keys = list(keys)
+    for loop in loops:
+        keys[loop.index] = loop_key(keys[loop.index])
+    return keys
+
+
+def boot_rom_skip(first_core, spike_head):
+    """
+    Spike commits to skip before the core's first commit
+
+    Args:
+        first_core (str): First core commit line (None for an empty trace)
+        spike_head (list): First BOOT_ROM_SEARCH Spike commit lines
+
+    Returns:
+        int: Index of the first Spike commit at the core's first PC, 0 if none
+    """
+    if first_core is None:
+        return 0
+    pc = first_core.split(None, 1)[0]
+    return next((k for k, line in enumerate(spike_head) if line.split(None, 1)[0] == pc), 0)
+
+
+def find_first_divergence(core_file, spike_file, context=DIVERGENCE_CONTEXT, ignore_csr=True,
+                          align_start=True, collapse=True, reorder=True, stats=None):
+    """
+    Stream both traces and stop at the first mismatching commit
+
+    Only the commits up to the divergence (plus context) are read, so the
+    cost does not depend on the trace length. The architectural register
+    file is rebuilt from the agreed commits on the way.
+
+    Args:
+        align_start (bool): Skip leading Spike commits (boot ROM) until the
+                            core's first PC, if it shows up early enough
+        collapse (bool): Fold spin loops first (indices count loop records
+                         as one commit)
+        reorder (bool): Restore program order inside the cycles of the core
+                        trace first (needs trace_timestamp.log next to it)
+        stats (dict): Optional; receives 'reordered', the core commits
+                      moved into program order on the way
+
+    Returns:
+        FirstDivergence or None if the traces are identical
+    """
+    registers = dict.fromkeys(range(32), 0)
+    before = deque(maxlen=context)
+    core_iter = iter_commit_lines(core_file)
+    spike_iter = iter_commit_lines(spike_file)
+    reorderer = StreamReorderer()
+    timestamps = timestamp_log_for(core_file) if reorder else None
+    if timestamps:
+        core_iter = reorderer.reorder(core_iter, iter_commit_cycles(timestamps))
+    if collapse:
+        core_iter = LoopCollapser().collapse(core_iter)
+        spike_iter = LoopCollapser().collapse(spike_iter)
+    core_index = spike_index = 0
+
+    if align_start:
+        first_core = next(core_iter, None)
+        head = [line for _, line in zip(range(BOOT_ROM_SEARCH), spike_iter)]
+        spike_index = boot_rom_skip(first_core, head)
+        head = head[spike_index:]
+        if first_core is not None:
+            core_iter = chain([first_core], core_iter)
+        spike_iter = chain(head, spike_iter)
+
+    for core_line in core_iter:
+        spike_line = next(spike_iter, None)
+        if spike_line is None:
+            break
+        core_key = normalize_commit_line(core_line, ignore_csr)
+        spike_key = normalize_commit_line(spike_line, ignore_csr)
+        if core_key != spike_key and loop_key(core_key) != loop_key(spike_key):
+            break
+        record = parse_commit_line(core_line)
+        if record is not None and record.flags & FLAG_RD_WRITE and record.rd:
+            registers[record.rd] = record.rd_value
+        before.append(core_line)
+        core_index += 1
+        spike_index += 1
+    else:
+        # Core trace ended: identical unless Spike has more commits
+        core_line = None
+        spike_line = next(spike_iter, None)
+        if spike_line is None:
+            if stats is not None:
+                stats['reordered'] = reorderer.moved
+            return None
+
+    core_after = [line for _, line in zip(range(context), core_iter)]
+    spike_after = [line for _, line in zip(range(context), spike_iter)]
+    if stats is not None:
+        stats['reordered'] = reorderer.moved
+    return FirstDivergence(core_index, spike_index, core_line, spike_line, list(before),
+                           core_after, spike_after, registers)
+
+
+def format_first_divergence(divergence, core_file=None, spike_file=None, reordered=0):
+    """
+    Human readable report of a FirstDivergence (None means no divergence)
+
+    Args:
+        reordered (int): Core commits moved into program order before the search
+    """
+    if divergence is None:
+        if reordered:
+            return (f"⚠️ Traces are identical only after moving {reordered:,} core commits "
+                    f"into program order (--no-reorder compares them as written)\n")
+        return "✅ Traces are identical - no divergence found\n"
+
+    out = ["⚡ FIRST DIVERGENCE", "-" * 80]
+    if core_file and spike_file:
+        out += [f"Core log:  {core_file}", f"Spike log: {spike_file}"]
+    out.append(f"Core commit #{divergence.core_index + 1}, Spike commit #{divergence.spike_index + 1}")
+    out.append("")
+    for line in divergence.before:
+        out.append('  ' + line)
+    out.append('- ' + (divergence.core_line or '<end of core trace>'))
+    out.append('+ ' + (divergence.spike_line or '<end of Spike trace>'))
+    out.append("")
+    out.append("Core continues with:")
+    out.extend('    ' + line for line in divergence.core_after)
+    out.append("Spike continues with:")
+    out.extend('    ' + line for line in divergence.spike_after)
+    out.append("")
+    out.append("Register state before the divergent commit:")
+    for row in range(0, 32, 4):
+        out.append('  ' + '  '.join(f"x{r:<2} 0x{divergence.registers[r]:08x}"
+                                    for r in range(row, row + 4)))
+    return '\n'.join(out) + '\n'
+
+
+def anchored_diff_runs(core_keys, spike_keys, window=DEFAULT_WINDOW, confirm=ANCHOR_CONFIRM):
+    """
+    Align two sequences of comparison keys
+
+    Returns:
+        list: (DiffType, core_start, spike_start, length) runs in order;
+              core_start is None for insertions, spike_start for deletions
+    """
+    n = len(core_keys)
+    m = len(spike_keys)
+    runs = []
+    append = runs.append
+    MATCH, DELETION, INSERTION = DiffType.MATCH, DiffType.DELETION, DiffType.INSERTION
+
+    def confirmed(ci, sj):
+        for k in range(1, confirm + 1):
+            if ci + k >= n or sj + k >= m:
+                return True
+            if core_keys[ci + k] != spike_keys[sj + k]:
+                return False
+        return True
+
+    i = j = 0
+    while i < n and j < m:
+        if core_keys[i] == spike_keys[j]:
+            # Lockstep walk over the common stretch, comparing growing slices
+            # so that long identical regions are skipped at C speed
+            run_i, run_j = i, j
+            step = 16
+            while True:
+                k = min(step, n - i, m - j)
+                if k and core_keys[i:i + k] == spike_keys[j:j + k]:
+                    i += k
+                    j += k
+                    step = min(step * 2, 4096)
+                    continue
+                while i < n and j < m and core_keys[i] == spike_keys[j]:
+                    i += 1
+                    j += 1
+                break
+            append((MATCH, run_i, run_j, i - run_i))
+            continue
+
+        # Divergence: index the Spike window once, then scan the core window
+        core_end = min(n, i + window)
+        spike_end = min(m, j + window)
+        positions = {}
+        for sj in range(j, spike_end):
+            positions.setdefault(spike_keys[sj], []).append(sj - j)
+
+        best_cost = window * 2
+        best = None
+        for di in range(core_end - i):
+            if di >= best_cost:
+                break
+            offsets = positions.get(core_keys[i + di])
+            if not offsets:
+                continue
+            for dj in offsets:
+                if di + dj >= best_cost:
+                    break
+                if confirmed(i + di, j + dj):
+                    best_cost = di + dj
+                    best = (di, dj)
+                    break
+
+        if best is None:
+            # No anchor for any skew inside the window: consume the whole
+            # window as substitutions. Skews are preserved by advancing both
+            # sides equally, so no reachable anchor is lost.
+            step = min(core_end - i, spike_end - j)
+            best = (step, step)
+
+        di, dj = best
+        if di:
+            append((DELETION, i, None, di))
+        if dj:
+            append((INSERTION, None, j, dj))
+        i += di
+        j += dj
+
+    if i < n:
+        append((DELETION, i, None, n - i))
+    if j < m:
+        append((INSERTION, None, j, m - j))
+    return refine_hunks(runs, core_keys, spike_keys)
+
+
+def _append_run(runs, run):
+    """Append a run, merging it into the previous run of the same type"""
+    if runs and runs[-1][0] is run[0]:
+        diff_type, ci, sj, length = runs[-1]
+        runs[-1] = (diff_type, ci, sj, length + run[3])
+    else:
+        runs.append(run)
+
+
+def lcs_runs(core_keys, ci, n, spike_keys, sj, m):
+    """
+    Exact LCS alignment of core_keys[ci:ci + n] and spike_keys[sj:sj + m]
+
+    Bit-parallel LCS: one m-bit integer per core commit, O(n * m / 64)
+    word operations. The integers are kept for the traceback; a zero bit k
+    of row a marks a column where the LCS of the first a core commits
+    grows, so LCS(a, b) is b minus the one bits of row a below b.
+
+    Returns:
+        list: Runs as anchored_diff_runs() returns them
+    """
+    MATCH, DELETION, INSERTION = DiffType.MATCH, DiffType.DELETION, DiffType.INSERTION
+    masks = {}
+    for k in range(m):
+        key = spike_keys[sj + k]
+        masks[key] = masks.get(key, 0) | (1 << k)
+    full = (1 << m) - 1
+    rows = [full]
+    v = full
+    for a in range(n):
+        u = v & masks.get(core_keys[ci + a], 0)
+        v = ((v + u) | (v - u)) & full
+        rows.append(v)
+
+    def lcs(a, b):
+        return b - bin(rows[a] & ((1 << b) - 1)).count('1')
+
+    # Traceback from the end; insertions are taken first on ties so that
+    # deletions precede insertions in each gap, as in the anchored walk
+    steps = []
+    a, b = n, m
+    while a and b:
+        if core_keys[ci + a - 1] == spike_keys[sj + b - 1]:
+            steps.append(MATCH)
+            a -= 1
+            b -= 1
+        elif lcs(a, b - 1) >= lcs(a - 1, b):
+            steps.append(INSERTION)
+            b -= 1
+        else:
+            steps.append(DELETION)
+            a -= 1
+    steps.extend(repeat(INSERTION, b))
+    steps.extend(repeat(DELETION, a))
+
+    runs = []
+    i, j = ci, sj
+    for step in reversed(steps):
+        if step is MATCH:
+            _append_run(runs, (MATCH, i, j, 1))
+            i += 1
+            j += 1
+        elif step is DELETION:
+            _append_run(runs, (DELETION, i, None, 1))
+            i += 1
+        else:
+            _append_run(runs, (INSERTION, None, j, 1))
+            j += 1
+    return runs
+
+
+def refine_hunks(runs, core_keys, spike_keys, limit=HUNK_LCS_LIMIT):
+    """
+    Realign the difference blocks of anchored runs with an exact LCS
+
+    An anchor needs ANCHOR_CONFIRM matching commits after it, so short
+    identical stretches inside a hunk come out of the anchored walk as
+    deletion/insertion pairs. Each block of consecutive non-match runs is
+    realigned in chunks of at most limit commits per side; the identical
+    commits become match runs.
+
+    Returns:
+        list: Runs with adjacent runs of the same type merged
+    """
+    MATCH, DELETION = DiffType.MATCH, DiffType.DELETION
+    out = []
+    chunk = []
+    sizes = [0, 0]
+
+    def flush():
+        if sizes[0] and sizes[1]:
+            ci = next(run[1] for run in chunk if run[0] is DELETION)
+            sj = next(run[2] for run in chunk if run[0] is not DELETION)
+            for run in lcs_runs(core_keys, ci, sizes[0], spike_keys, sj, sizes[1]):
+                _append_run(out, run)
+        else:
+            for run in chunk:
+                _append_run(out, run)
+        chunk.clear()
+        sizes[0] = sizes[1] = 0
+
+    for run in runs:
+        if run[0] is MATCH:
+            flush()
+            _append_run(out, run)
+            continue
+        side = 0 if run[0] is DELETION else 1
+        if sizes[side] + run[3] > limit:
+            flush()
+        chunk.append(run)
+        sizes[side] += run[3]
+    flush()
+    return out
+
+
+def expand_runs(runs, core_lines, spike_lines):
+    """Expand diff runs into one DiffResult per commit"""
+    results = []
+    extend = results.extend
+    for diff_type, ci, sj, length in runs:
+        if diff_type is DiffType.MATCH:
+            extend(map(DiffResult, repeat(diff_type, length), range(ci, ci + length),
+                       range(sj, sj + length), core_lines[ci:ci + length],
+                       spike_lines[sj:sj + length]))
+        elif diff_type is DiffType.DELETION:
+            extend(map(DiffResult, repeat(diff_type, length), range(ci, ci + length),
+                       repeat(None, length), core_lines[ci:ci + length], repeat(None, length)))
+        else:
+            extend(map(DiffResult, repeat(diff_type, length), repeat(None, length),
+                       range(sj, sj + length), repeat(None, length), spike_lines[sj:sj + length]))
+    return results
+
+
+def anchored_diff(core_lines, spike_lines, window=DEFAULT_WINDOW, confirm=ANCHOR_CONFIRM,
+                  core_keys=None, spike_keys=None):
+    """
+    Compute the anchored diff between two lists of commit lines
+
+    Args:
+        core_lines (list): Core commit lines (shown in results)
+        spike_lines (list): Spike commit lines (shown in results)
+        window (int): Resynchronization window in commits
+        confirm (int): Commits after an anchor that must also match
+        core_keys/spike_keys (list): Optional pre-normalized comparison keys
+
+    Returns:
+        List[DiffResult]
+    """
+    if core_keys is None:
+        core_keys = [normalize_commit_line(line) for line in core_lines]
+    if spike_keys is None:
+        spike_keys = [normalize_commit_line(line) for line in spike_lines]
+    runs = anchored_diff_runs(core_keys, spike_keys, window, confirm)
+    return expand_runs(runs, core_lines, spike_lines)
+
+
+# Run kinds in the order of their integer codes in the result cache
+_RUN_TYPES = [DiffType.MATCH, DiffType.DELETION, DiffType.INSERTION]
+
+# Side-by-side row kinds of a ComparisonResult
+ROW_MATCH = 0        # identical commit on both sides
+ROW_CHANGED = 1      # same PC on both sides, different contents
+ROW_CORE_ONLY = 2    # commit only in the core trace
+ROW_SPIKE_ONLY = 3   # commit only in the Spike trace
+
+
+def _commit_pc(line):
+    """PC token of a commit line"""
+    return line.split(None, 1)[0]
+
+
+class ComparisonResult:
+    """
+    Structured, columnar outcome of a comparison
+
+    The side-by-side alignment is stored as three parallel arrays indexed by
+    row: row_kind (ROW_*), row_core and row_spike (commit indices, -1 if the
+    side is missing). diff_rows lists every row that is not a match in
+    ascending order. The text report is only rendered on request.
+
+    core_lines/spike_lines are lists or, for cached results, TraceReader
+    views that decode commit lines from the memory-mapped traces on access
+    (wrapped in CollapsedTrace views when spin loops were folded).
+    """
+
+    def __init__(self, core_file, spike_file, core_lines, spike_lines, runs, stats,
+                 context=REPORT_CONTEXT):
+        self.core_file = core_file
+        self.spike_file = spike_file
+        self.core_lines = core_lines
+        self.spike_lines = spike_lines
+        self.runs = runs
+        self.stats = stats
+        self.context = context
+        self.row_kind = array('b')
+        self.row_core = array('l')
+        self.row_spike = array('l')
+        self.diff_rows = array('l')
+        self._build_rows()
+        self._results = None
+        self._registers = None
+        self._gaps = {}
+
+    def _build_rows(self):
+        """Pair deletion/insertion blocks by PC into side-by-side rows"""
+        kind, core, spike = self.row_kind, self.row_core, self.row_spike
+        runs = self.runs
+        # Match runs copy slices of one identity array instead of iterating ranges
+        identity = array('l', range(max(len(self.core_lines), len(self.spike_lines))))
+        r = 0
+        while r < len(runs):
+            diff_type, ci, sj, length = runs[r]
+            if diff_type is DiffType.MATCH:
+                kind.extend(bytes(length))
+                core.extend(identity[ci:ci + length])
+                spike.extend(identity[sj:sj + length])
+                r += 1
+                continue
+
+            block_start = len(kind)
+
+            deletions = []
+            insertions = []
+            while r < len(runs) and runs[r][0] is not DiffType.MATCH:
+                diff_type, ci, sj, length = runs[r]
+                if diff_type is DiffType.DELETION:
+                    deletions.extend(range(ci, ci + length))
+                else:
+                    insertions.extend(range(sj, sj + length))
+                r += 1
+
+            # Spike commits in order, each paired with the first unused core
+            # commit of the same PC; unpaired core commits are placed before
+            # the first pair with a later core commit, so both sides stay in order
+            by_pc = {}
+            for index in deletions:
+                by_pc.setdefault(_commit_pc(self.core_lines[index]), deque()).append(index)
+            pairs = []
+            used = set()
+            for index in insertions:
+                candidates = by_pc.get(_commit_pc(self.spike_lines[index]))
+                core_index = candidates.popleft() if candidates else -1
+                if core_index >= 0:
+                    used.add(core_index)
+                pairs.append((core_index, index))
+            unpaired = deque(index for index in deletions if index not in used)
+            for core_index, index in pairs:
+                while unpaired and 0 <= core_index and unpaired[0] < core_index:
+                    kind.append(ROW_CORE_ONLY)
+                    core.append(unpaired.popleft())
+                    spike.append(-1)
+                kind.append(ROW_CHANGED if core_index >= 0 else ROW_SPIKE_ONLY)
+                core.append(core_index)
+                spike.append(index)
+            for index in unpaired:
+                kind.append(ROW_CORE_ONLY)
+                core.append(index)
+                spike.append(-1)
+            # Every row of a deletion/insertion block is a difference
+            self.diff_rows.extend(range(block_start, len(kind)))
+
+    def __len__(self):
+        return len(self.row_kind)
+
+    def row(self, r):
+        """(kind, core_line or None, spike_line or None) of a side-by-side row"""
+        ci = self.row_core[r]
+        sj = self.row_spike[r]
+        return (self.row_kind[r],
+                self.core_lines[ci] if ci >= 0 else None,
+                self.spike_lines[sj] if sj >= 0 else None)
+
+    def hunk_ranges(self, context=None):
+        """
+        Row ranges covering every difference plus context rows
+
+        Returns:
+            list: (start, end) half-open row ranges, merged and in order
+        """
+        if context is None:
+            context = self.context
+        ranges = []
+        total = len(self.row_kind)
+        for r in self.diff_rows:
+            start = max(0, r - context)
+            end = min(total, r + context + 1)
+            if ranges and start <= ranges[-1][1]:
+                ranges[-1][1] = max(ranges[-1][1], end)
+            else:
+                ranges.append([start, end])
+        return [tuple(item) for item in ranges]
+
+    @property
+    def results(self) -> List[DiffResult]:
+        """Per-commit DiffResults in diff order (expanded on first use)"""
+        if self._results is None:
+            self._results = expand_runs(self.runs, self.core_lines, self.spike_lines)
+        return self._results
+
+    @property
+    def match_percent(self):
+        """Matched commits as a percentage of all diff entries"""
+        stats = self.stats
+        total = stats['perfect_matches'] + stats['deletions'] + stats['insertions']
+        return stats['perfect_matches'] / total * 100 if total else 0.0
+
+    def difference(self, row):
+        """Machine-readable description of one side-by-side row"""
+        kind, core_line, spike_line = self.row(row)
+        ci = self.row_core[row]
+        sj = self.row_spike[row]
+        return {
+            'row': row,
+            'kind': ('match', 'changed', 'core_only', 'spike_only')[kind],
+            'core_index': ci if ci >= 0 else None,
+            'spike_index': sj if sj >= 0 else None,
+            'core_line': core_line,
+            'spike_line': spike_line,
+        }
+
+    def register_histories(self):
+        """(core, spike) RegisterHistory of both traces (built on first use)"""
+        if self._registers is None:
+            from arch_state import RegisterHistory
+            self._registers = (RegisterHistory(self.core_lines), RegisterHistory(self.spike_lines))
+        return self._registers
+
+    def side_commit(self, row, side):
+        """
+        Last commit of one side at or before a row
+
+        Args:
+            side (str): 'core' or 'spike'
+
+        Returns:
+            int: Commit index (-1 if the side has no commit up to the row)
+        """
+        indices = self.row_core if side == 'core' else self.row_spike
+        if row < 0 or indices[row] >= 0:
+            return indices[row] if row >= 0 else -1
+        # The row lies in a gap of that side; the row before the gap has a commit
+        starts, _ = self._side_gaps(side)
+        row = starts[bisect_right(starts, row) - 1] - 1
+        return indices[row] if row >= 0 else -1
+
+    def _side_gaps(self, side):
+        """(starts, ends) of the runs of rows without a commit on one side"""
+        gaps = self._gaps.get(side)
+        if gaps is None:
+            indices = self.row_core if side == 'core' else self.row_spike
+            starts = array('l')
+            ends = array('l')
+            # Only difference rows can miss a side
+            for r in self.diff_rows:
+                if indices[r] < 0:
+                    if ends and ends[-1] == r:
+                        ends[-1] = r + 1
+                    else:
+                        starts.append(r)
+                        ends.append(r + 1)
+            gaps = self._gaps[side] = (starts, ends)
+        return gaps
+
+    def registers_at(self, row):
+        """
+        Core and Spike register files after the commits at a row
+
+        Returns:
+            tuple: (core registers, spike registers), 32 values each
+        """
+        core, spike = self.register_histories()
+        return (core.registers_at(self.side_commit(row, 'core')),
+                spike.registers_at(self.side_commit(row, 'spike')))
+
+    def summary(self, max_differences=JSON_DIFFERENCES):
+        """
+        Machine-readable summary of the comparison (see format_json/format_junit)
+
+        Args:
+            max_differences (int): Difference rows listed (None lists all)
+        """
+        diff_rows = self.diff_rows
+        if max_differences is not None:
+            diff_rows = diff_rows[:max_differences]
+        differences = [self.difference(row) for row in diff_rows]
+        return {
+            'core_file': self.core_file,
+            'spike_file': self.spike_file,
+            'identical': not self.diff_rows,
+            'reordered': self.stats.get('reordered', 0),
+            'match_percent': round(self.match_percent, 4),
+            'statistics': dict(self.stats),
+            'first_divergence': differences[0] if differences else None,
+            'difference_rows': len(self.diff_rows),
+            'differences': differences,
+        }
+
+    def render_report(self):
+        """Render statistics and unified-diff style hunks as text"""
+        stats = self.stats
+        out = [
+            "=" * 80,
+            "🚀 RISC-V COMMIT TRACE COMPARISON REPORT",
+            "=" * 80,
+            f"Core log:  {self.core_file}",
+            f"Spike log: {self.spike_file}",
+            "",
+            "📊 STATISTICS",
+            "-" * 80,
+            f"Core entries:    {stats['core_entries']:,}",
+            f"Spike entries:   {stats['spike_entries']:,}",
+            f"Loops removed:   {stats['loops_removed']:,}",
+            f"Reordered:       {stats.get('reordered', 0):,} (core commits moved into program order)",
+            f"Boot ROM:        {stats.get('boot_skipped', 0):,} (Spike commits before the first core PC)",
+            f"Matched commits: {stats['perfect_matches']:,}",
+            f"Deletions:       {stats['deletions']:,} (core only)",
+            f"Insertions:      {stats['insertions']:,} (Spike only)",
+            f"Match rate:      {self.match_percent:.2f}%",
+            f"Compare time:    {stats['elapsed_seconds']:.3f} s",
+            "",
+            "🔍 DETAILED DIFFERENCES",
+            "-" * 80,
+        ]
+
+        runs = self.runs
+        core_lines = self.core_lines
+        spike_lines = self.spike_lines
+        context = self.context
+        hunk = 0
+        r = 0
+        while r < len(runs):
+            if runs[r][0] is DiffType.MATCH:
+                r += 1
+                continue
+
+            # A hunk spans difference runs separated by short match runs
+            last = r
+            while (last + 2 < len(runs) and runs[last + 1][0] is DiffType.MATCH
+                   and runs[last + 1][3] <= 2 * context):
+                last += 2
+            while last + 1 < len(runs) and runs[last + 1][0] is not DiffType.MATCH:
+                last += 1
+
+            body = []
+            core_first = spike_first = None
+            if r > 0 and runs[r - 1][0] is DiffType.MATCH:
+                _, ci, sj, length = runs[r - 1]
+                lead = min(context, length)
+                core_first, spike_first = ci + length - lead, sj + length - lead
+                body.extend('  ' + line for line in core_lines[core_first:ci + length])
+            for diff_type, ci, sj, length in runs[r:last + 1]:
+                if core_first is None and ci is not None:
+                    core_first = ci
+                if spike_first is None and sj is not None:
+                    spike_first = sj
+                if diff_type is DiffType.MATCH:
+                    body.extend('  ' + line for line in core_lines[ci:ci + length])
+                elif diff_type is DiffType.DELETION:
+                    body.extend('- ' + line for line in core_lines[ci:ci + length])
+                else:
+                    body.extend('+ ' + line for line in spike_lines[sj:sj + length])
+            if last + 1 < len(runs):
+                _, ci, sj, length = runs[last + 1]
+                body.extend('  ' + line for line in core_lines[ci:ci + min(context, length)])
+
+            hunk += 1
+            core_label = core_first + 1 if core_first is not None else '-'
+            spike_label = spike_first + 1 if spike_first is not None else '-'
+            out.append(f"@@ HUNK {hunk}: core #{core_label} spike #{spike_label} @@")
+            out.extend(body)
+            r = last + 1
+
+        if hunk == 0 and stats.get('reordered'):
+            out.append(f"⚠️ No differences after moving {stats['reordered']:,} core commits into "
+                       f"program order (--no-reorder compares them as written)")
+        elif hunk == 0:
+            out.append("✅ No differences found")
+        return '\n'.join(out) + '\n'
+
+
+class TraceComparator:
+    """
+    Core vs Spike trace comparator built on the anchored diff engine
+
+    With a cache (trace_cache.ResultCache) results are looked up by the
+    content hashes of both traces and the comparator options, so comparing
+    an unchanged pair again skips the diff.
+
+    With collapse_loops spin loops are folded out of both traces first
+    (trace_loops.py) and stats['loops_removed'] counts the folded commits
+    (lines after an end-of-test loop are never read and not counted).
+
+    With reorder the core trace is canonicalized into program order inside
+    the cycles of the trace_timestamp.log next to it (trace_reorder.py);
+    without that log it is compared as written. stats['reordered'] counts
+    the commits that moved.
+
+    With align_start the Spike commits before the core's first PC (the boot
+    ROM, see find_first_divergence) are left out of the diff, so the first
+    difference row is the same commit --first-divergence reports;
+    stats['boot_skipped'] counts them.
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW, confirm=ANCHOR_CONFIRM, ignore_csr=True,
+                 context=REPORT_CONTEXT, cache=None, collapse_loops=True, reorder=True,
+                 align_start=True):
+        self.window = window
+        self.confirm = confirm
+        self.ignore_csr = ignore_csr
+        self.collapse_loops = collapse_loops
+        self.reorder = reorder
+        self.align_start = align_start
+        self.context = context
+        self.cache = cache
+        self.cache_hit = False
+        self.result: Optional[ComparisonResult] = None
+        self.stats = {}
+
+    def cache_key(self, core_data, spike_data, cycles_data=None):
+        """
+        Cache key of a comparison from the raw bytes (or mappings) of both traces
+
+        Args:
+            cycles_data: Bytes of the trace_timestamp.log used for reordering
+        """
+        from trace_cache import content_digest, make_key
+        # Without a timestamp log nothing is reordered
+        reorder = self.reorder and cycles_data is not None
+        options = {'window': self.window, 'confirm': self.confirm, 'ignore_csr': self.ignore_csr,
+                   'collapse_loops': self.collapse_loops, 'reorder': reorder,
+                   'align_start': self.align_start}
+        if reorder:
+            options['cycles'] = content_digest(cycles_data)
+        return make_key(content_digest(core_data), content_digest(spike_data), options)
+
+    def compare(self, core_file, spike_file):
+        """
+        Compare two trace files
+
+        With a cache both traces are memory-mapped and indexed for the key
+        anyway, so a miss takes its commit lines from those TraceReader
+        views; the cached run indices then refer to exactly the lines a
+        later hit reads. Without a cache the diff needs every line, and
+        read_trace_bytes (one decode and splitlines) is the faster way to
+        get them.
+
+        Returns:
+            ComparisonResult
+        """
+        start = time.perf_counter()
+        self.cache_hit = False
+        key = None
+        timestamps = timestamp_log_for(core_file) if self.reorder else None
+        if self.cache is not None:
+            # Hash the memory-mapped files; on a hit the result reads its
+            # commit lines lazily from the mappings instead of loading them
+            core_reader = open_commit_trace(core_file)
+            spike_reader = open_commit_trace(spike_file)
+            cycles_data = None
+            if timestamps:
+                with open(timestamps, 'rb') as f:
+                    cycles_data = f.read()
+            key = self.cache_key(core_reader.buffer, spike_reader.buffer, cycles_data)
+            cached = self.cache.get(key)
+            if cached is not None:
+                runs = [(_RUN_TYPES[kind], ci if ci >= 0 else None, sj if sj >= 0 else None, length)
+                        for kind, ci, sj, length in cached[0]]
+                self.stats = cached[1]
+                self.stats['elapsed_seconds'] = time.perf_counter() - start
+                self.cache_hit = True
+                core_lines, spike_lines = core_reader, spike_reader
+                extra = cached[2] or {}
+                if extra.get('core_moves'):
+                    core_lines = ReorderedTrace(core_lines, extra['core_moves'])
+                if 'core_loops' in extra:
+                    core_lines = CollapsedTrace(core_lines, extra['core_loops'])
+                    spike_lines = CollapsedTrace(spike_lines, extra['spike_loops'])
+                self.result = ComparisonResult(core_file, spike_file, core_lines, spike_lines,
+                                               runs, self.stats, self.context)
+                return self.result
+            with core_reader, spike_reader:
+                core_lines = core_reader[:]
+                spike_lines = spike_reader[:]
+        else:
+            core_lines, _ = read_trace_bytes(core_file)
+            spike_lines, _ = read_trace_bytes(spike_file)
+        core_moves = []
+        if timestamps:
+            core_lines, core_moves = canonicalize(core_lines, read_commit_cycles(timestamps))
+        core_loops = spike_loops = []
+        loops_removed = 0
+        if self.collapse_loops:
+            core_lines, collapser = collapse_loops(core_lines)
+            core_loops = collapser.loops
+            loops_removed += collapser.removed
+            spike_lines, collapser = collapse_loops(spike_lines)
+            spike_loops = collapser.loops
+            loops_removed += collapser.removed
+        core_keys = loop_keys(core_lines, normalize_commit_lines(core_lines, self.ignore_csr),
+                              core_loops)
+        spike_keys = loop_keys(spike_lines, normalize_commit_lines(spike_lines, self.ignore_csr),
+                               spike_loops)
+        skip = 0
+        if self.align_start:
+            skip = boot_rom_skip(core_lines[0] if core_lines else None,
+                                 spike_lines[:BOOT_ROM_SEARCH])
+        runs = anchored_diff_runs(core_keys, spike_keys[skip:] if skip else spike_keys,
+                                  self.window, self.confirm)
+        if skip:
+            runs = [(diff_type, ci, sj + skip if sj is not None else None, length)
+                    for diff_type, ci, sj, length in runs]
+
+        totals = {DiffType.MATCH: 0, DiffType.DELETION: 0, DiffType.INSERTION: 0}
+        for diff_type, _, _, length in runs:
+            totals[diff_type] += length
+        self.stats = {
+            'core_entries': len(core_lines),
+            'spike_entries': len(spike_lines),
+            'loops_removed': loops_removed,
+            'reordered': len(core_moves),
+            'boot_skipped': skip,
+            'lcs_length': totals[DiffType.MATCH],
+            'perfect_matches': totals[DiffType.MATCH],
+            'deletions': totals[DiffType.DELETION],
+            'insertions': totals[DiffType.INSERTION],
+            'elapsed_seconds': time.perf_counter() - start,
+        }
+        if key is not None:
+            extra = {}
+            if core_moves:
+                extra['core_moves'] = core_moves
+            if self.collapse_loops:
+                extra.update(core_loops=core_loops, spike_loops=spike_loops)
+            try:
+                self.cache.put(key, [(_RUN_TYPES.index(diff_type),
+                                      -1 if ci is None else ci, -1 if sj is None else sj, length)
+                                     for diff_type, ci, sj, length in runs], self.stats,
+                               extra or None)
+            except OSError:
+                pass  # a read-only or full cache never fails a comparison
+        self.result = ComparisonResult(core_file, spike_file, core_lines, spike_lines,
+                                       runs, self.stats, self.context)
+        return self.result
+
+    def compare_logs(self, core_file, spike_file):
+        """
+        Compare two trace files
+
+        Returns:
+            str: Text report (statistics and detailed differences)
+        """
+        return self.compare(core_file, spike_file).render_report()
+
+    @property
+    def results(self) -> List[DiffResult]:
+        """Per-commit DiffResults of the last comparison"""
+        return self.result.results if self.result else []
+
+
+def divergence_summary(divergence, core_file, spike_file, elapsed, reordered=0):
+    """Machine-readable summary of a first-divergence search"""
+    first = None
+    if divergence is not None:
+        first = {
+            'core_index': divergence.core_index,
+            'spike_index': divergence.spike_index,
+            'core_line': divergence.core_line,
+            'spike_line': divergence.spike_line,
+            'registers': {f"x{r}": f"0x{value:08x}" for r, value in divergence.registers.items()},
+        }
+    return {
+        'core_file': core_file,
+        'spike_file': spike_file,
+        'identical': divergence is None,
+        'reordered': reordered,
+        'statistics': {'elapsed_seconds': elapsed, 'reordered': reordered},
+        'first_divergence': first,
+    }
+
+
+def default_test_name(core_file):
+    """
+    Test name for a core trace: the riscv-dv test directory for
+    <test>/core_sim/trace.log, otherwise the file name without extension
+    """
+    parent = os.path.dirname(os.path.abspath(core_file))
+    if os.path.basename(parent) == 'core_sim':
+        return os.path.basename(os.path.dirname(parent))
+    return os.path.splitext(os.path.basename(core_file))[0]
+
+
+def format_json(summary):
+    """Render a summary (or a list of summaries) as JSON text"""
+    return json.dumps(summary, indent=2) + '\n'
+
+
+def _divergence_message(summary):
+    """One-line failure message for a differing comparison"""
+    first = summary.get('first_divergence')
+    if not first:
+        return "traces differ"
+    core_index, spike_index = first['core_index'], first['spike_index']
+    line = first['core_line'] or first['spike_line'] or ''
+    pc = line.split(None, 1)[0] if line else '?'
+    core_label = f"#{core_index + 1}" if core_index is not None else '-'
+    spike_label = f"#{spike_index + 1}" if spike_index is not None else '-'
+    return f"first divergence at PC {pc} (core commit {core_label}, Spike commit {spike_label})"
+
+
+def format_junit(cases, suite_name='trace_diff'):
+    """
+    Render comparisons as a JUnit XML test suite
+
+    Args:
+        cases (list): (test_name, summary) pairs; a summary may also be an
+                      error string for comparisons that could not run
+    """
+    q = lambda text: html.escape(str(text), quote=True)
+    failures = sum(1 for _, summary in cases if isinstance(summary, dict) and not summary['identical'])
+    errors = sum(1 for _, summary in cases if not isinstance(summary, dict))
+    total_time = sum(summary['statistics'].get('elapsed_seconds', 0.0)
+                     for _, summary in cases if isinstance(summary, dict))
+
+    out = ['<?xml version="1.0" encoding="UTF-8"?>',
+           f'<testsuite name="{q(suite_name)}" tests="{len(cases)}" failures="{failures}" '
+           f'errors="{errors}" time="{total_time:.3f}">']
+    for name, summary in cases:
+        if not isinstance(summary, dict):
+            out.append(f'  <testcase classname="{q(suite_name)}" name="{q(name)}" time="0.000">')
+            out.append(f'    <error message="{q(summary)}" type="OSError"/>')
+            out.append('  </testcase>')
+            continue
+
+        elapsed = summary['statistics'].get('elapsed_seconds', 0.0)
+        out.append(f'  <testcase classname="{q(suite_name)}" name="{q(name)}" time="{elapsed:.3f}">')
+        if not summary['identical']:
+            first = summary.get('first_divergence') or {}
+            detail = [f"core:  {first.get('core_line')}", f"spike: {first.get('spike_line')}"]
+            out.append(f'    <failure message="{q(_divergence_message(summary))}" type="TraceMismatch">'
+                       f'{q(chr(10).join(detail))}</failure>')
+        stats = summary['statistics']
+        out.append('    <system-out>' + q('\n'.join(f"{key}: {value}" for key, value in stats.items()))
+                   + '</system-out>')
+        if summary.get('reordered'):
+            out.append('    <system-err>' + q(f"{summary['reordered']} core commits were moved into "
+                                              f"program order before comparing") + '</system-err>')
+        out.append('  </testcase>')
+    out.append('</testsuite>')
+    return '\n'.join(out) + '\n'
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Compare a core commit trace with a Spike trace')
+    parser.add_argument('core_log', help='Core trace (core_sim/trace.log)')
+    parser.add_argument('spike_log', help='Spike trace (spike_trace.log or _filtered.log)')
+    parser.add_argument('--first-divergence', action='store_true',
+                        help='Stop at the first mismatching commit')
+    parser.add_argument('--no-align-start', action='store_true',
+                        help='Do not skip the Spike boot ROM before the first core PC')
+    parser.add_argument('--context', type=int, default=DIVERGENCE_CONTEXT,
+                        help='Context commits shown around the first divergence')
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW,
+                        help='Resynchronization window of the full diff')
+    parser.add_argument('--format', choices=('text', 'json', 'junit'), default='text',
+                        help='Output format (default: text)')
+    parser.add_argument('-o', '--output', help='Write the result to a file instead of stdout')
+    parser.add_argument('--name', help='Test case name for JUnit output (default: test directory)')
+    parser.add_argument('--max-differences', type=int, default=JSON_DIFFERENCES,
+                        help='Difference rows listed in JSON output (-1: all)')
+    parser.add_argument('--cache', action='store_true',
+                        help='Reuse/store results in the comparison cache (see trace_cache.py)')
+    parser.add_argument('--cache-dir', help='Cache directory (implies --cache)')
+    parser.add_argument('--keep-loops', action='store_true',
+                        help='Compare spin loops commit by commit instead of folding them')
+    parser.add_argument('--no-reorder', action='store_true',
+                        help='Compare core commits in trace order (no same-cycle canonicalization)')
+    args = parser.parse_args()
+
+    name = args.name or default_test_name(args.core_log)
+    error = None
+    try:
+        if args.first_divergence:
+            start = time.perf_counter()
+            search = {}
+            divergence = find_first_divergence(args.core_log, args.spike_log, args.context,
+                                               align_start=not args.no_align_start,
+                                               collapse=not args.keep_loops,
+                                               reorder=not args.no_reorder, stats=search)
+            identical = divergence is None
+            reordered = search.get('reordered', 0)
+            if args.format == 'text':
+                text = format_first_divergence(divergence, args.core_log, args.spike_log, reordered)
+            else:
+                summary = divergence_summary(divergence, args.core_log, args.spike_log,
+                                             time.perf_counter() - start, reordered)
+        else:
+            cache = None
+            if args.cache or args.cache_dir:
+                from trace_cache import DEFAULT_CACHE_DIR, ResultCache
+                cache = ResultCache(args.cache_dir or DEFAULT_CACHE_DIR)
+            comparator = TraceComparator(window=args.window, cache=cache,
+                                         collapse_loops=not args.keep_loops,
+                                         reorder=not args.no_reorder,
+                                         align_start=not args.no_align_start)
+            result = comparator.compare(args.core_log, args.spike_log)
+            identical = not result.diff_rows
+            if args.format == 'text':
+                text = result.render_report()
+            else:
+                limit = None if args.max_differences < 0 else args.max_differences
+                summary = result.summary(limit)
+    except OSError as e:
+        if args.format == 'text':
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(2)
+        error = str(e)
+
+    if args.format == 'json':
+        if error:
+            summary = {'core_file': args.core_log, 'spike_file': args.spike_log, 'error': error}
+        text = format_json(summary)
+    elif args.format == 'junit':
+        text = format_junit([(name, error or summary)])
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+    sys.exit(2 if error else 1 if not identical else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming Spin-Loop Collapse
+
+Folds exactly repeating commit sequences of a core or Spike trace into a
+single loop record, so the diff engine, the statistics and the viewer only
+see one iteration of a spin loop instead of thousands:
+
+    0x8000c8dc (0x00000f17) x30 0x8000c8dc
+    0x8000c8e0 (0x723f2223) mem 0x8000d000 0x00000001
+    0x8000c8e4 (0xff9ff06f)
+    0x8000c8dc (loop x1638, period 3)
+
+Repeats are found in one pass over fixed-size chunks of the stream. Each
+line is hashed once; for every line the distance p to its latest earlier
+occurrence (a repeat candidate) is found in bulk, with NumPy when it is
+available, and a candidate is confirmed by comparing the last p commits
+with the p commits before them. A repeat of identical lines (same PCs,
+same register and store values) leaves the architectural state unchanged,
+so nothing but the iteration count is lost, and that count is timing
+dependent (the core and Spike spin for different lengths).
+
+A spin loop that stores to memory and jumps back to its first commit
+unconditionally (j write_tohost) is the riscv-dv end-of-test loop: the
+tohost write that the testbench or Spike never acknowledges. Once it has
+repeated min_repeats times reading stops there: the first iteration is
+kept, followed by an end-of-test record, and the remaining spin lines are
+never read (nor counted as removed).
+
+Usage:
+    python trace_loops.py core_sim/spike_trace.log
+    python trace_loops.py core_sim/trace.log -o trace_collapsed.log
+"""
+
+import argparse
+import re
+import sys
+from bisect import bisect_right
+from itertools import islice
+from typing import NamedTuple
+
+from commit_trace import FLAG_INSN_UNKNOWN, FLAG_STORE, parse_commit_line
+
+# Longest loop body (in commits) that is detected
+MAX_LOOP_PERIOD = 64
+
+# Iterations (including the one that is kept) before a loop is folded
+MIN_LOOP_REPEATS = 3
+
+# Commit lines read from the stream per step
+CHUNK_LINES = 65536
+
+# Buffers shorter than this are searched with the standard library, which is
+# faster than importing NumPy for them (once imported NumPy is always used)
+NUMPY_MIN_LINES = 32768
+
+# Iteration count of a loop record; dropped from its comparison key
+_LOOP_COUNT_RE = re.compile(r'\(loop x\d+, ')
+
+
+class LoopRecord(NamedTuple):
+    """One folded loop"""
+    index: int          # 0-based index of the loop record in the collapsed output
+    first_commit: int   # 0-based input index of the first folded commit
+    period: int         # commits per iteration
+    repeats: int        # iterations including the kept one (0: end of test, not counted)
+    removed: int        # input commits folded into the record (read ones only)
+
+
+def loop_record_line(pc, period, repeats):
+    """Text of a loop record (repeats 0 marks the end-of-test loop)"""
+    if repeats:
+        return f"{pc} (loop x{repeats}, period {period})"
+    return f"{pc} (loop end of test, period {period})"
+
+
+def is_loop_record(line):
+    """True if a commit line is a loop record"""
+    return ' (loop ' in line
+
+
+def loop_key(line):
+    """Comparison key of a loop record: the same loop matches for any count"""
+    return _LOOP_COUNT_RE.sub('(loop, ', line)
+
+
+def _jump_target(pc, insn):
+    """Target of an unconditional direct jump (jal, c.j, c.jal), or None"""
+    if insn & 0x7F == 0x6F:
+        offset = (((insn >> 31) & 0x1) << 20 | ((insn >> 12) & 0xFF) << 12 |
+                  ((insn >> 20) & 0x1) << 11 | ((insn >> 21) & 0x3FF) << 1)
+        offset -= (offset & 0x100000) << 1
+        return (pc + offset) & 0xFFFFFFFF
+    if insn & 0x3 == 0x1 and (insn >> 13) & 0x7 in (1, 5):
+        offset = (((insn >> 12) & 0x1) << 11 | ((insn >> 11) & 0x1) << 4 |
+                  ((insn >> 9) & 0x3) << 8 | ((insn >> 8) & 0x1) << 10 |
+                  ((insn >> 7) & 0x1) << 6 | ((insn >> 6) & 0x1) << 7 |
+                  ((insn >> 3) & 0x7) << 1 | ((insn >> 2) & 0x1) << 5)
+        offset -= (offset & 0x800) << 1
+        return (pc + offset) & 0xFFFFFFFF
+    return None
+
+
+def _repeat_candidates_numpy(lines, start, max_period):
+    """(index, distance) of lines from start on that repeat within max_period lines"""
+    import numpy as np
+
+    first = max(0, start - max_period)
+    hashes = np.fromiter(map(hash, lines[first:]), dtype=np.int64, count=len(lines) - first)
+    distance = np.zeros(len(hashes), dtype=np.int64)
+    # Longest distance first, so the latest earlier occurrence wins
+    for period in range(min(max_period, len(hashes) - 1), 0, -1):
+        distance[period:][hashes[period:] == hashes[:-period]] = period
+    index = np.flatnonzero(distance[start - first:]) + (start - first)
+    distance = distance[index]
+    # Two back to back iterations also repeat the line before (periods above one)
+    keep = (index + 1 >= 2 * distance) & ((distance == 1) |
+                                          (hashes[index - 1] == hashes[index - 1 - distance]))
+    index = index[keep]
+    return zip((index + first).tolist(), distance[keep].tolist())
+
+
+def _repeat_candidates_stdlib(lines, start, max_period):
+    """(index, distance) of lines from start on that repeat within max_period lines"""
+    last_seen = {}
+    candidates = []
+    first = max(0, start - max_period)
+    for index, line in enumerate(lines[first:], first):
+        previous = last_seen.get(line)
+        if previous is not None and index >= start and index - previous <= max_period:
+            candidates.append((index, index - previous))
+        last_seen[line] = index
+    return candidates
+
+
+class LoopCollapser:
+    """
+    Streaming loop collapse over commit lines
+
+    collapse() is a generator: feed it any iterable of commit lines and it
+    yields the collapsed lines, reading CHUNK_LINES at a time. After the
+    generator is exhausted, loops, removed, lines_read and end_of_test
+    describe what was folded.
+    """
+
+    def __init__(self, max_period=MAX_LOOP_PERIOD, min_repeats=MIN_LOOP_REPEATS,
+                 stop_at_end=True):
+        self.max_period = max_period
+        self.min_repeats = max(2, min_repeats)
+        self.stop_at_end = stop_at_end
+        self.loops = []
+        self.removed = 0
+        self.lines_read = 0
+        self.end_of_test = None   # input commits read when the end-of-test loop stopped reading
+
+    def _candidates(self, lines, start):
+        if len(lines) >= NUMPY_MIN_LINES or 'numpy' in sys.modules:
+            try:
+                return _repeat_candidates_numpy(lines, start, self.max_period)
+            except ImportError:
+                pass
+        return _repeat_candidates_stdlib(lines, start, self.max_period)
+
+    def collapse(self, lines):
+        """
+        Collapse spin loops of a commit line stream
+
+        Args:
+            lines (iterable): Commit lines (trailing whitespace removed)
+
+        Yields:
+            str: Collapsed commit lines; loop records replace the folded commits
+        """
+        for block in self.collapse_blocks(lines):
+            yield from block
+
+    def collapse_blocks(self, lines):
+        """collapse() in lists of consecutive output lines (no per-line overhead)"""
+        max_period = self.max_period
+        source = iter(lines)
+        self.loops = []
+        self.removed = 0
+        self.end_of_test = None
+
+        # buffer holds the lines not yet yielded (from out on) after up to
+        # two periods of history; base is the input index of buffer[0]
+        buffer = []
+        base = out = scan = 0
+        read = emitted = 0
+
+        while True:
+            chunk = list(islice(source, CHUNK_LINES))
+            if not chunk:
+                break
+            read += len(chunk)
+            buffer.extend(chunk)
+
+            for j, period in self._candidates(buffer, scan):
+                second = j - period + 1
+                if j < scan or second < out or second < period:
+                    continue   # inside a folded loop, already yielded or no history
+                if buffer[second:j + 1] != buffer[second - period:second]:
+                    continue
+                body = buffer[second:j + 1]
+                pc = body[0].split(None, 1)[0]
+
+                # An end-of-test loop is only followed until it has repeated
+                # min_repeats times; the rest of the stream is not read
+                end_of_test = self.stop_at_end and self._is_end_of_test(body)
+                needed = (self.min_repeats - 1) * period
+                size = len(buffer)
+                limit = min(size, second + needed) if end_of_test else size
+
+                # Follow the loop: whole iterations by slice, then line by line
+                k = j + 1
+                while k + period <= limit and buffer[k:k + period] == body:
+                    k += period
+                while k < limit and buffer[k] == buffer[k - period]:
+                    k += 1
+                matched = k - second
+                pulled = k == size
+                if pulled and not (end_of_test and matched >= needed):
+                    # The loop runs past the buffer: count it straight from the stream
+                    phase = matched % period
+                    for line in source:
+                        read += 1
+                        if line != body[phase]:
+                            buffer.append(line)
+                            break
+                        matched += 1
+                        phase = phase + 1 if phase + 1 < period else 0
+                        if end_of_test and matched >= needed:
+                            break
+
+                if end_of_test and matched >= needed:
+                    yield buffer[out:second]
+                    emitted += second - out
+                    self.loops.append(LoopRecord(emitted, base + second, period, 0, matched))
+                    self.removed += matched
+                    self.lines_read = self.end_of_test = base + second + matched
+                    yield [loop_record_line(pc, period, 0)]
+                    return
+
+                repeats = 1 + matched // period
+                if repeats < self.min_repeats:
+                    if not pulled:
+                        continue
+                    # Too short to fold: put the lines counted from the stream
+                    # back and scan them with the next chunk
+                    offset = size - second
+                    buffer[size:size] = [body[(offset + t) % period]
+                                         for t in range(matched - offset)]
+                    scanned = size
+                    break
+
+                partial = matched % period
+                removed = matched - partial
+                yield buffer[out:second]
+                emitted += second - out
+                self.loops.append(LoopRecord(emitted, base + second, period, repeats, removed))
+                self.removed += removed
+                yield [loop_record_line(pc, period, repeats)]
+                yield body[:partial]
+                emitted += 1 + partial
+                if pulled:
+                    rest = buffer[size:]
+                    base = read - len(rest)
+                    buffer = rest
+                    out = scanned = 0
+                    break
+                out = scan = k
+            else:
+                scanned = len(buffer)
+
+            # Keep the last period of lines back (a loop's second iteration may
+            # start there) and two periods of history
+            keep_from = max(out, len(buffer) - max_period)
+            yield buffer[out:keep_from]
+            emitted += keep_from - out
+            drop = min(max(0, len(buffer) - 2 * max_period), keep_from)
+            del buffer[:drop]
+            base += drop
+            out = keep_from - drop
+            scan = max(0, scanned - drop)
+
+        yield buffer[out:]
+        self.lines_read = read
+
+    @staticmethod
+    def _is_end_of_test(body):
+        """
+        True for the tohost end-of-test loop shape: a store in the body and
+        an unconditional backward jump from its last commit to its first
+        """
+        records = [parse_commit_line(line) for line in body]
+        if any(record is None for record in records):
+            return False
+        first, last = records[0], records[-1]
+        if last.flags & FLAG_INSN_UNKNOWN or _jump_target(last.pc, last.insn) != first.pc:
+            return False
+        if first.pc > last.pc:
+            return False
+        return any(record.flags & FLAG_STORE for record in records)
+
+
+class CollapsedTrace:
+    """
+    Read-only collapsed view of a line sequence, rebuilt from its LoopRecords
+
+    Behaves like the list collapse_loops() returns, but takes the lines from
+    the underlying sequence (e.g. a TraceReader) only when they are accessed;
+    loop records are rebuilt from the first folded commit of their loop.
+    """
+
+    def __init__(self, lines, loops):
+        self.lines = lines
+        self.loops = [LoopRecord(*loop) for loop in loops]
+        self.record_index = [loop.index for loop in self.loops]
+        # Input index minus output index after each record
+        self.shift = []
+        shift = 0
+        for loop in self.loops:
+            shift += loop.removed - 1
+            self.shift.append(shift)
+        if self.loops and not self.loops[-1].repeats:
+            self.length = self.loops[-1].index + 1   # reading stopped at the end of test
+        else:
+            self.length = len(lines) - shift
+
+    def __len__(self):
+        return self.length
+
+    def _record_line(self, loop):
+        pc = self.lines[loop.first_commit].split(None, 1)[0]
+        return loop_record_line(pc, loop.period, loop.repeats)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.length)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            out = []
+            while start < stop:
+                r = bisect_right(self.record_index, start)
+                if r and self.record_index[r - 1] == start:
+                    out.append(self._record_line(self.loops[r - 1]))
+                    start += 1
+                    continue
+                end = self.record_index[r] if r < len(self.loops) else self.length
+                end = min(end, stop)
+                shift = self.shift[r - 1] if r else 0
+                out.extend(self.lines[start + shift:end + shift])
+                start = end
+            return out
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('collapsed trace index out of range')
+        r = bisect_right(self.record_index, index)
+        if r and self.record_index[r - 1] == index:
+            return self._record_line(self.loops[r - 1])
+        return self.lines[index + (self.shift[r - 1] if r else 0)]
+
+    def __iter__(self):
+        return iter(self[:])
+
+
+def collapse_loops(lines, max_period=MAX_LOOP_PERIOD, min_repeats=MIN_LOOP_REPEATS,
+                   stop_at_end=True):
+    """
+    Collapse the spin loops of a list (or stream) of commit lines
+
+    Returns:
+        tuple: (collapsed_lines, LoopCollapser with the loop statistics)
+    """
+    collapser = LoopCollapser(max_period, min_repeats, stop_at_end)
+    collapsed = []
+    for block in collapser.collapse_blocks(lines):
+        collapsed.extend(block)
+    return collapsed, collapser
+
+
+def main():
+    """Main function to handle command line arguments"""
+    parser = argparse.ArgumentParser(description='Fold spin loops of a commit trace')
+    parser.add_argument('log_file', help='Core trace or Spike trace')
+    parser.add_argument('-o', '--output', help='Write the collapsed trace to this file')
+    parser.add_argument('--max-period', type=int, default=MAX_LOOP_PERIOD,
+                        help='Longest loop body in commits (default: %(default)s)')
+    parser.add_argument('--min-repeats', type=int, default=MIN_LOOP_REPEATS,
+                        help='Iterations before a loop is folded (default: %(default)s)')
+    parser.add_argument('--no-stop', action='store_true',
+                        help='Keep reading after the end-of-test loop')
+    args = parser.parse_args()
+
+    from trace_diff import iter_commit_lines
+
+    try:
+        collapser = LoopCollapser(args.max_period, args.min_repeats, not args.no_stop)
+        collapsed = collapser.collapse(iter_commit_lines(args.log_file))
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                kept = 0
+                for line in collapsed:
+                    f.write(line + '\n')
+                    kept += 1
+        else:
+            kept = sum(1 for _ in collapsed)
+    except OSError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print(f"File: {args.log_file}")
+    print(f"Commits read:    {collapser.lines_read:,}")
+    print(f"Commits kept:    {kept:,}")
+    print(f"Loops removed:   {collapser.removed:,} commits in {len(collapser.loops)} loop(s)")
+    for loop in collapser.loops:
+        count = f"x{loop.repeats}" if loop.repeats else "end of test"
+        print(f"  commit #{loop.first_commit + 1:,}: period {loop.period}, {count}, "
+              f"{loop.removed:,} commits folded")
+    if collapser.end_of_test is not None:
+        print(f"Stopped at the end-of-test loop after commit #{collapser.end_of_test:,}")
+    if args.output:
+        print(f"Written: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
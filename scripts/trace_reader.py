@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Memory-Mapped Trace Reader
+
+Shared lazy reader for line-oriented logs (core trace.log, Spike traces,
+performance logs, assembly listings). The file is memory-mapped and a
+line-offset index is built in one pass; lines are decoded only when they
+are accessed by index or slice, so opening a multi-gigabyte trace costs
+O(number of lines) memory for the index and nothing for the text.
+
+The index is built with NumPy in fixed-size chunks when NumPy is available
+and the file is large enough to pay for the import; otherwise the standard
+library does the same in a streaming loop.
+
+Usage:
+    python trace_reader.py info trace.log [--prefix 0x]
+    python trace_reader.py show trace.log START [END] [--prefix 0x]
+"""
+
+import argparse
+import mmap
+import os
+import sys
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, compress
+
+# Bytes scanned per step while building the index
+INDEX_CHUNK = 64 * 1024 * 1024
+
+# Files smaller than this are indexed with the standard library, which is
+# faster than importing NumPy for them
+NUMPY_MIN_BYTES = 4 * 1024 * 1024
+
+# Line prefix of commit records in tracer and filtered Spike traces
+COMMIT_PREFIX = b'0x'
+
+
+def _line_index_numpy(buffer, size, prefix):
+    """(starts, ends) of every line using vectorized newline search"""
+    import numpy as np
+
+    data = np.frombuffer(buffer, dtype=np.uint8, count=size)
+    starts_parts = []
+    ends_parts = []
+    line_start = 0
+    for chunk_start in range(0, size, INDEX_CHUNK):
+        chunk = data[chunk_start:chunk_start + INDEX_CHUNK]
+        newlines = np.flatnonzero(chunk == 10) + chunk_start
+        if not len(newlines):
+            continue
+        ends_parts.append(newlines)
+        starts_parts.append(np.concatenate(([line_start], newlines[:-1] + 1)))
+        line_start = int(newlines[-1]) + 1
+    if line_start < size:
+        starts_parts.append(np.array([line_start]))
+        ends_parts.append(np.array([size]))
+    if not starts_parts:
+        return array('q'), array('q')
+
+    starts = np.concatenate(starts_parts).astype(np.int64)
+    ends = np.concatenate(ends_parts).astype(np.int64)
+    if prefix:
+        keep = ends - starts >= len(prefix)
+        for k, byte in enumerate(prefix):
+            positions = np.minimum(starts + k, size - 1)
+            keep &= data[positions] == byte
+        starts = starts[keep]
+        ends = ends[keep]
+
+    starts_array = array('q')
+    starts_array.frombytes(starts.tobytes())
+    ends_array = array('q')
+    ends_array.frombytes(ends.tobytes())
+    return starts_array, ends_array
+
+
+def _line_index_stdlib(buffer, size, prefix):
+    """(starts, ends) of every line, streaming the buffer in chunks"""
+    starts = array('q')
+    ends = array('q')
+    offset = 0
+    while offset < size:
+        chunk = buffer[offset:offset + INDEX_CHUNK]
+        cut = chunk.rfind(b'\n') + 1
+        if cut == 0 or offset + len(chunk) >= size:
+            cut = len(chunk)
+        lines = chunk[:cut].split(b'\n')
+        if not lines[-1]:
+            lines.pop()
+        # Every line is followed by its newline; an end is the newline position
+        chunk_starts = list(accumulate((len(line) + 1 for line in lines), initial=offset))
+        chunk_ends = [start + len(line) for start, line in zip(chunk_starts, lines)]
+        del chunk_starts[-1]
+        if prefix:
+            keep = [line.startswith(prefix) for line in lines]
+            chunk_starts = compress(chunk_starts, keep)
+            chunk_ends = compress(chunk_ends, keep)
+        starts.extend(chunk_starts)
+        ends.extend(chunk_ends)
+        offset += cut
+    return starts, ends
+
+
+class TraceReader:
+    """
+    Lazy, line-indexed view of a text log
+
+    Behaves like a read-only sequence of str: len(reader), reader[i],
+    reader[a:b] and iteration decode only the requested lines (trailing
+    whitespace removed). With a prefix only lines starting with it are
+    indexed, e.g. COMMIT_PREFIX for the commit records of a trace.
+    """
+
+    def __init__(self, path, prefix=None):
+        self.path = path
+        self.prefix = prefix
+        self._file = open(path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        if self.size:
+            self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.buffer = b''
+
+        use_numpy = self.size >= NUMPY_MIN_BYTES
+        if use_numpy:
+            try:
+                self.starts, self.ends = _line_index_numpy(self.buffer, self.size, prefix)
+            except ImportError:
+                use_numpy = False
+        if not use_numpy:
+            self.starts, self.ends = _line_index_stdlib(self.buffer, self.size, prefix)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def line_bytes(self, index):
+        """Raw bytes of one line (without the line terminator)"""
+        return self.buffer[self.starts[index]:self.ends[index]]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            buffer, starts, ends = self.buffer, self.starts, self.ends
+            return [buffer[starts[i]:ends[i]].decode('utf-8', 'replace').rstrip()
+                    for i in range(*index.indices(len(starts)))]
+        if index < 0:
+            index += len(self.starts)
+        return self.buffer[self.starts[index]:self.ends[index]].decode('utf-8', 'replace').rstrip()
+
+    def __iter__(self):
+        buffer = self.buffer
+        for start, end in zip(self.starts, self.ends):
+            yield buffer[start:end].decode('utf-8', 'replace').rstrip()
+
+    def line_at_offset(self, offset):
+        """Index of the line containing a byte offset (-1 if before the first)"""
+        return bisect_right(self.starts, offset) - 1
+
+    def close(self):
+        """Release the mapping and the file handle"""
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self.buffer = b''
+        self.starts = array('q')
+        self.ends = array('q')
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_commit_trace(path):
+    """TraceReader over the commit lines (0x...) of a core or Spike trace"""
+    return TraceReader(path, prefix=COMMIT_PREFIX)
+
+
+def main():
+    """Main function to handle command line arguments"""
+    parser = argparse.ArgumentParser(description='Memory-mapped line reader for trace logs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    info_parser = subparsers.add_parser('info', help='Index a file and show line statistics')
+    info_parser.add_argument('log_file')
+    info_parser.add_argument('--prefix', help='Only index lines starting with this text')
+
+    show_parser = subparsers.add_parser('show', help='Print lines START..END (0-based, END exclusive)')
+    show_parser.add_argument('log_file')
+    show_parser.add_argument('start', type=int)
+    show_parser.add_argument('end', type=int, nargs='?')
+    show_parser.add_argument('--prefix', help='Only index lines starting with this text')
+
+    args = parser.parse_args()
+    prefix = args.prefix.encode() if args.prefix else None
+
+    try:
+        import time
+        start = time.perf_counter()
+        with TraceReader(args.log_file, prefix) as reader:
+            elapsed = time.perf_counter() - start
+            if args.command == 'info':
+                print(f"File: {args.log_file}")
+                print(f"Size: {reader.size:,} bytes")
+                print(f"Lines: {len(reader):,}")
+                print(f"Index: {len(reader) * 16:,} bytes built in {elapsed:.3f} s")
+            else:
+                end = args.end if args.end is not None else args.start + 1
+                for number, line in enumerate(reader[args.start:end], args.start):
+                    print(f"{number:>10}  {line}")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Same-Cycle Commit Canonicalization
+
+tracer_3port.sv writes the commits of one cycle port by port. If the
+ports of a 3-wide retire group are not in program order, every such cycle
+shows up against Spike as a deletion/insertion pair. This stage puts the
+core trace back into program order before diffing, using PC flow:
+
+    successors      next PC of a commit from its instruction: fall-through,
+                    JAL target, or both for a conditional branch (unknown
+                    for JALR, system instructions and X instruction words)
+    break           a commit whose PC is not a successor of the previous one
+
+At every break whose next REORDER_WINDOW commits hold a successor of the
+previous commit, the window is tried in every order and the order with
+the fewest breaks (counting the link to the commit after the window) is
+kept. It must be strictly better than the trace's own order, so taken
+traps and other real discontinuities stay where they are. A window never
+leaves the cycle its first commit retired in (trace_timestamp.log next to
+the trace): commits of different cycles really retired in that order, so
+without the log nothing is reordered unless --ungrouped asks for windows
+by PC flow alone.
+
+Usage:
+    python trace_reorder.py core_sim/trace.log
+    python trace_reorder.py core_sim/trace.log -o core_sim/trace_canonical.log
+"""
+
+import argparse
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from collections import deque
+from itertools import permutations
+from operator import itemgetter
+
+# Commits one window may reorder: one retire group
+REORDER_WINDOW = 3
+
+# Shorter traces are scanned with the standard library
+NUMPY_MIN_LINES = 65536
+
+TIMESTAMP_LOG = 'trace_timestamp.log'
+
+# Moved commits listed by the command line tool
+MAX_LISTED = 20
+
+_MASK = 0xFFFFFFFF
+
+
+def _jal_offset(insn):
+    imm = (((insn >> 31) & 1) << 20 | ((insn >> 21) & 0x3FF) << 1 |
+           ((insn >> 20) & 1) << 11 | ((insn >> 12) & 0xFF) << 12)
+    return imm - (1 << 21) if imm >> 20 else imm
+
+
+def _branch_offset(insn):
+    imm = (((insn >> 31) & 1) << 12 | ((insn >> 25) & 0x3F) << 5 |
+           ((insn >> 8) & 0xF) << 1 | ((insn >> 7) & 1) << 11)
+    return imm - (1 << 13) if imm >> 12 else imm
+
+
+def successors(pc, insn):
+    """
+    Possible PCs of the commit after an instruction
+
+    Returns:
+        tuple: Successor PCs, or None when they cannot be known from the
+               instruction alone (JALR, system, compressed control flow)
+    """
+    if insn & 0x3 != 0x3:
+        quadrant = insn & 0x3
+        funct3 = (insn >> 13) & 0x7
+        if (quadrant == 1 and funct3 in (1, 5, 6, 7)) or \
+           (quadrant == 2 and funct3 == 4 and not (insn >> 2) & 0x1F):
+            return None
+        return ((pc + 2) & _MASK,)
+    opcode = insn & 0x7F
+    if opcode == 0x6F:
+        return ((pc + _jal_offset(insn)) & _MASK,)
+    if opcode == 0x63:
+        return ((pc + 4) & _MASK, (pc + _branch_offset(insn)) & _MASK)
+    if opcode == 0x67 or (opcode == 0x73 and not (insn >> 12) & 0x7):
+        return None
+    return ((pc + 4) & _MASK,)
+
+
+def line_flow(line):
+    """
+    (pc, successors) of a commit line in the tracer layout, or None
+
+    successors is None for X instruction words and unknown control flow.
+    """
+    if len(line) < 23 or line[10:14] != ' (0x' or line[22] != ')':
+        return None
+    try:
+        pc = int(line[2:10], 16)
+    except ValueError:
+        return None
+    try:
+        insn = int(line[14:22], 16)
+    except ValueError:
+        return pc, None
+    return pc, successors(pc, insn)
+
+
+def _is_break(before, after):
+    """True if flow after cannot follow flow before"""
+    if before is None or after is None or before[1] is None:
+        return False
+    return after[0] not in before[1]
+
+
+def best_order(previous, flows, following):
+    """
+    Order of a window with the fewest PC flow breaks
+
+    Args:
+        previous: line_flow() of the commit before the window
+        flows (list): line_flow() of the window's commits
+        following: line_flow() of the commit after the window (or None)
+
+    Returns:
+        tuple: Permutation of range(len(flows)), or None if no order is
+               strictly better than the current one
+    """
+    def cost(order):
+        breaks = 0
+        last = previous
+        for k in order:
+            breaks += _is_break(last, flows[k])
+            last = flows[k]
+        return breaks + _is_break(last, following)
+
+    # Only a window holding a successor of the previous commit can improve
+    if not any(flow is not None and not _is_break(previous, flow) for flow in flows[1:]):
+        return None
+
+    identity = tuple(range(len(flows)))
+    best_cost = cost(identity)
+    best = None
+    for order in permutations(identity):
+        if best_cost == 0:
+            break
+        if order != identity:
+            order_cost = cost(order)
+            if order_cost < best_cost:
+                best_cost = order_cost
+                best = order
+    return best
+
+
+def _reorder_candidates_stdlib(lines, window):
+    """
+    Indices i where lines[i + 1] cannot follow lines[i] but one of the
+    next window - 1 lines can
+    """
+    flows = [line_flow(line) for line in lines]
+    candidates = []
+    for i in range(len(flows) - 1):
+        before = flows[i]
+        if _is_break(before, flows[i + 1]) and any(
+                flow is not None and not _is_break(before, flow)
+                for flow in flows[i + 2:i + 1 + window]):
+            candidates.append(i)
+    return candidates
+
+
+def _reorder_candidates_numpy(lines, window):
+    """_reorder_candidates_stdlib() decoding pc and instruction at fixed offsets"""
+    import numpy as np
+
+    # "0xPPPPPPPP (0xIIIIIIII)": the first 23 characters of every line, one row each
+    prefix = ''.join(map(itemgetter(slice(0, 23)), lines))
+    if len(prefix) != 23 * len(lines):
+        prefix = ''.join([line[:23].ljust(23) for line in lines])
+    rows = np.frombuffer(prefix.encode('ascii', 'replace'), dtype=np.uint8).reshape(-1, 23)
+
+    nibbles = np.full(256, 16, dtype=np.uint32)  # 16: not a hex digit
+    for digits, first in ((b'0123456789', 0), (b'abcdef', 10), (b'ABCDEF', 10)):
+        nibbles[np.frombuffer(digits, dtype=np.uint8)] = np.arange(first, first + len(digits))
+    shifts = np.arange(28, -4, -4, dtype=np.uint32)
+
+    def hex_field(field_rows, offset):
+        digits = nibbles[field_rows[:, offset:offset + 8]]
+        return (digits << shifts).sum(axis=1, dtype=np.uint32).astype(np.int64), (digits < 16).all(axis=1)
+
+    pc, pc_ok = hex_field(rows, 2)
+    has_flow = (pc_ok & (rows[:, 10] == 32) & (rows[:, 11] == ord('(')) & (rows[:, 12] == ord('0')) &
+                (rows[:, 13] == ord('x')) & (rows[:, 22] == ord(')')))
+
+    # Most commits are 32-bit non-JAL instructions followed by pc + 4; only
+    # the others need their instruction decoded
+    low = nibbles[rows[:, 20]] << 4 | nibbles[rows[:, 21]]
+    plain = ((low & 0x3) == 0x3) & ((low & 0x7F) != 0x6F) & (low < 256)
+    index = np.flatnonzero(~(plain[:-1] & (pc[1:] == ((pc[:-1] + 4) & _MASK))))
+
+    insn, insn_ok = hex_field(rows[index], 14)
+    compressed = (insn & 0x3) != 0x3
+    quadrant = insn & 0x3
+    cfunct3 = (insn >> 13) & 0x7
+    opcode = insn & 0x7F
+    unknown = np.where(compressed,
+                       ((quadrant == 1) & np.isin(cfunct3, (1, 5, 6, 7))) |
+                       ((quadrant == 2) & (cfunct3 == 4) & (((insn >> 2) & 0x1F) == 0)),
+                       (opcode == 0x67) | ((opcode == 0x73) & (((insn >> 12) & 0x7) == 0)))
+
+    current = pc[index]
+    sequential = (current + np.where(compressed, 2, 4)) & _MASK
+    is_jal = ~compressed & (opcode == 0x6F)
+    is_branch = ~compressed & (opcode == 0x63)
+    jal = (((insn >> 31) & 1) << 20 | ((insn >> 21) & 0x3FF) << 1 |
+           ((insn >> 20) & 1) << 11 | ((insn >> 12) & 0xFF) << 12)
+    jal = jal - ((jal >> 20) << 21)
+    branch = (((insn >> 31) & 1) << 12 | ((insn >> 25) & 0x3F) << 5 |
+              ((insn >> 8) & 0xF) << 1 | ((insn >> 7) & 1) << 11)
+    branch = branch - ((branch >> 12) << 13)
+    target = (current + np.where(is_jal, jal, branch)) & _MASK
+
+    def follows(distance):
+        position = np.minimum(index + distance, len(pc) - 1)
+        following = pc[position]
+        return ((index + distance < len(pc)) & has_flow[position] &
+                np.where(is_jal, following == target,
+                         (following == sequential) | (is_branch & (following == target))))
+
+    breaks = has_flow[index] & insn_ok & ~unknown & has_flow[index + 1] & ~follows(1)
+    later = np.zeros(len(index), dtype=bool)
+    for distance in range(2, window + 1):
+        later |= follows(distance)
+    return index[breaks & later].tolist()
+
+
+def timestamp_log_for(trace_file):
+    """trace_timestamp.log written next to a core trace, or None"""
+    path = os.path.join(os.path.dirname(os.path.abspath(trace_file)), TIMESTAMP_LOG)
+    return path if os.path.isfile(path) else None
+
+
+def iter_commit_cycles(timestamp_file):
+    """
+    Stream the retire time of every commit in trace_timestamp.log
+
+    Lines are "%t - PIPE n - 0xPC (0xINSN) ..." in the order of trace.log.
+
+    Yields:
+        int: Time of one commit (simulation time units)
+    """
+    with open(timestamp_file, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            head, separator, _ = line.partition(' - PIPE ')
+            if not separator:
+                continue
+            try:
+                yield int(float(head.split()[0]))
+            except (IndexError, ValueError):
+                continue
+
+
+def read_commit_cycles(timestamp_file):
+    """
+    Retire time of every commit in trace_timestamp.log
+
+    Returns:
+        array: One time value per commit (simulation time units)
+    """
+    return array('q', iter_commit_cycles(timestamp_file))
+
+
+def canonicalize(lines, cycles=None, window=REORDER_WINDOW):
+    """
+    Restore program order inside small windows of a commit trace
+
+    Args:
+        lines (list): Core commit lines
+        cycles (sequence): Retire time per line (read_commit_cycles);
+                           windows stay inside one time step. None reorders
+                           by PC flow alone.
+        window (int): Commits one window may reorder
+
+    Returns:
+        tuple: (lines, moves). lines is the input list itself if nothing
+               moved (always when cycles does not have one time per line);
+               moves lists [position, original index] for every commit
+               that changed place.
+    """
+    if cycles is not None and len(cycles) != len(lines):
+        return lines, []
+    use_numpy = len(lines) >= NUMPY_MIN_LINES
+    if use_numpy:
+        try:
+            candidates = _reorder_candidates_numpy(lines, window)
+        except ImportError:
+            use_numpy = False
+    if not use_numpy:
+        candidates = _reorder_candidates_stdlib(lines, window)
+
+    out = lines
+    origin = {}   # position -> original index, for moved commits
+    checks = deque(candidates)
+    rechecks = deque()
+    total = len(lines)
+    while checks or rechecks:
+        if rechecks and (not checks or rechecks[0] <= checks[0]):
+            i = rechecks.popleft()
+            if checks and checks[0] == i:
+                checks.popleft()
+        else:
+            i = checks.popleft()
+        end = min(total, i + 1 + window)
+        if cycles is not None and i + 1 < total:
+            cycle = cycles[i + 1]
+            end = i + 1
+            while end < min(total, i + 1 + window) and cycles[end] == cycle:
+                end += 1
+        if end - (i + 1) < 2:
+            continue
+        previous = line_flow(out[i])
+        flows = [line_flow(line) for line in out[i + 1:end]]
+        if not _is_break(previous, flows[0]):
+            continue
+        order = best_order(previous, flows, line_flow(out[end]) if end < total else None)
+        if order is None:
+            continue
+
+        if out is lines:
+            out = list(lines)
+        block = out[i + 1:end]
+        sources = [origin.get(p, p) for p in range(i + 1, end)]
+        for k, position in enumerate(range(i + 1, end)):
+            out[position] = block[order[k]]
+            if sources[order[k]] == position:
+                origin.pop(position, None)
+            else:
+                origin[position] = sources[order[k]]
+        # Links inside and right after the window changed
+        rechecks.extend(range(max(i + 1, rechecks[-1] + 1 if rechecks else 0), end))
+
+    return out, [[position, origin[position]] for position in sorted(origin)]
+
+
+class StreamReorderer:
+    """
+    canonicalize() for a stream of commit lines
+
+    reorder() is a generator: it yields the lines in restored program
+    order, holding back only one window. moved counts the commits that
+    changed place so far.
+    """
+
+    def __init__(self, window=REORDER_WINDOW):
+        self.window = window
+        self.moved = 0
+
+    def reorder(self, lines, cycles):
+        """
+        Restore program order inside the cycles of a commit line stream
+
+        Args:
+            lines (iterable): Core commit lines
+            cycles (iterable): Retire time per line (iter_commit_cycles);
+                               lines past its end are not reordered
+
+        Yields:
+            str: Commit lines in restored program order
+        """
+        window = self.window
+        cycles = iter(cycles)
+        buffer = deque()   # (line, cycle)
+        previous = None
+
+        def advance():
+            nonlocal previous
+            cycle = buffer[0][1]
+            count = 1
+            if cycle is not None:
+                while count < min(window, len(buffer)) and buffer[count][1] == cycle:
+                    count += 1
+            if previous is not None and count >= 2:
+                flows = [line_flow(buffer[k][0]) for k in range(count)]
+                if _is_break(previous, flows[0]):
+                    following = line_flow(buffer[count][0]) if len(buffer) > count else None
+                    order = best_order(previous, flows, following)
+                    if order is not None:
+                        block = [buffer.popleft() for _ in range(count)]
+                        buffer.extendleft(reversed([block[k] for k in order]))
+                        self.moved += sum(1 for k, source in enumerate(order) if k != source)
+            line = buffer.popleft()[0]
+            previous = line_flow(line)
+            return line
+
+        for line in lines:
+            buffer.append((line, next(cycles, None)))
+            if len(buffer) > window:
+                yield advance()
+        while buffer:
+            yield advance()
+
+
+class ReorderedTrace:
+    """
+    Lazy view of canonicalized commit lines over the original lines
+
+    Behaves like the list canonicalize() returns, given its moves, but
+    takes the lines from any indexable sequence (e.g. a TraceReader).
+    """
+
+    def __init__(self, lines, moves):
+        self.lines = lines
+        self.positions = array('q', (position for position, _ in moves))
+        self.sources = {position: source for position, source in moves}
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self.lines))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            out = list(self.lines[start:stop])
+            positions = self.positions
+            for k in range(bisect_left(positions, start), bisect_left(positions, stop)):
+                out[positions[k] - start] = self.lines[self.sources[positions[k]]]
+            return out
+        if index < 0:
+            index += len(self.lines)
+        return self.lines[self.sources.get(index, index)]
+
+    def __iter__(self):
+        sources = self.sources
+        lines = self.lines
+        for index, line in enumerate(lines):
+            yield lines[sources[index]] if index in sources else line
+
+
+def main():
+    """Main function to handle command line arguments"""
+    parser = argparse.ArgumentParser(description='Restore program order inside retire groups of a core trace')
+    parser.add_argument('log_file', help='Core trace (trace.log)')
+    parser.add_argument('-o', '--output', help='Write the canonical trace to this file')
+    parser.add_argument('--timestamps', help=f'Cycle grouping log (default: {TIMESTAMP_LOG} next to the trace)')
+    parser.add_argument('--window', type=int, default=REORDER_WINDOW,
+                        help='Commits one window may reorder (default: %(default)s)')
+    parser.add_argument('--ungrouped', action='store_true',
+                        help='Without a timestamp log, reorder windows by PC flow alone')
+    args = parser.parse_args()
+
+    from trace_diff import read_trace_bytes
+
+    try:
+        lines, _ = read_trace_bytes(args.log_file)
+        timestamps = args.timestamps or timestamp_log_for(args.log_file)
+        cycles = read_commit_cycles(timestamps) if timestamps else None
+    except OSError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print(f"File: {args.log_file}")
+    print(f"Commits: {len(lines):,}")
+    if cycles is None:
+        if args.ungrouped:
+            print(f"Cycle grouping: none ({args.window}-commit windows)")
+        else:
+            print(f"Cycle grouping: no {TIMESTAMP_LOG}, nothing reordered (--ungrouped to reorder anyway)")
+    elif len(cycles) != len(lines):
+        print(f"Cycle grouping: {timestamps} has {len(cycles):,} commits, nothing reordered")
+    else:
+        print(f"Cycle grouping: {timestamps}")
+
+    if cycles is None and not args.ungrouped:
+        out, moves = lines, []
+    else:
+        out, moves = canonicalize(lines, cycles, args.window)
+    print(f"Moved commits: {len(moves):,}")
+    for position, source in moves[:MAX_LISTED]:
+        print(f"  #{source + 1:<10,} -> #{position + 1:<10,} {out[position]}")
+    if len(moves) > MAX_LISTED:
+        print(f"  ... {len(moves) - MAX_LISTED:,} more")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.writelines(line + '\n' for line in out)
+        print(f"Written: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Indexed Trace Search
+
+Search subsystem for compared commit traces. Queries are answered from
+indexes over both sides of a ComparisonResult instead of scanning rendered
+text, and return sorted arrays of result rows that the virtualized diff
+viewer can jump through with bisect.
+
+Query syntax:
+    pc=0x80000104      commits at a PC
+    rd=x13             commits writing a register (x0-x31, f0-f31)
+    mem=0x80001000     loads/stores accessing an address
+    /x1[0-9] 0x0+/     regular expression (also re:PATTERN)
+    anything else      literal text
+
+Several field queries separated by spaces are combined with AND
+(e.g. "pc=0x80000104 rd=x13").
+
+The PC/register/memory index is built on the first field query; regex and
+text queries run over one joined text blob per side. Regular expressions
+are matched per commit line: ^ and $ anchor at line boundaries and a match
+never spans two lines.
+"""
+
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+FIELDS = ('pc', 'rd', 'mem')
+
+_FIELD_QUERY_RE = re.compile(r'^(pc|rd|mem)=(\S+)$', re.I)
+_REGISTER_RE = re.compile(r'^[xf]\d+$')
+
+
+def _address_key(text):
+    """Normalize an address literal to the tracer's 0x%08x token"""
+    return f"0x{int(text, 16):08x}"
+
+
+def _register_key(text):
+    """Normalize a register literal (x13, 13, f2) to its trace token"""
+    text = text.lower()
+    if text.isdigit():
+        text = 'x' + text
+    if not _REGISTER_RE.match(text) or int(text[1:]) > 31:
+        raise ValueError(f"invalid register '{text}'")
+    return text
+
+
+def parse_query(query):
+    """
+    Parse a search query
+
+    Returns:
+        tuple: ('fields', [(field, key), ...]), ('regex', pattern) or
+               ('text', pattern) with pattern a compiled regex
+
+    Raises ValueError for malformed field values or regular expressions.
+    """
+    query = query.strip()
+    if len(query) > 1 and query.startswith('/') and query.endswith('/'):
+        return 'regex', _compile(query[1:-1])
+    if query.startswith('re:'):
+        return 'regex', _compile(query[3:])
+
+    terms = query.split()
+    matches = [_FIELD_QUERY_RE.match(term) for term in terms]
+    if terms and all(matches):
+        fields = []
+        for match in matches:
+            name, value = match.group(1).lower(), match.group(2)
+            try:
+                key = _register_key(value) if name == 'rd' else _address_key(value)
+            except ValueError:
+                raise ValueError(f"invalid value for {name}: '{value}'")
+            fields.append((name, key))
+        return 'fields', fields
+
+    return 'text', re.compile(re.escape(query))
+
+
+def _compile(pattern):
+    try:
+        return re.compile(pattern, re.MULTILINE)
+    except re.error as e:
+        raise ValueError(f"invalid regular expression: {e}")
+
+
+def build_field_index(lines):
+    """
+    Index one side of a trace by PC, written register and memory address
+
+    Returns:
+        dict: field -> {key: array of commit indices (ascending)}
+    """
+    index = {name: {} for name in FIELDS}
+    pcs, registers, addresses = index['pc'], index['rd'], index['mem']
+    for i, line in enumerate(lines):
+        tokens = line.split()
+        if not tokens:
+            continue
+        rows = pcs.get(tokens[0])
+        if rows is None:
+            rows = pcs[tokens[0]] = array('l')
+        rows.append(i)
+
+        # tokens[1] is the instruction word; then "xN 0x.." / "mem 0x.. [0x..]"
+        for t in range(2, len(tokens) - 1):
+            token = tokens[t]
+            if token == 'mem':
+                table, key = addresses, tokens[t + 1]
+            elif token[0] in 'xf' and token[1:].isdigit():
+                table, key = registers, token
+            else:
+                continue
+            rows = table.get(key)
+            if rows is None:
+                rows = table[key] = array('l')
+            if not rows or rows[-1] != i:
+                rows.append(i)
+    return index
+
+
+class TraceIndex:
+    """Search index over both sides of a ComparisonResult"""
+
+    def __init__(self, result):
+        self.result = result
+        self._fields = None
+        self._blobs = None
+        self._row_of = None
+
+    def _commit_rows(self):
+        """Per side: commit index -> result row"""
+        if self._row_of is None:
+            result = self.result
+            row_of = []
+            for commits, row_commits in ((result.core_lines, result.row_core),
+                                         (result.spike_lines, result.row_spike)):
+                rows = array('l', bytes(len(commits) * array('l').itemsize))
+                for row, commit in enumerate(row_commits):
+                    if commit >= 0:
+                        rows[commit] = row
+                row_of.append(rows)
+            self._row_of = row_of
+        return self._row_of
+
+    def _to_rows(self, per_side_commits):
+        """Merge per-side commit index lists into sorted, unique result rows"""
+        row_of = self._commit_rows()
+        rows = set()
+        for side, commits in enumerate(per_side_commits):
+            side_rows = row_of[side]
+            rows.update(side_rows[c] for c in commits)
+        return array('l', sorted(rows))
+
+    def field_index(self):
+        """PC/register/memory index of both sides (built on first use)"""
+        if self._fields is None:
+            self._fields = (build_field_index(self.result.core_lines),
+                            build_field_index(self.result.spike_lines))
+        return self._fields
+
+    def _blob(self, side):
+        """Joined text of one side and the start offset of every line"""
+        if self._blobs is None:
+            self._blobs = [None, None]
+        if self._blobs[side] is None:
+            lines = self.result.core_lines if side == 0 else self.result.spike_lines
+            starts = array('l', accumulate((len(line) + 1 for line in lines), initial=0))
+            self._blobs[side] = ('\n'.join(lines), starts)
+        return self._blobs[side]
+
+    def field_rows(self, fields):
+        """Result rows matching every (field, key) pair"""
+        per_side = []
+        for side_index in self.field_index():
+            commits = None
+            for name, key in fields:
+                found = set(side_index[name].get(key, ()))
+                commits = found if commits is None else commits & found
+            per_side.append(commits or ())
+        return self._to_rows(per_side)
+
+    def pattern_rows(self, pattern):
+        """Result rows whose core or Spike line matches a compiled regex"""
+        per_side = []
+        for side in (0, 1):
+            blob, starts = self._blob(side)
+            commits = []
+            pos = 0
+            while pos <= len(blob):
+                match = pattern.search(blob, pos)
+                if match is None:
+                    break
+                commit = bisect_right(starts, match.start()) - 1
+                line_end = starts[commit + 1] - 1
+                # A match across a newline only counts if one fits in its first line
+                if match.end() <= line_end or pattern.search(blob, match.start(), line_end):
+                    commits.append(commit)
+                pos = line_end + 1
+            per_side.append(commits)
+        return self._to_rows(per_side)
+
+    def search(self, query):
+        """
+        Run a query
+
+        Returns:
+            array: Sorted result rows that match (ValueError on bad queries)
+        """
+        kind, value = parse_query(query)
+        if kind == 'fields':
+            return self.field_rows(value)
+        return self.pattern_rows(value)
+
+
+def next_hit(hits, row):
+    """First hit after row, wrapping to the first one (None if no hits)"""
+    if not hits:
+        return None
+    i = bisect_right(hits, row)
+    return hits[i] if i < len(hits) else hits[0]
+
+
+def prev_hit(hits, row):
+    """Last hit before row, wrapping to the last one (None if no hits)"""
+    if not hits:
+        return None
+    i = bisect_left(hits, row)
+    return hits[i - 1] if i > 0 else hits[-1]
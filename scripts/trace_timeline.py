@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Retire Timeline from trace_timestamp.log
+
+tracer_3port.sv writes every commit a second time to trace_timestamp.log
+with its simulation time and retire port:
+
+    %t - PIPE n - 0xPC (0xINSN) ...
+
+This tool turns the log into NumPy columns (time, cycle, pipe, pc, insn)
+and derives the retire-side performance curves cycle by cycle, instead of
+the 1000-cycle summaries of performance_analysis.log:
+
+    commit width histogram   cycles that retired 0, 1, 2 or 3 commits
+    IPC                      commits per cycle over a sliding window
+    zero-commit stretches    longest runs of cycles without a commit, with
+                             the commit that ended each of them
+
+Lines are parsed in bulk: the time field has a fixed width (%t), so every
+field sits at the same offset and whole blocks of lines are decoded at
+once. Lines in any other layout go through a regular expression.
+
+Usage:
+    python trace_timeline.py core_sim/trace_timestamp.log
+    python trace_timeline.py trace_timestamp.log --window 500 --stretches 20
+    python trace_timeline.py trace_timestamp.log -o commits.parquet --cycle-output cycles.parquet
+"""
+
+import argparse
+import re
+import sys
+
+import numpy as np
+
+# Clock period of dv_top_superscalar.sv in simulation time units (1ns/1ns)
+CLK_PERIOD = 10
+
+RETIRE_WIDTH = 3
+
+# Sliding IPC window (cycles); matches the performance_analysis.log reports
+IPC_WINDOW = 1000
+
+# Zero-commit stretches listed
+TOP_STRETCHES = 10
+
+# Lines decoded per block (bounds the temporary row matrix)
+BLOCK_LINES = 1 << 20
+
+_MARKER = b' - PIPE '
+# Offsets after the marker: "n - 0xPPPPPPPP (0xIIIIIIII)"
+_PIPE = 8
+_PC = 14
+_INSN = 26
+_LAYOUT = ((0, _MARKER), (9, b' - 0x'), (22, b' (0x'), (34, b')'))
+_FIELDS_END = 35
+
+_LINE_RE = re.compile(rb'^\s*(\d+)[^-\n]*- PIPE (\d+) - 0x([0-9a-fA-F]{8}) \(0x([0-9a-fA-FxXzZ]{8})\)')
+
+_NIBBLES = np.full(256, 0xFF, dtype=np.uint8)  # 0xFF: not a hex digit
+for _digits, _first in ((b'0123456789', 0), (b'abcdef', 10), (b'ABCDEF', 10)):
+    _NIBBLES[np.frombuffer(_digits, dtype=np.uint8)] = np.arange(_first, _first + len(_digits))
+
+
+def _hex_columns(block):
+    """(values, all digits valid) of an (n, 8) block of hex characters"""
+    nibbles = _NIBBLES[block]
+    octets = (nibbles[:, 0::2] << 4) | (nibbles[:, 1::2] & 0xF)
+    values = np.ascontiguousarray(octets).view('>u4').ravel().astype(np.uint32)
+    return values, (nibbles < 16).all(axis=1)
+
+
+def _decimal_columns(block):
+    """Right-aligned decimal numbers of an (n, k) character block (spaces read as 0)"""
+    digits = block - np.uint8(48)
+    digits = np.where(digits < 10, digits, 0).astype(np.int64)
+    powers = 10 ** np.arange(block.shape[1] - 1, -1, -1, dtype=np.int64)
+    return digits @ powers
+
+
+def parse_timeline(data, clk_period=CLK_PERIOD):
+    """
+    Columns of a trace_timestamp.log
+
+    Args:
+        data (bytes): File contents
+        clk_period (int): Clock period in simulation time units
+
+    Returns:
+        dict: time (int64), cycle (int64), pipe (uint8), pc (uint32),
+              insn (uint32, 0 if X), insn_known (bool); one entry per commit
+              in file order
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(buffer == 10)
+    if len(data) and data[-1:] != b'\n':
+        ends = np.append(ends, len(data))
+    starts = np.concatenate(([0], ends[:-1] + 1))[:len(ends)].astype(np.int64)
+
+    count = len(starts)
+    time = np.zeros(count, dtype=np.int64)
+    pipe = np.zeros(count, dtype=np.uint8)
+    pc = np.zeros(count, dtype=np.uint32)
+    insn = np.zeros(count, dtype=np.uint32)
+    insn_known = np.zeros(count, dtype=bool)
+    parsed = np.zeros(count, dtype=bool)
+
+    # Field offsets from the first commit line; the time field only needs as
+    # many columns as the last (largest) time has digits. Blank or truncated
+    # lines (a killed run never closes the file) are skipped at both ends.
+    marker = digits = 0
+    first_marker = data.find(_MARKER)
+    if first_marker >= 0:
+        marker = first_marker - (data.rfind(b'\n', 0, first_marker) + 1)
+        last_marker = data.rfind(_MARKER)
+        digits = len(data[data.rfind(b'\n', 0, last_marker) + 1:last_marker].strip())
+        digits = digits if marker >= digits else 0
+    # Window from the column before the time (must be blank: a longer time
+    # would not fit the field) to the closing parenthesis
+    lead = 1 if marker > digits else 0
+    head = marker - digits - lead
+    base = lead + digits
+    width = base + _FIELDS_END
+    if digits and head >= 0 and len(buffer) >= width:
+        # Row k of the window view holds the width bytes from offset k
+        windows = np.lib.stride_tricks.sliding_window_view(buffer, width)
+        line_length = ends - starts
+        for first in range(0, count, BLOCK_LINES):
+            span = slice(first, min(count, first + BLOCK_LINES))
+            rows = windows[np.minimum(starts[span] + head, len(buffer) - width)]
+            valid = line_length[span] >= marker + _FIELDS_END
+            if lead:
+                valid &= rows[:, 0] == 32
+            valid &= (rows[:, base - 1] >= 48) & (rows[:, base - 1] <= 57)
+            for offset, text in _LAYOUT:
+                column = base + offset
+                valid &= (rows[:, column:column + len(text)] == np.frombuffer(text, dtype=np.uint8)).all(axis=1)
+            pipe_digit = rows[:, base + _PIPE] - np.uint8(48)
+            pc_value, pc_ok = _hex_columns(rows[:, base + _PC:base + _PC + 8])
+            insn_value, insn_ok = _hex_columns(rows[:, base + _INSN:base + _INSN + 8])
+            valid &= pc_ok & (pipe_digit < 10)
+
+            time[span] = _decimal_columns(rows[:, lead:base])
+            pipe[span] = np.where(valid, pipe_digit, 0)
+            pc[span] = pc_value
+            insn[span] = np.where(insn_ok, insn_value, 0)
+            insn_known[span] = insn_ok
+            parsed[span] = valid
+
+    # Lines in another layout (different %t width, blank lines, ...)
+    for i in np.flatnonzero(~parsed).tolist():
+        match = _LINE_RE.match(data[starts[i]:ends[i]])
+        if match is None:
+            continue
+        time[i] = int(match.group(1))
+        pipe[i] = int(match.group(2))
+        pc[i] = int(match.group(3), 16)
+        try:
+            insn[i] = int(match.group(4), 16)
+            insn_known[i] = True
+        except ValueError:
+            insn[i] = 0
+            insn_known[i] = False
+        parsed[i] = True
+
+    if not parsed.all():
+        keep = np.flatnonzero(parsed)
+        time, pipe, pc, insn, insn_known = (column[keep] for column in (time, pipe, pc, insn, insn_known))
+    return {
+        'time': time,
+        'cycle': time // clk_period,
+        'pipe': pipe,
+        'pc': pc,
+        'insn': insn,
+        'insn_known': insn_known,
+    }
+
+
+def read_timeline(path, clk_period=CLK_PERIOD):
+    """parse_timeline() of a file"""
+    with open(path, 'rb') as f:
+        return parse_timeline(f.read(), clk_period)
+
+
+def commits_per_cycle(cycle):
+    """
+    Commit count of every cycle from the first to the last commit
+
+    Returns:
+        tuple: (first cycle, np.ndarray of counts; cycles without commits are 0)
+    """
+    if not len(cycle):
+        return 0, np.zeros(0, dtype=np.int64)
+    first = int(cycle.min())
+    return first, np.bincount(cycle - first)
+
+
+def commit_width_histogram(counts, width=RETIRE_WIDTH):
+    """Number of cycles that retired 0..width commits (index = commits)"""
+    return np.bincount(counts, minlength=width + 1)
+
+
+def sliding_ipc(counts, window=IPC_WINDOW):
+    """
+    IPC over the window ending at every cycle
+
+    The first window - 1 cycles average over the cycles seen so far.
+    """
+    total = np.cumsum(counts, dtype=np.int64)
+    previous = np.zeros_like(total)
+    if window < len(total):
+        previous[window:] = total[:-window]
+    cycles = np.minimum(np.arange(1, len(total) + 1), window)
+    return (total - previous) / cycles
+
+
+def zero_commit_stretches(counts, first_cycle=0, top=TOP_STRETCHES):
+    """
+    Longest runs of cycles without a commit
+
+    Returns:
+        list: (start cycle, length) pairs, longest first (earliest on ties)
+    """
+    idle = np.concatenate(([0], (counts == 0).astype(np.int8), [0]))
+    edges = np.diff(idle)
+    starts = np.flatnonzero(edges == 1)
+    lengths = np.flatnonzero(edges == -1) - starts
+    order = np.argsort(-lengths, kind='stable')[:top]
+    return [(first_cycle + int(starts[k]), int(lengths[k])) for k in order]
+
+
+def main():
+    """Main function to handle command line arguments"""
+    parser = argparse.ArgumentParser(description='Retire timeline (commit width, IPC, idle stretches) '
+                                                 'from trace_timestamp.log')
+    parser.add_argument('log_file', help='trace_timestamp.log')
+    parser.add_argument('--clk-period', type=int, default=CLK_PERIOD,
+                        help='Clock period in simulation time units (default: %(default)s)')
+    parser.add_argument('--window', type=int, default=IPC_WINDOW,
+                        help='Sliding IPC window in cycles (default: %(default)s)')
+    parser.add_argument('--stretches', type=int, default=TOP_STRETCHES,
+                        help='Zero-commit stretches listed (default: %(default)s)')
+    parser.add_argument('-o', '--output', help='Write the per-commit columns (.parquet, .arrow, .npz)')
+    parser.add_argument('--cycle-output', help='Write per-cycle Cycle/Commits/IPC columns')
+    args = parser.parse_args()
+
+    import time
+    try:
+        start = time.perf_counter()
+        columns = read_timeline(args.log_file, args.clk_period)
+        elapsed = time.perf_counter() - start
+    except OSError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    cycle = columns['cycle']
+    if not len(cycle):
+        print(f"Error: no commits found in {args.log_file}")
+        sys.exit(1)
+    first_cycle, counts = commits_per_cycle(cycle)
+    histogram = commit_width_histogram(counts)
+    ipc = sliding_ipc(counts, args.window)
+
+    print(f"File: {args.log_file}")
+    print(f"Commits: {len(cycle):,} (parsed in {elapsed:.3f} s, "
+          f"{len(cycle) / max(elapsed, 1e-9) / 1e6:.1f} M lines/s)")
+    print(f"Cycles: {len(counts):,} ({first_cycle:,} - {first_cycle + len(counts) - 1:,})")
+    print(f"IPC: {len(cycle) / len(counts):.3f}")
+    print("Commits per pipe: " + ", ".join(
+        f"PIPE {p}: {n:,}" for p, n in enumerate(np.bincount(columns['pipe'], minlength=RETIRE_WIDTH))))
+
+    print("\nCommit width histogram:")
+    for width, cycles in enumerate(histogram):
+        print(f"  {width} commits: {cycles:>12,} cycles ({cycles / len(counts) * 100:6.2f}%)")
+
+    if len(ipc) >= args.window:
+        full = ipc[args.window - 1:]
+        low = int(np.argmin(full)) + args.window - 1
+        high = int(np.argmax(full)) + args.window - 1
+        print(f"\nIPC over {args.window:,}-cycle windows:")
+        print(f"  min {ipc[low]:.3f} (ending at cycle {first_cycle + low:,})")
+        print(f"  max {ipc[high]:.3f} (ending at cycle {first_cycle + high:,})")
+        print(f"  mean {float(full.mean()):.3f}, p10 {float(np.percentile(full, 10)):.3f}, "
+              f"p90 {float(np.percentile(full, 90)):.3f}")
+
+    stretches = zero_commit_stretches(counts, first_cycle, args.stretches)
+    print("\nLongest zero-commit stretches:")
+    if not stretches:
+        print("  none")
+    for start_cycle, length in stretches:
+        # The commit that ended the stretch is the one retirement waited for
+        after = int(np.searchsorted(cycle, start_cycle + length))
+        ended_by = (f"0x{int(columns['pc'][after]):08x} (0x{int(columns['insn'][after]):08x})"
+                    if after < len(cycle) else '-')
+        print(f"  {length:>8,} cycles from cycle {start_cycle:,}, ended by {ended_by}")
+
+    try:
+        from perf_columns import write_columns
+        if args.output:
+            path = write_columns({name: columns[name] for name in ('time', 'cycle', 'pipe', 'pc', 'insn')},
+                                 args.output)
+            print(f"\nWritten: {path}")
+        if args.cycle_output:
+            path = write_columns({'Cycle': np.arange(first_cycle, first_cycle + len(counts)),
+                                  'Commits': counts, 'IPC': ipc}, args.cycle_output)
+            print(f"Written: {path}")
+    except OSError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()